@@ -0,0 +1,119 @@
+"""
+Measures how long it takes to download a page and its embedded resources,
+as the archive server does when a user views a page that is not yet
+downloaded, while several large groups are being downloaded in bulk.
+
+Compares scheduling the page at normal priority with interactive priority.
+
+Each download is simulated by a task that waits for a fixed response time,
+so that the measurement reflects scheduling rather than the network.
+
+Usage:
+    $ PYTHONPATH=src python benchmarks/bench_interactive_latency.py
+"""
+
+from crystal.task import (
+    PRIORITY_INTERACTIVE, PRIORITY_NORMAL, RootTask, Scheduler,
+    SCHEDULING_STYLE_PARALLEL, SCHEDULING_STYLE_SEQUENTIAL, Task,
+)
+import threading
+import time
+
+# Number of groups being downloaded in bulk, and the size of each
+_BULK_GROUP_COUNT = 3
+_BULK_GROUP_SIZE = 1000
+
+# Number of resources embedded in the viewed page
+_EMBEDDED_COUNT = 10
+
+# Simulated time for a host to respond to a request
+_RESPONSE_TIME = .01  # secs
+
+# Number of download workers, as in a Project by default
+_MAX_WORKERS = 4
+
+
+def main() -> None:
+    print('%d embedded resources, %d bulk groups of %d members' % (
+        _EMBEDDED_COUNT, _BULK_GROUP_COUNT, _BULK_GROUP_SIZE))
+    print('%-12s %12s' % ('', 'page time'))
+    for (name, priority) in [('normal', PRIORITY_NORMAL), ('interactive', PRIORITY_INTERACTIVE)]:
+        print('%-12s %10.0fms' % (name, _measure(priority) * 1000))
+
+
+class _FetchTask(Task):
+    """
+    Leaf task that simulates downloading a URL.
+    """
+    def __init__(self) -> None:
+        super().__init__(title='Fetch')
+    
+    def __call__(self) -> None:
+        time.sleep(_RESPONSE_TIME)
+
+
+class _DownloadTask(Task):
+    """
+    Container task that downloads several resources in order.
+    """
+    def __init__(self, resource_count: int) -> None:
+        super().__init__(title='Download')
+        self.done = threading.Event()
+        
+        self.scheduling_style = SCHEDULING_STYLE_SEQUENTIAL
+        for _ in range(resource_count):
+            self.append_child(_FetchTask())
+    
+    def child_task_did_complete(self, task: Task) -> None:
+        if self.num_children_complete == len(self.children):
+            self.finish()
+            self.done.set()
+
+
+class _PageTask(Task):
+    """
+    Container task that downloads a page and then its embedded resources,
+    several at once, like DownloadResourceTask.
+    """
+    def __init__(self, embedded_count: int) -> None:
+        super().__init__(title='Download page')
+        self.done = threading.Event()
+        self._embedded_count = embedded_count
+        
+        self.scheduling_style = SCHEDULING_STYLE_SEQUENTIAL
+        self.append_child(_FetchTask())
+    
+    def child_task_did_complete(self, task: Task) -> None:
+        if len(self.children) == 1:
+            self.scheduling_style = SCHEDULING_STYLE_PARALLEL
+            for _ in range(self._embedded_count):
+                self.append_child(_FetchTask())
+        if self.num_children_complete == len(self.children):
+            self.finish()
+            self.done.set()
+
+
+def _measure(priority: int) -> float:
+    """
+    Returns the number of seconds taken to download the page.
+    """
+    root_task = RootTask()
+    scheduler = Scheduler(root_task, max_workers=_MAX_WORKERS)
+    scheduler.start()
+    try:
+        for _ in range(_BULK_GROUP_COUNT):
+            root_task.append_child(_DownloadTask(_BULK_GROUP_SIZE))
+        time.sleep(_RESPONSE_TIME * 10)  # let the bulk downloads get going
+        
+        page_task = _PageTask(_EMBEDDED_COUNT)
+        page_task.priority = priority
+        start_time = time.perf_counter()
+        root_task.append_child(page_task)
+        page_task.done.wait()
+        return time.perf_counter() - start_time
+    finally:
+        scheduler.close()
+
+
+if __name__ == '__main__':
+    main()
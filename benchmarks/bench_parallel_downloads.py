@@ -0,0 +1,90 @@
+"""
+Measures how many downloads per second a Scheduler completes when
+downloading a group whose members are spread across several hosts,
+for different numbers of workers.
+
+Each download is simulated by a task that waits for a fixed response time,
+so that the measurement reflects scheduling rather than the network.
+
+Usage:
+    $ PYTHONPATH=src python benchmarks/bench_parallel_downloads.py
+"""
+
+from crystal.task import RootTask, Scheduler, SCHEDULING_STYLE_PARALLEL, Task
+import threading
+import time
+
+# Number of distinct hosts that the group's members are spread across
+_HOST_COUNT = 8
+
+# Number of members downloaded in each measurement
+_MEMBER_COUNT = 128
+
+# Simulated time for a host to respond to a request
+_RESPONSE_TIME = .02  # secs
+
+
+def main() -> None:
+    print('%d downloads across %d hosts, 1 worker per host' % (_MEMBER_COUNT, _HOST_COUNT))
+    print('%-8s %14s %10s' % ('workers', 'downloads/s', 'speedup'))
+    baseline_rate = None
+    for max_workers in [1, 2, 4, 8]:
+        rate = _measure(max_workers)
+        if baseline_rate is None:
+            baseline_rate = rate
+        print('%-8d %14.1f %9.1fx' % (max_workers, rate, rate / baseline_rate))
+
+
+class _FetchTask(Task):
+    """
+    Leaf task that simulates downloading a URL from a host.
+    """
+    def __init__(self, url_host: str) -> None:
+        super().__init__(title='Fetch')
+        self._url_host = url_host
+    
+    @property
+    def url_host(self) -> str:
+        return self._url_host
+    
+    def __call__(self) -> None:
+        time.sleep(_RESPONSE_TIME)
+
+
+class _GroupTask(Task):
+    """
+    Container task that downloads members in order, like DownloadResourceGroupMembersTask.
+    """
+    def __init__(self) -> None:
+        super().__init__(title='Group')
+        self.done = threading.Event()
+        
+        self.scheduling_style = SCHEDULING_STYLE_PARALLEL
+        for i in range(_MEMBER_COUNT):
+            self.append_child(_FetchTask('https://host%d.example.com' % (i % _HOST_COUNT)))
+    
+    def child_task_did_complete(self, task: Task) -> None:
+        if self.num_children_complete == len(self.children):
+            self.finish()
+            self.done.set()
+
+
+def _measure(max_workers: int) -> float:
+    """
+    Returns the number of downloads completed per second.
+    """
+    root_task = RootTask()
+    scheduler = Scheduler(root_task, max_workers=max_workers, max_workers_per_host=1)
+    scheduler.start()
+    try:
+        group_task = _GroupTask()
+        start_time = time.perf_counter()
+        root_task.append_child(group_task)
+        group_task.done.wait()
+        return _MEMBER_COUNT / (time.perf_counter() - start_time)
+    finally:
+        scheduler.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Measures how long it takes to open a project as the number of
+resources and root resources in it grows.
+
+Opening a project should scale linearly with its size:
+doubling the number of resources should roughly double the open time
+in eager mode and leave it roughly unchanged in lazy mode.
+
+Usage:
+    $ PYTHONPATH=src python benchmarks/bench_project_open.py
+"""
+
+from crystal.model import Project
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+# Number of resources in each generated project
+_RESOURCE_COUNTS = [10_000, 20_000, 40_000, 80_000]
+
+# Fraction of resources in each generated project that are also root resources
+_ROOT_RESOURCE_FRACTION = 0.05
+
+
+def main() -> None:
+    print('%10s %10s %12s %12s' % ('resources', 'roots', 'eager (s)', 'lazy (s)'))
+    for resource_count in _RESOURCE_COUNTS:
+        root_resource_count = int(resource_count * _ROOT_RESOURCE_FRACTION)
+        
+        container_dirpath = tempfile.mkdtemp()
+        try:
+            project_dirpath = os.path.join(container_dirpath, 'bench' + Project.FILE_EXTENSION)
+            _create_project(project_dirpath, resource_count, root_resource_count)
+            
+            eager_duration = _time_open(project_dirpath, lazy=False)
+            lazy_duration = _time_open(project_dirpath, lazy=True)
+            
+            print('%10d %10d %12.3f %12.3f' % (
+                resource_count, root_resource_count, eager_duration, lazy_duration))
+        finally:
+            shutil.rmtree(container_dirpath)
+
+
+def _create_project(project_dirpath: str, resource_count: int, root_resource_count: int) -> None:
+    Project(project_dirpath)  # create empty project
+    
+    # Populate the database directly, which is much faster than using the model API
+    db = sqlite3.connect(os.path.join(project_dirpath, Project._DB_FILENAME))
+    try:
+        c = db.cursor()
+        c.executemany('insert into resource (id, url) values (?, ?)', [
+            (id, 'https://example.com/page/%d' % id)
+            for id in range(1, resource_count + 1)
+        ])
+        c.executemany('insert into root_resource (name, resource_id) values (?, ?)', [
+            ('Root %d' % i, id)
+            for (i, id) in enumerate(range(
+                resource_count, resource_count - root_resource_count, -1))
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def _time_open(project_dirpath: str, *, lazy: bool) -> float:
+    start_time = time.perf_counter()
+    Project(project_dirpath, lazy=lazy)
+    return time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+    main()
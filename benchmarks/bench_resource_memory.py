@@ -0,0 +1,72 @@
+"""
+Measures how much memory each Resource occupies once loaded,
+including its URL and its entries in the project's indexes,
+both with and without compact URL storage.
+
+Usage:
+    $ PYTHONPATH=src python benchmarks/bench_resource_memory.py
+"""
+
+from crystal.model import Project, Resource
+import gc
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+# Number of resources loaded in each measurement
+_RESOURCE_COUNT = 100_000
+
+
+def main() -> None:
+    print('%d resources' % _RESOURCE_COUNT)
+    print('%-14s %20s' % ('', 'bytes per resource'))
+    for compact_urls in [False, True]:
+        print('%-14s %20.0f' % (
+            'compact URLs' if compact_urls else 'normal URLs',
+            _measure(compact_urls=compact_urls)))
+
+
+def _measure(*, compact_urls: bool) -> float:
+    """
+    Returns the number of bytes of memory used per Resource.
+    """
+    container_dirpath = tempfile.mkdtemp()
+    try:
+        project = Project(
+            os.path.join(container_dirpath, 'bench' + Project.FILE_EXTENSION),
+            in_memory=True,
+            compact_urls=compact_urls)
+        try:
+            gc.collect()
+            tracemalloc.start()
+            start_size = tracemalloc.get_traced_memory()[0]
+            
+            # Load resources the same way that opening a project does
+            urls = _create_urls()
+            resources = [
+                Resource(project, url, _id=id)
+                for (id, url) in enumerate(urls, start=1)
+            ]
+            del urls  # keep only the URL strings that the resources keep
+            
+            gc.collect()
+            end_size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            
+            return (end_size - start_size) / len(resources)
+        finally:
+            project.close()
+    finally:
+        shutil.rmtree(container_dirpath)
+
+
+def _create_urls():
+    return [
+        'https://forum.example-community.org/viewtopic.php?t=%d' % i
+        for i in range(_RESOURCE_COUNT)
+    ]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Measures how quickly revision bodies can be stored and read back
+with each revision body layout, and in memory.
+
+The in-memory project shows the cost of the model itself, without disk I/O,
+which the other layouts can be compared against.
+
+Usage:
+    $ PYTHONPATH=src python benchmarks/bench_revision_bodies.py
+"""
+
+from crystal.model import Project, ResourceRevision
+from io import BytesIO
+import os
+import shutil
+import tempfile
+import time
+
+# Number of revisions created in each project
+_REVISION_COUNT = 2_000
+
+# Size of each revision body
+_BODY_SIZE = 16 * 1024
+
+_METADATA = {
+    'http_version': 11,
+    'status_code': 200,
+    'reason_phrase': 'OK',
+    'headers': [['Content-Type', 'text/plain']],
+}
+
+
+def main() -> None:
+    print('%-10s %-6s %14s %14s' % ('layout', 'gzip', 'create (rev/s)', 'read (rev/s)'))
+    for layout in [None] + Project._REVISION_BODY_LAYOUTS:  # None = in memory
+        for compression in Project._REVISION_BODY_COMPRESSIONS:
+            container_dirpath = tempfile.mkdtemp()
+            try:
+                project_dirpath = os.path.join(container_dirpath, 'bench' + Project.FILE_EXTENSION)
+                if layout is None:
+                    project = Project(project_dirpath, in_memory=True)
+                else:
+                    project = Project(project_dirpath)
+                    project.revision_body_layout = layout
+                project.revision_body_compression = compression
+                try:
+                    (create_rate, read_rate) = _time_create_and_read(project)
+                finally:
+                    project.close()
+                
+                print('%-10s %-6s %14.0f %14.0f' % (
+                    layout or 'memory',
+                    'yes' if compression != Project.REVISION_BODY_COMPRESSION_NONE else 'no',
+                    create_rate,
+                    read_rate))
+            finally:
+                shutil.rmtree(container_dirpath)
+
+
+def _time_create_and_read(project: Project) -> tuple[float, float]:
+    resources = project.bulk_get_or_create_resources([
+        'https://example.com/file/%d.txt' % i
+        for i in range(_REVISION_COUNT)
+    ])
+    bodies = [
+        (b'line %d of a moderately compressible body\n' % i) * (_BODY_SIZE // 40)
+        for i in range(_REVISION_COUNT)
+    ]
+    
+    start_time = time.perf_counter()
+    for (resource, body) in zip(resources, bodies):
+        ResourceRevision.create_from_response(resource, _METADATA, BytesIO(body))
+    create_duration = time.perf_counter() - start_time
+    
+    start_time = time.perf_counter()
+    for resource in resources:
+        with resource.default_revision().open() as body_file:
+            body_file.read()
+    read_duration = time.perf_counter() - start_time
+    
+    return (_REVISION_COUNT / create_duration, _REVISION_COUNT / read_duration)
+
+
+if __name__ == '__main__':
+    main()
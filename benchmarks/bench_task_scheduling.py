@@ -0,0 +1,103 @@
+"""
+Measures how long an idle project takes to start running a newly added task,
+which is the delay a user sees after asking for a download,
+and the CPU time used while the project has no tasks to run.
+
+Compares the former polling loop with the event-driven Scheduler.
+
+Usage:
+    $ PYTHONPATH=src python benchmarks/bench_task_scheduling.py
+"""
+
+from crystal.task import RootTask, Scheduler, Task
+import statistics
+import threading
+import time
+
+# Number of tasks whose startup latency is measured
+_TASK_COUNT = 20
+
+# Time the scheduler is left idle before each task is added
+_IDLE_DURATION = 0.25  # secs
+
+# Polling interval of the former loop
+_POLL_INTERVAL = .1  # secs
+
+
+def main() -> None:
+    print('%-10s %16s %16s' % ('', 'median latency', 'idle CPU'))
+    for (name, start) in [('polling', _start_polling), ('scheduler', _start_scheduler)]:
+        (latency, idle_cpu) = _measure(start)
+        print('%-10s %14.3fms %15.1f%%' % (name, latency * 1000, idle_cpu * 100))
+
+
+class _SignalTask(Task):
+    """
+    Leaf task that records when it starts running.
+    """
+    def __init__(self) -> None:
+        super().__init__(title='Signal')
+        self.started = threading.Event()
+        self.start_time = 0.0
+    
+    def __call__(self) -> None:
+        self.start_time = time.perf_counter()
+        self.started.set()
+
+
+def _measure(start) -> tuple:
+    """
+    Returns the median time between adding a task and it starting to run,
+    and the fraction of one CPU used while idle.
+    """
+    root_task = RootTask()
+    stop = start(root_task)
+    try:
+        latencies = []
+        idle_cpu_time = 0.0
+        for _ in range(_TASK_COUNT):
+            cpu_start_time = time.thread_time()
+            process_start_time = time.process_time()
+            time.sleep(_IDLE_DURATION)
+            idle_cpu_time += (time.process_time() - process_start_time) - (time.thread_time() - cpu_start_time)
+            
+            task = _SignalTask()
+            add_time = time.perf_counter()
+            root_task.append_child(task)
+            task.started.wait()
+            latencies.append(task.start_time - add_time)
+        return (statistics.median(latencies), max(0.0, idle_cpu_time) / (_TASK_COUNT * _IDLE_DURATION))
+    finally:
+        stop()
+
+
+def _start_polling(root_task: Task):
+    # Equivalent to start_schedule_forever before the Scheduler was added
+    stopped = [False]
+    def bg_task():
+        while not stopped[0]:
+            unit = root_task.try_get_next_task_unit()
+            if unit is None:
+                time.sleep(_POLL_INTERVAL)
+                continue
+            unit()
+    thread = threading.Thread(target=bg_task, daemon=True)
+    thread.start()
+    def stop():
+        stopped[0] = True
+        thread.join()
+    return stop
+
+
+def _start_scheduler(root_task: Task):
+    scheduler = Scheduler(root_task)
+    thread = threading.Thread(target=scheduler.run, daemon=True)
+    thread.start()
+    def stop():
+        scheduler.close()
+        thread.join()
+    return stop
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Measures how quickly the links of a typical forum page can be resolved
+to Resources, which happens whenever a page is downloaded or expanded
+in the entity tree.
+
+Compares normalizing every link from scratch with using the
+exact-match fast path and the cache of normalized URLs.
+
+Usage:
+    $ PYTHONPATH=src python benchmarks/bench_url_normalization.py
+"""
+
+from crystal.doc.html import parse_links
+from crystal.model import Project, Resource
+import os
+import shutil
+import tempfile
+import time
+from urllib.parse import urljoin
+
+# URL of the page whose links are resolved
+_PAGE_URL = 'https://forum.example.com/viewtopic.php?t=1234'
+
+# Number of times the page's links are resolved in each measurement
+_REPEAT_COUNT = 50
+
+
+def main() -> None:
+    link_urls = [
+        urljoin(_PAGE_URL, link.relative_url)
+        for link in parse_links(_create_page_html())
+    ]
+    
+    container_dirpath = tempfile.mkdtemp()
+    try:
+        project = Project(os.path.join(container_dirpath, 'bench' + Project.FILE_EXTENSION))
+        try:
+            # Create a Resource for each link, as the first visit to the page would
+            project.bulk_get_or_create_resources(link_urls)
+            
+            uncached_rate = _time_lookups(
+                link_urls,
+                lambda url: _lookup_without_cache(project, url))
+            cached_rate = _time_lookups(
+                link_urls,
+                lambda url: Resource._lookup(project, url))
+        finally:
+            project.close()
+    finally:
+        shutil.rmtree(container_dirpath)
+    
+    print('%d links per page' % len(link_urls))
+    print('%-10s %14s' % ('', 'links/s'))
+    print('%-10s %14.0f' % ('uncached', uncached_rate))
+    print('%-10s %14.0f' % ('cached', cached_rate))
+    print('speedup: %.1fx' % (cached_rate / uncached_rate))
+
+
+def _create_page_html() -> bytes:
+    """
+    Creates HTML resembling a page of a phpBB topic, with navigation links,
+    per-post links, embedded images, and links that differ only by fragment.
+    """
+    parts = [
+        '<html><head>',
+        '<link rel="stylesheet" href="./styles/prosilver/theme/stylesheet.css">',
+        '<script src="./styles/prosilver/template/forum_fn.js"></script>',
+        '</head><body>',
+        '<a href="./index.php">Board index</a>',
+        '<a href="./viewforum.php?f=7">General</a>',
+        '<a href="./viewforum.php?f=7&amp;start=50">General (page 3)</a>',
+        '<a href="./search.php?search_id=unanswered">Unanswered topics</a>',
+        '<a href="https://Forum.Example.com/faq.php">FAQ</a>',
+    ]
+    for post_id in range(1000, 1020):
+        parts.extend([
+            '<div class="post" id="p%d">' % post_id,
+            '<a href="./viewtopic.php?p=%d#p%d">Permalink</a>' % (post_id, post_id),
+            '<a href="./memberlist.php?mode=viewprofile&amp;u=%d">Author</a>' % (post_id % 7),
+            '<img src="./download/file.php?avatar=%d.png">' % (post_id % 7),
+            '<img src="./images/smilies/icon_e_smile.gif">',
+            '<a href="./posting.php?mode=quote&amp;f=7&amp;p=%d">Quote</a>' % post_id,
+            '<a href="#top">Top</a>',
+            '<a href="https://en.wikipedia.org/wiki/Caf%%C3%%A9 %d">Reference</a>' % post_id,
+            '</div>',
+        ])
+    for start in range(0, 200, 20):
+        parts.append('<a href="./viewtopic.php?t=1234&amp;start=%d">%d</a>' % (start, start // 20 + 1))
+    parts.append('</body></html>')
+    return '\n'.join(parts).encode('utf-8')
+
+
+def _lookup_without_cache(project: Project, url: str) -> None:
+    # Equivalent to Resource._lookup before the fast path and cache were added
+    for urla in Resource._compute_url_alternatives(url):
+        if project.get_resource(urla) is not None:
+            break
+
+
+def _time_lookups(urls, lookup) -> float:
+    start_time = time.perf_counter()
+    for _ in range(_REPEAT_COUNT):
+        for url in urls:
+            lookup(url)
+    duration = time.perf_counter() - start_time
+    return (_REPEAT_COUNT * len(urls)) / duration
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,486 @@
+"""
+Stores the bodies of a project's ResourceRevisions.
+
+Each store keeps bodies in a particular layout and records each revision,
+along with the location of its body, in the project's database.
+Bodies are stored in the `body_encoding` of their revision.
+
+All stores are threadsafe.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from typing import BinaryIO, cast, Dict, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from crystal.model import Project, ResourceRevision
+
+class RevisionBodyStore(object):
+    """
+    Abstract store of revision bodies.
+    """
+    
+    def __init__(self, project: Project) -> None:
+        self.project = project
+    
+    def create(self, revision: ResourceRevision, body_stream: BinaryIO) -> None:
+        """
+        Stores the body of the specified new revision, reading `body_stream` until EOF,
+        and records the revision in the database, assigning its `_id` and `_body_size`.
+        
+        If the body cannot be stored then the revision is not recorded.
+        """
+        raise NotImplementedError()
+    
+    def open(self, revision: ResourceRevision) -> BinaryIO:
+        """
+        Opens the body of the specified revision, exactly as stored.
+        """
+        raise NotImplementedError()
+    
+    def view(self, revision: ResourceRevision) -> Optional[memoryview]:
+        """
+        Returns a read-only view of the body of the specified revision,
+        exactly as stored, without copying it, or None if this store
+        does not support such views.
+        """
+        return None
+    
+    def size(self, revision: ResourceRevision) -> int:
+        """
+        Returns the size of the body of the specified revision after it is
+        decoded from its `body_encoding`, which is the same size that
+        `create` assigns to its `_body_size`.
+        
+        Is slow for encoded bodies, which must be decoded to be measured.
+        """
+        if revision._body_encoding is None:
+            return self._stored_size(revision)
+        size = 0
+        with open_decoded(self.open(revision), revision._body_encoding) as body_file:
+            while True:
+                chunk = body_file.read(io.DEFAULT_BUFFER_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+        return size
+    
+    def exists(self, revision: ResourceRevision) -> bool:
+        """
+        Returns whether the body of the specified revision is stored.
+        """
+        raise NotImplementedError()
+    
+    def delete(self, revision: ResourceRevision) -> None:
+        """
+        Deletes the body of the specified revision and the revision's database record.
+        """
+        raise NotImplementedError()
+    
+    def close(self) -> None:
+        """
+        Releases any resources held by this store.
+        """
+        pass
+    
+    # === Utility ===
+    
+    def _stored_size(self, revision: ResourceRevision) -> int:
+        """
+        Returns the size of the body of the specified revision, exactly as stored.
+        """
+        raise NotImplementedError()
+    
+    @property
+    def _revisions_dirpath(self) -> str:
+        return os.path.join(self.project.path, self.project._RESOURCE_REVISION_DIRNAME)
+    
+    def _delete_record(self, revision: ResourceRevision) -> None:
+        self.project._db_writer.execute(
+            'delete from resource_revision where id=?', (revision._id,)
+        ).result()
+
+class FlatRevisionBodyStore(RevisionBodyStore):
+    """
+    Stores each body in its own file, named after its revision,
+    in a single directory.
+    """
+    
+    def create(self, revision: ResourceRevision, body_stream: BinaryIO) -> None:
+        project = self.project
+        
+        # Need to do this first to get the database ID
+        # NOTE: has_body is recorded only after the body is completely written
+        revision._id = project._db_writer.call(revision._insert).result()
+        
+        try:
+            with open(self._filepath(revision), 'wb') as raw_body_file, \
+                    revision._encoding_writer(raw_body_file) as body_file:
+                shutil.copyfileobj(body_stream, body_file)
+                revision._body_size = body_file.tell()
+            project._db_writer.execute(
+                'update resource_revision set has_body=1, body_size=? where id=?',
+                (revision._body_size, revision._id)
+            ).result()
+        except:
+            # Rollback database commit
+            self._delete_record(revision)
+            raise
+    
+    def open(self, revision: ResourceRevision) -> BinaryIO:
+        return open(self._filepath(revision), 'rb')
+    
+    def _stored_size(self, revision: ResourceRevision) -> int:
+        return os.path.getsize(self._filepath(revision))
+    
+    def exists(self, revision: ResourceRevision) -> bool:
+        return os.path.exists(self._filepath(revision))
+    
+    def delete(self, revision: ResourceRevision) -> None:
+        body_filepath = self._filepath(revision)  # cache
+        if os.path.exists(body_filepath):
+            os.remove(body_filepath)
+        self._delete_record(revision)
+    
+    def _filepath(self, revision: ResourceRevision) -> str:
+        return os.path.join(self._revisions_dirpath, str(revision._id))
+
+class ContentAddressedRevisionBodyStore(RevisionBodyStore):
+    """
+    Stores each distinct body only once, in a file named after its SHA-256 hash,
+    shared by all revisions with that body.
+    
+    The revision_body table counts the revisions that refer to each body.
+    """
+    _DIRNAME = 'sha256'  # inside the revisions directory
+    
+    def __init__(self, project: Project) -> None:
+        super().__init__(project)
+        # Guards body files and their reference counts
+        self._lock = threading.Lock()
+    
+    def create(self, revision: ResourceRevision, body_stream: BinaryIO) -> None:
+        project = self.project
+        
+        # Write body to a temporary file, hashing it along the way
+        os.makedirs(self._dirpath, exist_ok=True)
+        (temp_fd, temp_filepath) = tempfile.mkstemp(dir=self._dirpath, suffix='.tmp')
+        try:
+            hasher = hashlib.sha256()
+            with open(temp_fd, 'wb') as raw_temp_file, \
+                    revision._encoding_writer(raw_temp_file) as temp_file:
+                while True:
+                    chunk = body_stream.read(1024 * 64)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    temp_file.write(chunk)
+                revision._body_size = temp_file.tell()
+            revision._body_hash = body_hash = hasher.hexdigest()
+            
+            def insert_revision(c) -> int:
+                c.execute('update revision_body set refcount=refcount+1 where hash=?', (body_hash,))
+                if c.rowcount == 0:
+                    c.execute('insert into revision_body (hash, refcount, size) values (?, 1, ?)',
+                        (body_hash, revision._body_size))
+                return revision._insert(c)
+            
+            with self._lock:
+                # Move body into place before recording any references to it
+                our_body_encoding = revision._body_encoding
+                for body_encoding in [our_body_encoding, None if our_body_encoding else 'gzip']:
+                    # Reuse an identical body even if it was stored with a different encoding
+                    revision._body_encoding = body_encoding
+                    if self.exists(revision):
+                        break
+                else:
+                    revision._body_encoding = our_body_encoding
+                body_filepath = self._filepath(revision)
+                if os.path.exists(body_filepath):
+                    did_move_body = False
+                else:
+                    os.makedirs(os.path.dirname(body_filepath), exist_ok=True)
+                    os.replace(temp_filepath, body_filepath)
+                    did_move_body = True
+                try:
+                    revision._id = project._db_writer.call(insert_revision).result()
+                except:
+                    if did_move_body:
+                        os.remove(body_filepath)
+                    raise
+        finally:
+            if os.path.exists(temp_filepath):
+                os.remove(temp_filepath)
+    
+    def open(self, revision: ResourceRevision) -> BinaryIO:
+        return open(self._filepath(revision), 'rb')
+    
+    def _stored_size(self, revision: ResourceRevision) -> int:
+        return os.path.getsize(self._filepath(revision))
+    
+    def exists(self, revision: ResourceRevision) -> bool:
+        return os.path.exists(self._filepath(revision))
+    
+    def delete(self, revision: ResourceRevision) -> None:
+        body_hash = revision._body_hash
+        
+        # Delete the shared body only if no other revision refers to it
+        def delete_revision(c) -> int:
+            c.execute('delete from resource_revision where id=?', (revision._id,))
+            c.execute('update revision_body set refcount=refcount-1 where hash=?', (body_hash,))
+            [(refcount,)] = c.execute('select refcount from revision_body where hash=?', (body_hash,))
+            if refcount == 0:
+                c.execute('delete from revision_body where hash=?', (body_hash,))
+            return refcount
+        with self._lock:
+            refcount = self.project._db_writer.call(delete_revision).result()
+            body_filepath = self._filepath(revision)
+            if refcount == 0 and os.path.exists(body_filepath):
+                # Remove the body only after no reference to it is committed
+                self.project._db_writer.flush()
+                os.remove(body_filepath)
+    
+    @property
+    def _dirpath(self) -> str:
+        return os.path.join(self._revisions_dirpath, self._DIRNAME)
+    
+    def _filepath(self, revision: ResourceRevision) -> str:
+        body_hash = revision._body_hash
+        assert body_hash is not None
+        return os.path.join(
+            self._dirpath,
+            body_hash[:2],
+            body_hash + ('.gz' if revision._body_encoding == 'gzip' else ''))
+
+class PackedRevisionBodyStore(RevisionBodyStore):
+    """
+    Appends each body to a large, append-only segment file,
+    recording the (segment, offset, length) of the body.
+    
+    Bodies are read through memory maps of the segment files.
+    Space used by the bodies of deleted revisions is not reclaimed.
+    """
+    _DIRNAME = 'packs'  # inside the revisions directory
+    
+    # Segment files stop growing after reaching this size
+    _MAX_SEGMENT_SIZE = 256 * 1024 * 1024
+    
+    def __init__(self, project: Project) -> None:
+        super().__init__(project)
+        # Guards appends to segment files
+        self._append_lock = threading.Lock()
+        self._last_segment = None  # type: Optional[int]
+        # Memory maps of segment files
+        self._mmaps = {}  # type: Dict[int, mmap.mmap]
+        self._mmaps_lock = threading.Lock()
+    
+    def create(self, revision: ResourceRevision, body_stream: BinaryIO) -> None:
+        # Read body fully before appending it, so that appends by other
+        # threads don't wait on a slow network
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spool_file:
+            with revision._encoding_writer(cast(BinaryIO, spool_file)) as body_file:
+                shutil.copyfileobj(body_stream, body_file)
+                revision._body_size = body_file.tell()
+            spool_file.seek(0)
+            (revision._body_segment, revision._body_offset, revision._body_length) = \
+                self.append(cast(BinaryIO, spool_file))
+        
+        # NOTE: If the process exits before this commits then the appended
+        #       body will be unreferenced, wasting space but otherwise harmless
+        revision._id = self.project._db_writer.call(revision._insert).result()
+    
+    def append(self, body_file: BinaryIO) -> Tuple[int, int, int]:
+        """
+        Appends the contents of the specified file to the current segment file,
+        returning the (segment, offset, length) where the contents were written.
+        """
+        with self._append_lock:
+            if self._last_segment is None:
+                os.makedirs(self._dirpath, exist_ok=True)
+                self._last_segment = max([
+                    int(filename[:-len('.pack')])
+                    for filename in os.listdir(self._dirpath)
+                    if filename.endswith('.pack')
+                ] or [1])
+            
+            segment = self._last_segment
+            segment_filepath = self._segment_filepath(segment)
+            if (os.path.exists(segment_filepath) and
+                    os.path.getsize(segment_filepath) >= self._MAX_SEGMENT_SIZE):
+                segment = self._last_segment = segment + 1
+                segment_filepath = self._segment_filepath(segment)
+            
+            with open(segment_filepath, 'ab') as segment_file:
+                offset = segment_file.tell()
+                shutil.copyfileobj(body_file, segment_file)
+                length = segment_file.tell() - offset
+            return (segment, offset, length)
+    
+    def open(self, revision: ResourceRevision) -> BinaryIO:
+        return cast(BinaryIO, MemoryViewReader(self.view(revision)))
+    
+    def view(self, revision: ResourceRevision) -> memoryview:
+        (segment, offset, length) = (
+            revision._body_segment, revision._body_offset, revision._body_length)
+        assert segment is not None and offset is not None and length is not None
+        if length == 0:
+            return memoryview(b'')
+        with self._mmaps_lock:
+            segment_mmap = self._mmaps.get(segment)
+            if segment_mmap is None or len(segment_mmap) < offset + length:
+                # Map (or remap) the segment file, which may have grown since
+                # it was last mapped
+                old_segment_mmap = segment_mmap
+                with open(self._segment_filepath(segment), 'rb') as segment_file:
+                    segment_mmap = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._mmaps[segment] = segment_mmap
+                if old_segment_mmap is not None:
+                    self._close_mmap(old_segment_mmap)
+        return memoryview(segment_mmap)[offset:offset + length]
+    
+    def _stored_size(self, revision: ResourceRevision) -> int:
+        assert revision._body_length is not None
+        return revision._body_length
+    
+    def exists(self, revision: ResourceRevision) -> bool:
+        return (
+            revision._body_segment is not None and
+            os.path.exists(self._segment_filepath(revision._body_segment))
+        )
+    
+    def delete(self, revision: ResourceRevision) -> None:
+        # NOTE: Space in the segment file is not reclaimed
+        self._delete_record(revision)
+    
+    def close(self) -> None:
+        with self._mmaps_lock:
+            for segment_mmap in self._mmaps.values():
+                self._close_mmap(segment_mmap)
+            self._mmaps.clear()
+    
+    @staticmethod
+    def _close_mmap(segment_mmap: mmap.mmap) -> None:
+        try:
+            segment_mmap.close()
+        except BufferError:
+            # A view of the map is still in use. It will be closed when garbage collected.
+            pass
+    
+    @property
+    def _dirpath(self) -> str:
+        return os.path.join(self._revisions_dirpath, self._DIRNAME)
+    
+    def _segment_filepath(self, segment: int) -> str:
+        return os.path.join(self._dirpath, '%08d.pack' % segment)
+
+class MemoryRevisionBodyStore(RevisionBodyStore):
+    """
+    Keeps bodies in memory only. Nothing is persisted.
+    
+    Useful for benchmarks and tests that should not be affected by disk I/O.
+    """
+    
+    def __init__(self, project: Project) -> None:
+        super().__init__(project)
+        self._bodies = {}  # type: Dict[int, bytes]
+    
+    def create(self, revision: ResourceRevision, body_stream: BinaryIO) -> None:
+        buffer = io.BytesIO()
+        with revision._encoding_writer(buffer) as body_file:
+            shutil.copyfileobj(body_stream, body_file)
+            revision._body_size = body_file.tell()
+        revision._id = self.project._db_writer.call(revision._insert).result()
+        self._bodies[revision._id] = buffer.getvalue()
+    
+    def open(self, revision: ResourceRevision) -> BinaryIO:
+        return cast(BinaryIO, MemoryViewReader(self.view(revision)))
+    
+    def view(self, revision: ResourceRevision) -> memoryview:
+        return memoryview(self._bodies[revision._id])
+    
+    def _stored_size(self, revision: ResourceRevision) -> int:
+        return len(self._bodies[revision._id])
+    
+    def exists(self, revision: ResourceRevision) -> bool:
+        return revision._id in self._bodies
+    
+    def delete(self, revision: ResourceRevision) -> None:
+        self._delete_record(revision)
+        self._bodies.pop(revision._id, None)
+
+# ------------------------------------------------------------------------------
+# Utility
+
+def open_decoded(body_file: BinaryIO, body_encoding: Optional[str]) -> BinaryIO:
+    """
+    Wraps the specified stored body such that reads from the returned file
+    are decoded from the specified encoding.
+    
+    Closing the returned file closes the wrapped file.
+    """
+    if body_encoding == 'gzip':
+        return cast(BinaryIO, _ClosingGzipFile(body_file))
+    else:
+        assert body_encoding is None
+        return body_file
+
+class _ClosingGzipFile(gzip.GzipFile):
+    def __init__(self, raw_file: BinaryIO) -> None:
+        super().__init__(fileobj=raw_file, mode='rb')
+        self._raw_file = raw_file
+    
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            self._raw_file.close()
+
+class MemoryViewReader(io.RawIOBase):
+    """
+    Read-only binary stream over a memoryview, which is not copied.
+    """
+    def __init__(self, view: memoryview) -> None:
+        self._view = view
+        self._position = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        count = max(0, min(len(buffer), len(self._view) - self._position))
+        buffer[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+    
+    def readall(self) -> bytes:
+        data = self._view[self._position:].tobytes()
+        self._position = max(self._position, len(self._view))
+        return data
+    
+    def seek(self, offset: int, whence: int=io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError('Invalid whence: %r' % whence)
+        if position < 0:
+            raise ValueError('Negative seek position: %r' % position)
+        self._position = position
+        return position
+    
+    def tell(self) -> int:
+        return self._position
@@ -30,11 +30,20 @@ class MainWindow(object):
         
         frame_sizer.Add(splitter, proportion=1, flag=wx.EXPAND)
         
+        frame.Bind(wx.EVT_CLOSE, self._on_close_frame)
+        
         frame.Fit()
         frame.Show(True)
         
         self.frame = frame
     
+    # === Frame: Events ===
+    
+    def _on_close_frame(self, event):
+        # Save any writes that are still waiting to be committed
+        self.project.close()
+        event.Skip()
+    
     # === Entity Pane: Init ===
     
     def _create_entity_pane(self, parent, progress_listener: OpenProjectProgressListener):
@@ -52,6 +61,8 @@ class MainWindow(object):
     
     def _create_entity_pane_content(self, parent, progress_listener: OpenProjectProgressListener):
         content_sizer = wx.BoxSizer(wx.VERTICAL)
+        content_sizer.Add(self._create_url_filter_field(parent), flag=wx.EXPAND)
+        content_sizer.AddSpacer(_WINDOW_INNER_PADDING)
         content_sizer.Add(
             self._create_entity_tree(parent, progress_listener),
             proportion=1,
@@ -66,6 +77,14 @@ class MainWindow(object):
         
         return self.entity_tree.peer
     
+    def _create_url_filter_field(self, parent):
+        self._url_filter_field = wx.SearchCtrl(parent)
+        self._url_filter_field.SetDescriptiveText('Filter URLs')
+        self._url_filter_field.ShowCancelButton(True)
+        self._url_filter_field.Bind(wx.EVT_TEXT, self._on_url_filter_changed)
+        self._url_filter_field.Bind(wx.EVT_SEARCHCTRL_CANCEL_BTN, self._on_url_filter_cleared)
+        return self._url_filter_field
+    
     def _create_button_bar(self, parent):
         add_url_button = wx.Button(parent, label='+ URL')
         add_url_button.Bind(wx.EVT_BUTTON, self._on_add_url)
@@ -132,6 +151,13 @@ class MainWindow(object):
     
     # === Entity Pane: Events ===
     
+    def _on_url_filter_changed(self, event):
+        self.entity_tree.url_filter = self._url_filter_field.GetValue()
+    
+    def _on_url_filter_cleared(self, event):
+        self._url_filter_field.SetValue('')
+        self.entity_tree.url_filter = None
+    
     def _on_add_url(self, event):
         AddRootUrlDialog(
             self.frame, self._on_add_url_dialog_ok,
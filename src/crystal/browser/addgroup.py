@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from crystal.model import ResourceGroup
+from crystal.urlmatcher import literal_prefix_of
 import sys
 import wx
 
@@ -8,6 +9,12 @@ _WINDOW_INNER_PADDING = 10
 _FORM_LABEL_INPUT_SPACING = 5
 _FORM_ROW_SPACING = 10
 
+# Maximum number of matching URLs shown in the preview
+_MAX_PREVIEW_URL_COUNT = 1000
+
+# Number of resources matched against the URL pattern at a time
+_PREVIEW_PAGE_SIZE = 1000
+
 class AddGroupDialog(object):
     # === Init ===
     
@@ -38,9 +45,14 @@ class AddGroupDialog(object):
         preview_box_root.SetSizer(preview_box_root_sizer)
         preview_box_root_sizer.SetSizeHints(preview_box_root)
         
+        self.url_filter_field = wx.SearchCtrl(preview_box_root)
+        self.url_filter_field.SetDescriptiveText('Filter URLs')
+        self.url_filter_field.Bind(wx.EVT_TEXT, self._on_url_filter_field_changed)
+        
         self.url_list = wx.ListBox(preview_box_root, style=wx.LB_ALWAYS_SB, size=(-1,150))
         
         preview_box_root_sizer.Add(wx.StaticText(preview_box_root, label='Known matching URLs:'), flag=wx.EXPAND)
+        preview_box_root_sizer.Add(self.url_filter_field, flag=wx.EXPAND)
         preview_box_root_sizer.Add(self.url_list, flag=wx.EXPAND)
         
         content_sizer = wx.BoxSizer(wx.VERTICAL)
@@ -104,20 +116,52 @@ class AddGroupDialog(object):
         url_pattern = self.pattern_field.GetValue()
         url_pattern_re = ResourceGroup.create_re_for_url_pattern(url_pattern)
         
-        matching_urls = []
-        for r in self._project.resources:
-            if url_pattern_re.match(r.url) is not None:
-                matching_urls.append(r.url)
+        url_filter = self.url_filter_field.GetValue()
+        if url_filter != '':
+            # Scan only resources whose URL contains the filter text,
+            # in creation order, until enough matches are found
+            matching_urls = []
+            after_id = None
+            while len(matching_urls) < _MAX_PREVIEW_URL_COUNT:
+                candidates = self._project.search_urls(
+                    url_filter, after_id=after_id, limit=_PREVIEW_PAGE_SIZE)
+                for r in candidates:
+                    if url_pattern_re.match(r.url) is not None:
+                        matching_urls.append(r.url)
+                if len(candidates) < _PREVIEW_PAGE_SIZE:
+                    break
+                after_id = candidates[-1]._id
+            del matching_urls[_MAX_PREVIEW_URL_COUNT:]
+            matching_urls.sort()
+        else:
+            # Scan only resources starting with the pattern's literal prefix,
+            # in URL order, until enough matches are found
+            url_prefix = literal_prefix_of(url_pattern)
+            matching_urls = []
+            after_url = None
+            while len(matching_urls) < _MAX_PREVIEW_URL_COUNT:
+                candidates = self._project.resources_with_url_prefix(
+                    url_prefix, after_url=after_url, limit=_PREVIEW_PAGE_SIZE)
+                for r in candidates:
+                    if url_pattern_re.match(r.url) is not None:
+                        matching_urls.append(r.url)
+                if len(candidates) < _PREVIEW_PAGE_SIZE:
+                    break
+                after_url = candidates[-1].url
+        del matching_urls[_MAX_PREVIEW_URL_COUNT:]
         
         self.url_list.Clear()
         if len(matching_urls) > 0:  # avoid warning on Mac
-            self.url_list.InsertItems(sorted(matching_urls), 0)
+            self.url_list.InsertItems(matching_urls, 0)
     
     # === Events ===
     
     def _on_pattern_field_changed(self, event):
         self._update_preview_urls()
     
+    def _on_url_filter_field_changed(self, event):
+        self._update_preview_urls()
+    
     def _on_button(self, event):
         btn_id = event.GetEventObject().GetId()
         if btn_id == wx.ID_OK:
@@ -5,6 +5,7 @@ from crystal.progress import (
     DummyOpenProjectProgressListener,
     OpenProjectProgressListener,
 )
+from crystal.task import PRIORITY_INTERACTIVE
 from crystal.ui.tree import *
 from crystal.xcollections import defaultordereddict
 from crystal.xthreading import bg_call_later, fg_call_later
@@ -18,6 +19,9 @@ if TYPE_CHECKING:
 _ID_SET_PREFIX = 101
 _ID_CLEAR_PREFIX = 102
 
+# Maximum number of resources shown when the tree is filtered by URL
+_MAX_URL_FILTER_RESULT_COUNT = 500
+
 class EntityTree(object):
     """
     Displays a tree of top-level project entities.
@@ -73,6 +77,22 @@ class EntityTree(object):
         """
         self.root.update_descendants()
     
+    def _get_url_filter(self) -> Optional[str]:
+        """
+        Text that must appear in the URL of each resource shown at the
+        top level of this tree, or None to show the project's root resources
+        and groups instead.
+        """
+        return self.root.url_filter
+    def _set_url_filter(self, url_filter: Optional[str]) -> None:
+        if url_filter == '':
+            url_filter = None
+        if url_filter == self.root.url_filter:
+            return
+        self.root.url_filter = url_filter
+        self.root.update_children()
+    url_filter = property(_get_url_filter, _set_url_filter)
+    
     def _refresh_group_nodes(self):
         # Coalesce multiple refreshes that happen in succession
         if self._group_nodes_need_updating:
@@ -90,7 +110,7 @@ class EntityTree(object):
         finally:
             self._group_nodes_need_updating = False
     
-    def resource_did_instantiate(self, resource):
+    def resources_did_instantiate(self, resources):
         self._refresh_group_nodes()
     
     def on_right_click(self, event, node_view):
@@ -234,6 +254,7 @@ class RootNode(Node):
         self.view.expandable = True
         
         self._project = project
+        self.url_filter = None  # type: Optional[str]
         
         self.update_children(progress_listener)
     
@@ -244,6 +265,16 @@ class RootNode(Node):
         
         children = []  # type: List[Node]
         
+        if self.url_filter is not None:
+            for r in self._project.search_urls(self.url_filter, limit=_MAX_URL_FILTER_RESULT_COUNT):
+                rr = self._project.get_root_resource(r)
+                if rr is None:
+                    children.append(NormalResourceNode(r))
+                else:
+                    children.append(RootResourceNode(rr))
+            self.set_children(children)
+            return
+        
         progress_listener.loading_root_resource_views()
         for (index, rr) in enumerate(self._project.root_resources):
             progress_listener.loading_root_resource_view(index)
@@ -300,7 +331,7 @@ class _ResourceNode(Node):
         # If this is the first expansion attempt, start an asynchronous task to fetch
         # the resource and subsequently update the children
         if self.download_future is None:
-            self.download_future = self.resource.download()
+            self.download_future = self.resource.download(priority=PRIORITY_INTERACTIVE)
             
             def download_done(future):
                 revision = future.result()
@@ -323,9 +354,12 @@ class _ResourceNode(Node):
         # Partition links and create resources
         resources_2_links = defaultordereddict(list)
         if self.resource_links:
-            for link in self.resource_links:
-                url = urljoin(self.resource.url, link.relative_url)
-                resource = Resource(self._project, url)
+            urls = [
+                urljoin(self.resource.url, link.relative_url)
+                for link in self.resource_links
+            ]
+            resources = self._project.bulk_get_or_create_resources(urls)
+            for (resource, link) in zip(resources, self.resource_links):
                 resources_2_links[resource].append(link)
         
         linked_root_resources = []
@@ -343,17 +377,14 @@ class _ResourceNode(Node):
             
             if rr is not None:
                 linked_root_resources.append((rr, links_to_r))
-                for rg in self._project.resource_groups:
-                    if r in rg:
-                        group_2_root_and_normal_resources[rg][0].append((rr, links_to_r))
+                for rg in self._project.groups_containing(r):
+                    group_2_root_and_normal_resources[rg][0].append((rr, links_to_r))
             else:
-                in_any_group = False
-                for rg in self._project.resource_groups:
-                    if r in rg:
-                        in_any_group = True
-                        group_2_root_and_normal_resources[rg][1].append((r, links_to_r))
+                groups_containing_r = self._project.groups_containing(r)
+                for rg in groups_containing_r:
+                    group_2_root_and_normal_resources[rg][1].append((r, links_to_r))
                 
-                if not in_any_group:
+                if len(groups_containing_r) == 0:
                     is_embedded = False
                     for link in links_to_r:
                         if link.embedded:
@@ -494,8 +525,12 @@ class ResourceGroupNode(Node):
         self.view = NodeView()
         self.view.title = self.calculate_title()
         self.view.expandable = True
-        
-        self.update_children()
+        # NOTE: Members are not listed until this node is first expanded,
+        #       so that opening a project doesn't need to load every member
+        #       of every group.
+        # Workaround for: http://trac.wxwidgets.org/ticket/13886
+        self.children = [_LoadingNode()]
+        self._did_expand = False
     
     def calculate_title(self):
         project = self.resource_group.project
@@ -507,7 +542,16 @@ class ResourceGroupNode(Node):
     def entity(self):
         return self.resource_group
     
+    def on_expanded(self, event):
+        if not self._did_expand:
+            self._did_expand = True
+            self.update_children()
+    
     def update_children(self) -> None:
+        if not self._did_expand:
+            # We were never expanded, so no need to recalculate anything.
+            return
+        
         children_rrs = []  # type: List[Node]
         children_rs = []  # type: List[Node]
         project = self.resource_group.project
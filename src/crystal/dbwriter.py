@@ -0,0 +1,280 @@
+"""
+Performs writes to a project's SQLite database on a dedicated background thread.
+
+Each write is executed as soon as the writer thread is free, inside a
+transaction that stays open briefly so that writes submitted in quick
+succession, from any thread, are committed together ("group commit"),
+which is much faster than committing each write individually.
+
+Callers wait at most for their write to be executed, never for it to be
+committed, unless they explicitly flush the writer or wait to read
+their own writes.
+"""
+
+from crystal.xfutures import Future
+from crystal.xthreading import bg_call_later
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+# Maximum number of writes to commit in a single transaction
+_MAX_BATCH_SIZE = 1000
+
+# Maximum time that a transaction stays open for other writes to join it,
+# unless a flush is requested
+_MAX_BATCH_DELAY = 0.002  # secs
+
+_WriteUnit = Callable[[sqlite3.Cursor], Any]
+
+class DatabaseWriter(object):
+    """
+    Owns the only connection to a SQLite database that is allowed to write.
+    
+    Other connections see a write only after it has been committed,
+    which is usually within a few milliseconds of it being executed.
+    
+    All methods are threadsafe.
+    """
+    
+    def __init__(self, connect: Callable[[], sqlite3.Connection]) -> None:
+        """
+        Arguments:
+        connect -- opens a new connection to the database.
+                   Will be called on the writer thread.
+        """
+        self._connect = connect
+        self._condition = threading.Condition()
+        self._pending = []  # type: List[Tuple[_WriteUnit, Future, float]]
+        # Whether a caller is waiting for all scheduled writes to be committed
+        self._flush_requested = False
+        # First error from committing a transaction that has not yet been
+        # raised by flush() or close()
+        self._commit_error = None  # type: Optional[BaseException]
+        # Number of writes scheduled so far, and number of those whose
+        # transaction was committed or rolled back. Writes end in the
+        # order they were scheduled.
+        self._scheduled_count = 0
+        self._ended_count = 0
+        # Number of writes scheduled when the current thread last scheduled a write
+        self._thread_state = threading.local()
+        # Completes when the current transaction is committed or rolled back.
+        # Only accessed on the writer thread.
+        self._transaction_did_end = Future()  # type: Future
+        self._closing = False
+        self._closed = Future()  # type: Future
+        
+        started = Future()  # type: Future
+        bg_call_later(lambda: self._run(started), daemon=True)
+        started.result()  # reraise any error from connecting
+    
+    # === Operations ===
+    
+    def execute(self, sql: str, parameters=()) -> Future:
+        """
+        Schedules the specified statement to be executed and committed.
+        
+        Returns a Future that receives the rowid of the last inserted row
+        (if applicable) after the statement has been executed.
+        The statement is committed shortly afterwards.
+        """
+        def unit(c: sqlite3.Cursor) -> Optional[int]:
+            c.execute(sql, parameters)
+            return c.lastrowid
+        return self.call(unit)
+    
+    def call(self, unit: _WriteUnit) -> Future:
+        """
+        Schedules the specified callable to be called on the writer thread
+        with a cursor, and any changes it makes to be committed.
+        
+        If the callable raises then none of the changes it made will be
+        committed, but changes made by other callables in the same
+        transaction will be unaffected.
+        
+        Returns a Future that receives the result of the callable as soon as
+        it returns. Its changes are committed shortly afterwards, together
+        with any other writes scheduled around the same time. Use `flush()`
+        to wait until they are committed.
+        """
+        return self._schedule(unit, flush=False)
+    
+    def flush(self) -> None:
+        """
+        Commits all previously scheduled writes, without waiting for other
+        writes to join their transaction, and waits until they are committed.
+        
+        Raises:
+        sqlite3.Error -- if any transaction failed to commit since the last
+                         call to flush(). The writes in that transaction were lost.
+        """
+        transaction_did_end = self._schedule(
+            lambda c: self._transaction_did_end, flush=True
+        ).result()  # type: Future
+        transaction_did_end.result()
+        self._raise_commit_error()
+    
+    def wait_for_own_writes(self) -> None:
+        """
+        Waits until all writes scheduled by the current thread are committed,
+        so that other connections opened by the current thread can read them.
+        
+        Returns immediately if they are committed already, which is the usual
+        case, so is cheap enough to call before every read.
+        """
+        scheduled_count = getattr(self._thread_state, 'scheduled_count', 0)
+        with self._condition:
+            if self._ended_count >= scheduled_count:
+                return
+            self._flush_requested = True
+            self._condition.notify_all()
+            while self._ended_count < scheduled_count:
+                self._condition.wait()
+    
+    def close(self) -> None:
+        """
+        Commits all previously scheduled writes and stops the writer thread.
+        
+        Raises:
+        sqlite3.Error -- if any transaction failed to commit since the last
+                         call to flush(). The writes in that transaction were lost.
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._closed.result()
+        self._raise_commit_error()
+    
+    def _schedule(self, unit: _WriteUnit, *, flush: bool) -> Future:
+        future = Future()  # type: Future
+        with self._condition:
+            if self._closing:
+                raise ValueError('DatabaseWriter is closed.')
+            self._pending.append((unit, future, time.monotonic()))
+            self._scheduled_count += 1
+            self._thread_state.scheduled_count = self._scheduled_count
+            if flush:
+                self._flush_requested = True
+            # NOTE: Threads in wait_for_own_writes() wait on the same condition
+            self._condition.notify_all()
+        return future
+    
+    def _raise_commit_error(self) -> None:
+        with self._condition:
+            commit_error = self._commit_error
+            self._commit_error = None
+        if commit_error is not None:
+            raise commit_error
+    
+    # === Writer Thread ===
+    
+    def _run(self, started: Future) -> None:
+        try:
+            db = self._connect()
+            db.isolation_level = None  # manage transactions explicitly
+            db.execute('pragma synchronous=normal')
+        except BaseException as e:
+            started.set_exception(e)
+            return
+        started.set_result(None)
+        
+        try:
+            while self._wait_for_writes():
+                self._run_transaction(db)
+        finally:
+            db.close()
+            self._closed.set_result(None)
+    
+    def _wait_for_writes(self) -> bool:
+        """
+        Waits for writes to be scheduled, returning False instead
+        if the writer is closed and has no more writes.
+        """
+        with self._condition:
+            while len(self._pending) == 0:
+                if self._closing:
+                    return False
+                self._condition.wait()
+            return True
+    
+    def _run_transaction(self, db: sqlite3.Connection) -> None:
+        """
+        Executes scheduled writes as they arrive, in a single transaction,
+        and commits the transaction once it is full, once its first write
+        was scheduled `_MAX_BATCH_DELAY` ago, or once a flush or close
+        is requested.
+        """
+        with self._condition:
+            (_, _, first_submit_time) = self._pending[0]
+        deadline = first_submit_time + _MAX_BATCH_DELAY
+        
+        c = db.cursor()
+        writes = self._take_writes(_MAX_BATCH_SIZE, deadline)
+        taken = [future for (_, future, _) in writes]  # type: List[Future]
+        try:
+            c.execute('begin')
+            while True:
+                for (unit, future, _) in writes:
+                    self._execute(c, unit, future)
+                if len(taken) >= _MAX_BATCH_SIZE or time.monotonic() >= deadline:
+                    break
+                writes = self._take_writes(_MAX_BATCH_SIZE - len(taken), deadline)
+                if len(writes) == 0:
+                    break
+                taken.extend(future for (_, future, _) in writes)
+            
+            with self._condition:
+                if len(self._pending) == 0:
+                    # (Any flush is waiting on a write in this transaction)
+                    self._flush_requested = False
+            c.execute('commit')
+        except BaseException as e:
+            if db.in_transaction:
+                db.rollback()
+            for future in taken:
+                if not future.done():
+                    future.set_exception(e)
+            with self._condition:
+                if self._commit_error is None:
+                    self._commit_error = e
+        finally:
+            with self._condition:
+                self._ended_count += len(taken)
+                self._condition.notify_all()
+            self._transaction_did_end.set_result(None)
+            self._transaction_did_end = Future()
+    
+    def _take_writes(self,
+            max_count: int,
+            deadline: float) -> List[Tuple[_WriteUnit, Future, float]]:
+        """
+        Waits for more writes to be scheduled and takes up to `max_count` of them,
+        or returns an empty list if the current transaction should be committed.
+        """
+        with self._condition:
+            while (len(self._pending) == 0 and
+                    not self._closing and
+                    not self._flush_requested):
+                remaining_delay = deadline - time.monotonic()
+                if remaining_delay <= 0:
+                    break
+                self._condition.wait(remaining_delay)
+            
+            writes = self._pending[:max_count]
+            del self._pending[:max_count]
+            return writes
+    
+    @staticmethod
+    def _execute(c: sqlite3.Cursor, unit: _WriteUnit, future: Future) -> None:
+        # Isolate each unit in a savepoint so that a failing unit
+        # doesn't roll back other units in the same transaction
+        c.execute('savepoint unit')
+        try:
+            result = unit(c)
+        except BaseException as e:
+            c.execute('rollback to unit')
+            c.execute('release unit')
+            future.set_exception(e)
+        else:
+            c.execute('release unit')
+            future.set_result(result)
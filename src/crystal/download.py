@@ -4,10 +4,14 @@ Provides services for downloading a ResourceRevision.
 
 from collections import defaultdict
 from crystal import __version__
+from crystal.hostrate import parse_retry_after
 from crystal.model import ResourceRevision, ResourceRevisionMetadata
+from crystal.urls import split_url_host
 from http.client import HTTPConnection, HTTPSConnection
 import platform
 import ssl
+import time
+from typing import Optional
 import urllib.error
 import urllib.request
 from urllib.parse import urlparse
@@ -24,16 +28,51 @@ def download_resource_revision(resource, progress_listener):
     resource -- the resource to download.
     progress_listener -- the DownloadResourceBodyTask that progress updates will be sent to.
     """
+    host_rates = resource.project.host_rates
+    (url_host, _) = split_url_host(resource.url)
     try:
-        progress_listener.subtitle = 'Waiting for response...'
-        (metadata, body_stream) = ResourceRequest.create(resource.url)()
+        rate_description = host_rates.describe(url_host)
+        progress_listener.subtitle = (
+            'Waiting for response...'
+            if rate_description is None
+            else 'Waiting for response (%s)...' % rate_description
+        )
+        request = ResourceRequest.create(resource.url)
+        start_time = time.monotonic()
+        try:
+            (metadata, body_stream) = request()
+        except Exception:
+            host_rates.record_failure(url_host)
+            raise
+        host_rates.record_response(
+            url_host,
+            latency=time.monotonic() - start_time,
+            status_code=(metadata['status_code'] if metadata is not None else None),
+            retry_after=_retry_after_of(metadata))
         
         # TODO: Provide incremental feedback such as '7 KB of 15 KB'
-        progress_listener.subtitle = 'Receiving response...'
+        rate_description = host_rates.describe(url_host)
+        progress_listener.subtitle = (
+            'Receiving response...'
+            if rate_description is None
+            else 'Receiving response (%s)...' % rate_description
+        )
         return ResourceRevision.create_from_response(resource, metadata, body_stream)
     except Exception as error:
         return ResourceRevision.create_from_error(resource, error)
 
+def _retry_after_of(metadata) -> Optional[float]:
+    """
+    Returns the number of seconds that a response asked clients to wait
+    before retrying, from its Retry-After header, or None.
+    """
+    if metadata is None:
+        return None
+    for (name, value) in metadata['headers']:
+        if name.lower() == 'retry-after':
+            return parse_retry_after(value)
+    return None
+
 class ResourceRequest(object):
     """
     Encapsulates a request to fetch a resource.
@@ -0,0 +1,261 @@
+"""
+Adapts how quickly resources are downloaded from each host
+to how that host responds.
+"""
+
+from email.utils import parsedate_to_datetime
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# Amount by which a host's delay shrinks after each healthy response
+_DELAY_DECREASE = 0.1  # secs
+
+# Factor by which a host's delay grows after a response suggesting
+# that the host is overloaded
+_DELAY_INCREASE_FACTOR = 2.0
+
+# Delay that a host with little or no delay backs off to when overloaded
+_MIN_BACKOFF_DELAY = 0.5  # secs
+
+# Longest delay that a host backs off to, and longest Retry-After honored
+_MAX_DELAY = 60.0  # secs
+_MAX_RETRY_AFTER = 60 * 60  # secs
+
+# Weight of each new latency in a host's smoothed latency
+_LATENCY_SMOOTHING = 0.2
+
+# A response is considered slow, suggesting that the host is overloaded,
+# if its latency is at least this many times the host's lowest smoothed
+# latency and is also at least _SLOW_LATENCY_MIN
+_SLOW_LATENCY_RATIO = 3.0
+_SLOW_LATENCY_MIN = 0.5  # secs
+
+# HTTP status codes that a host uses to ask clients to slow down
+_OVERLOADED_STATUS_CODES = (429, 503)  # Too Many Requests, Service Unavailable
+
+
+def parse_retry_after(value: str) -> Optional[float]:
+    """
+    Parses the value of an HTTP Retry-After header, which is either a number
+    of seconds or an HTTP date, returning the number of seconds to wait,
+    or None if the value is malformed.
+    """
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_datetime = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_datetime.tzinfo is None:
+        return None
+    return max(0.0, retry_datetime.timestamp() - time.time())
+
+
+class _HostRate(object):
+    __slots__ = (
+        'delay',
+        'min_delay',
+        'concurrency',
+        'latency',
+        'min_latency',
+        'retry_time',
+    )
+    
+    def __init__(self, initial_delay: float, min_delay: float) -> None:
+        # Seconds to wait after each request before the next one
+        self.delay = initial_delay
+        self.min_delay = min_delay
+        # Number of requests allowed at once, as a float so that it can
+        # grow by fractions of a request
+        self.concurrency = 1.0
+        # Smoothed latency, and its lowest value so far
+        self.latency = None  # type: Optional[float]
+        self.min_latency = None  # type: Optional[float]
+        # time.monotonic() before which the host asked not to be requested
+        self.retry_time = 0.0
+
+
+class HostRateController(object):
+    """
+    Tracks how quickly each host may be requested, adapting the rate
+    using additive-increase/multiplicative-decrease (AIMD):
+    
+    * After each healthy response, the host's delay between requests shrinks
+      by a fixed amount. Once the delay reaches its minimum, the number of
+      requests allowed at once slowly grows instead.
+    * After each response suggesting that the host is overloaded -
+      HTTP 429 or 503, a failed request, or a latency far above the host's
+      usual latency - the delay doubles and the number of requests allowed
+      at once halves.
+    * A Retry-After header pauses requests to the host until the time it names.
+    
+    Threadsafe.
+    """
+    
+    def __init__(self,
+            configured_delay_for_host: Callable[[str], Tuple[float, float]],
+            *, max_concurrency: int=1) -> None:
+        """
+        Arguments:
+        configured_delay_for_host -- a function that returns the
+            (initial delay, minimum delay) of a host, such as 'https://example.com'.
+            Called when the host is first requested and after `reset`.
+        max_concurrency -- the most requests that a host is ever allowed at once.
+        """
+        self._configured_delay_for_host = configured_delay_for_host
+        self._max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._rate_for_host = {}  # type: Dict[str, _HostRate]
+    
+    def _rate(self, url_host: str) -> _HostRate:
+        # NOTE: Caller must hold self._lock
+        rate = self._rate_for_host.get(url_host)
+        if rate is None:
+            (initial_delay, min_delay) = self._configured_delay_for_host(url_host)
+            rate = self._rate_for_host[url_host] = _HostRate(
+                max(initial_delay, min_delay), min_delay)
+        return rate
+    
+    def delay_for(self, url_host: str) -> float:
+        """
+        Returns the number of seconds to wait after a request to the
+        specified host finishes before making another request to it.
+        """
+        with self._lock:
+            rate = self._rate(url_host)
+            return max(rate.delay, rate.retry_time - time.monotonic())
+    
+    def concurrency_for(self, url_host: str) -> int:
+        """
+        Returns the number of requests that may be made to the specified
+        host at once.
+        """
+        with self._lock:
+            return int(self._rate(url_host).concurrency)
+    
+    def record_response(self,
+            url_host: str,
+            latency: float,
+            status_code: Optional[int]=None,
+            retry_after: Optional[float]=None) -> None:
+        """
+        Adapts the rate of the specified host to a response from it.
+        
+        Arguments:
+        url_host -- the host that was requested.
+        latency -- the number of seconds until the response began.
+        status_code -- the HTTP status code of the response,
+                       or None if the response has no status code.
+        retry_after -- the number of seconds that the response asked
+                       clients to wait before retrying, or None.
+        """
+        with self._lock:
+            rate = self._rate(url_host)
+            
+            overloaded = (
+                status_code in _OVERLOADED_STATUS_CODES or (
+                    rate.min_latency is not None and
+                    latency >= _SLOW_LATENCY_MIN and
+                    latency >= rate.min_latency * _SLOW_LATENCY_RATIO
+                )
+            )
+            rate.latency = (
+                latency if rate.latency is None
+                else rate.latency + (latency - rate.latency) * _LATENCY_SMOOTHING
+            )
+            if rate.min_latency is None or rate.latency < rate.min_latency:
+                rate.min_latency = rate.latency
+            
+            if overloaded:
+                self._slow_down(rate)
+            else:
+                self._speed_up(rate)
+            
+            if retry_after is not None:
+                rate.retry_time = max(
+                    rate.retry_time,
+                    time.monotonic() + min(retry_after, _MAX_RETRY_AFTER))
+    
+    def record_failure(self, url_host: str) -> None:
+        """
+        Adapts the rate of the specified host to a request to it that failed
+        without a response, such as because the connection timed out.
+        """
+        with self._lock:
+            self._slow_down(self._rate(url_host))
+    
+    def _slow_down(self, rate: _HostRate) -> None:
+        # Multiplicative decrease
+        rate.delay = min(
+            max(rate.delay * _DELAY_INCREASE_FACTOR, _MIN_BACKOFF_DELAY, rate.min_delay),
+            max(_MAX_DELAY, rate.min_delay))
+        rate.concurrency = max(1.0, rate.concurrency / 2)
+    
+    def _speed_up(self, rate: _HostRate) -> None:
+        # Additive increase
+        if rate.delay > rate.min_delay:
+            rate.delay = max(rate.min_delay, rate.delay - _DELAY_DECREASE)
+        else:
+            rate.concurrency = min(
+                rate.concurrency + 1 / rate.concurrency,
+                float(self._max_concurrency))
+    
+    def reset(self, url_host: Optional[str]=None) -> None:
+        """
+        Forgets what has been learned about the specified host,
+        or about all hosts if None, so that its configured delay is used again.
+        """
+        with self._lock:
+            if url_host is None:
+                self._rate_for_host.clear()
+            else:
+                self._rate_for_host.pop(url_host, None)
+    
+    def describe(self, url_host: str) -> Optional[str]:
+        """
+        Returns a short description of the current rate of the specified host,
+        such as '2.5 req/s', or None if the host has not responded yet.
+        """
+        with self._lock:
+            described = self._describe(self._rate_for_host.get(url_host), time.monotonic())
+        return described[1] if described is not None else None
+    
+    def describe_slowest(self, url_hosts: Iterable[str]) -> Optional[str]:
+        """
+        Returns a short description of the current rate of the slowest of the
+        specified hosts, such as 'slowest of 3 hosts: 0.5 req/s', or None if
+        none of the hosts has responded yet. A paused host is the slowest.
+        """
+        url_hosts = list(url_hosts)
+        slowest = None  # type: Optional[Tuple[float, str]]
+        with self._lock:
+            now = time.monotonic()
+            for url_host in url_hosts:
+                described = self._describe(self._rate_for_host.get(url_host), now)
+                if described is not None and (slowest is None or described[0] < slowest[0]):
+                    slowest = described
+        if slowest is None:
+            return None
+        if len(url_hosts) == 1:
+            return slowest[1]
+        return 'slowest of %d hosts: %s' % (len(url_hosts), slowest[1])
+    
+    @staticmethod
+    def _describe(rate: Optional[_HostRate], now: float) -> Optional[Tuple[float, str]]:
+        """
+        Returns the requests per second of the specified host rate, which is
+        negative if the host is paused, along with a short description of it.
+        """
+        if rate is None or rate.latency is None:
+            return None
+        retry_delay = rate.retry_time - now
+        if retry_delay > 0:
+            return (-retry_delay, 'paused %ds' % math.ceil(retry_delay))
+        seconds_per_request = rate.delay + rate.latency
+        if seconds_per_request <= 0:
+            return None
+        requests_per_second = int(rate.concurrency) / seconds_per_request
+        return (requests_per_second, '%.1f req/s' % requests_per_second)
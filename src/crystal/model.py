@@ -4,27 +4,50 @@ Persistent data model.
 Unless otherwise specified, all changes to models are auto-saved.
 [TODO: Encapsulate read-only properties.]
 
-Model objects may only be manipulated on the foreground thread.
-Callers that attempt to do otherwise may get thrown `ProgrammingError`s.
+Model objects may only be manipulated on the foreground thread,
+unless documented as threadsafe. Callers that attempt to do otherwise
+may get thrown `ProgrammingError`s.
+
+All writes to a project's database are performed by its `DatabaseWriter`,
+which commits them on a dedicated background thread.
 """
 
 from __future__ import annotations
 
 from collections import OrderedDict
+from contextlib import nullcontext
 from crystal.plugins import phpbb
+from crystal.bodystore import (
+    ContentAddressedRevisionBodyStore, FlatRevisionBodyStore,
+    MemoryRevisionBodyStore, open_decoded, PackedRevisionBodyStore,
+    RevisionBodyStore,
+)
+from crystal.dbwriter import DatabaseWriter
+from crystal.hostrate import HostRateController
 from crystal.progress import DummyOpenProjectProgressListener, OpenProjectProgressListener
-from crystal.urls import is_unrewritable_url, requote_uri
+from crystal.urlmatcher import literal_prefix_of, UrlPatternMatcher
+from crystal.urls import CompactUrlDict, is_unrewritable_url, requote_uri, split_url_host
+from crystal.xcollections import bitset, lrucache, simpleorderedset
 from crystal.xfutures import Future
-from crystal.xthreading import bg_call_later, fg_call_and_wait
+from crystal.xthreading import bg_call_later, ReadWriteLock
 import cgi
+import gzip
 import json
 import mimetypes
 import os
 import re
 import shutil
 import sqlite3
-from typing import cast, Dict, List, Optional, TYPE_CHECKING, TypedDict, Union
+import threading
+import time
+from typing import (
+    BinaryIO, cast, ContextManager, Dict, Iterable, Iterator, List, Optional,
+    Set, Tuple, TYPE_CHECKING, TypedDict, Union,
+)
 from urllib.parse import urlparse, urlunparse
+from urllib.request import pathname2url
+import uuid
+import weakref
 
 if TYPE_CHECKING:
     from crystal.doc.generic import Document, Link
@@ -42,47 +65,201 @@ class Project(object):
     _DB_FILENAME = 'database.sqlite'
     _RESOURCE_REVISION_DIRNAME = 'revisions'
     
+    # Layouts for revision bodies inside the revisions directory:
+    # * FLAT stores each body in its own file, named after its revision.
+    # * CONTENT_ADDRESSED stores each distinct body only once, in a file
+    #   named after its SHA-256 hash, shared by all revisions with that body.
+    # * PACKED appends each body to a large, append-only segment file.
+    REVISION_BODY_LAYOUT_FLAT = 'flat'
+    REVISION_BODY_LAYOUT_CONTENT_ADDRESSED = 'sha256'
+    REVISION_BODY_LAYOUT_PACKED = 'pack'
+    _REVISION_BODY_LAYOUTS = [
+        REVISION_BODY_LAYOUT_FLAT,
+        REVISION_BODY_LAYOUT_CONTENT_ADDRESSED,
+        REVISION_BODY_LAYOUT_PACKED,
+    ]
+    
+    # Compression modes for newly stored revision bodies
+    REVISION_BODY_COMPRESSION_NONE = 'none'
+    REVISION_BODY_COMPRESSION_GZIP = 'gzip'
+    _REVISION_BODY_COMPRESSIONS = [REVISION_BODY_COMPRESSION_NONE, REVISION_BODY_COMPRESSION_GZIP]
+    
+    # Projects with more than this many resources are opened in lazy mode
+    # unless the caller specifies otherwise
+    _LAZY_RESOURCE_COUNT_THRESHOLD = 100_000
+    
+    # Maximum number of recently used Resources that a lazy project keeps
+    # alive even when they are not referenced elsewhere
+    _LAZY_RESOURCE_CACHE_SIZE = 10_000
+    
+    # Maximum number of default ResourceRevisions, and their approximate
+    # total size in bytes, that are kept in memory to avoid reloading them
+    _DEFAULT_REVISION_CACHE_SIZE = 2_000
+    _DEFAULT_REVISION_CACHE_BYTES = 8 * 1024 * 1024
+    
+    # Maximum number of URLs whose alternative normalized forms are kept
+    # in memory to avoid reparsing URLs that are linked from many pages
+    _URL_ALTERNATIVES_CACHE_SIZE = 20_000
+    
+    # Maximum number of recently used Resources whose containing
+    # ResourceGroups are kept in memory
+    _GROUPS_FOR_RESOURCE_CACHE_SIZE = 10_000
+    
+    # Default number of seconds to wait after downloading a resource
+    # before requesting another resource from the same host
+    _DEFAULT_DOWNLOAD_DELAY = 1.0
+    
+    # Columns of resource_revision that summarize a revision's metadata and
+    # body, so that they can be queried without decoding metadata or
+    # opening body files
+    _REVISION_SUMMARY_COLUMNS = [
+        ('status_code', 'integer'),
+        ('content_type', 'text'),
+        ('charset', 'text'),
+        ('has_body', 'integer not null default 0'),
+        ('body_size', 'integer'),
+        ('fetch_time', 'real'),
+    ]
+    # Columns of resource_revision that describe how a revision's body is stored
+    _REVISION_STORAGE_COLUMNS = [
+        ('body_hash', 'text'),  # if content-addressed
+        ('body_encoding', 'text'),  # if compressed
+        ('body_segment', 'integer'),  # if packed
+        ('body_offset', 'integer'),  # if packed
+        ('body_length', 'integer'),  # if packed; length as stored, after any encoding
+    ]
+    _INDEXED_REVISION_SUMMARY_COLUMNS = ['status_code', 'content_type', 'body_size', 'fetch_time']
+    
     def __init__(self,
             path: str,
-            progress_listener: Optional[OpenProjectProgressListener]=None) -> None:
+            progress_listener: Optional[OpenProjectProgressListener]=None,
+            *, lazy: Optional[bool]=None,
+            in_memory: bool=False,
+            compact_urls: bool=False,
+            max_download_workers: int=4,
+            max_download_workers_per_host: int=1) -> None:
         """
         Loads a project from the specified filepath, or creates a new one if none is found.
         
         Arguments:
         path -- path to a directory (ideally with the `FILE_EXTENSION` extension)
                 from which the project is to be loaded.
+        lazy -- whether to load Resources from the database on demand rather than
+                all at once when the project is opened. If None then lazy mode
+                is used only for projects with a large number of resources.
+        in_memory -- whether to create a new project that is kept entirely in memory
+                     and never persisted, which is useful for benchmarks and tests.
+                     If True then `path` is used only as the project's title.
+        compact_urls -- whether to store the scheme and host shared by many
+                        Resource URLs only once in memory, rather than once
+                        per Resource. Reduces memory use in projects with many
+                        Resources, at the cost of building each Resource's URL
+                        whenever it is accessed. Has no effect in lazy mode.
+        max_download_workers -- the maximum number of resources downloaded at once.
+        max_download_workers_per_host -- the maximum number of resources downloaded
+                                         at once from the same host.
         """
         if progress_listener is None:
             progress_listener = DummyOpenProjectProgressListener()
         
         self.path = path
         self.listeners = []  # type: List[object]
+        self._compact_urls = compact_urls
+        
+        # Guards the in-memory indexes below, which may be read from any thread
+        self._index_lock = ReadWriteLock()
         
         self._properties = dict()               # type: Dict[str, str]
         self._resources = OrderedDict()         # type: Dict[str, Resource]
+        self._resources_by_id = dict()          # type: Dict[int, Resource]
         self._root_resources = OrderedDict()    # type: Dict[Resource, RootResource]
+        self._root_resources_by_id = dict()     # type: Dict[int, RootResource]
+        self._root_resources_by_name = dict()   # type: Dict[str, RootResource]
         self._resource_groups = []              # type: List[ResourceGroup]
+        self._resource_groups_by_id = dict()    # type: Dict[int, ResourceGroup]
+        self._resource_groups_by_name = dict()  # type: Dict[str, ResourceGroup]
+        # Matches URLs against the url_pattern of every ResourceGroup at once
+        self._resource_group_matcher = UrlPatternMatcher()  # type: UrlPatternMatcher[ResourceGroup]
+        # Groups that contain recently used Resources, by Resource ID, filled on demand
+        self._groups_for_resource = lrucache(self._GROUPS_FOR_RESOURCE_CACHE_SIZE)  # type: lrucache
+        # IDs of Resources that have at least one ResourceRevision
+        self._resources_with_revisions = bitset()
+        # Default ResourceRevisions of recently used Resources, by Resource ID
+        self._default_revisions = lrucache(
+            self._DEFAULT_REVISION_CACHE_SIZE,
+            maxweight=self._DEFAULT_REVISION_CACHE_BYTES,
+            weigh=ResourceRevision._estimated_size)
+        # Incremented whenever any ResourceRevision is created or deleted
+        self._revision_generation = 0
+        # Results of Resource.resource_url_alternatives, by original URL
+        self._url_alternatives = lrucache(self._URL_ALTERNATIVES_CACHE_SIZE)  # type: lrucache
+        # Download delays configured for particular hosts
+        self._download_delay_for_host = dict()  # type: Dict[str, float]
+        # Current download rate of each host, adapted to how it responds
+        self.host_rates = HostRateController(
+            self._configured_delay_for_host,
+            max_concurrency=max_download_workers_per_host)
+        
+        # Stores of revision bodies, by layout
+        self._in_memory = in_memory
+        if in_memory:
+            self._db_uri = 'file:crystal-%s?mode=memory&cache=shared' % uuid.uuid4().hex
+            memory_body_store = MemoryRevisionBodyStore(self)
+            self._body_stores = {
+                layout: memory_body_store
+                for layout in self._REVISION_BODY_LAYOUTS
+            }  # type: Dict[str, RevisionBodyStore]
+        else:
+            self._body_stores = {
+                self.REVISION_BODY_LAYOUT_FLAT: FlatRevisionBodyStore(self),
+                self.REVISION_BODY_LAYOUT_CONTENT_ADDRESSED: ContentAddressedRevisionBodyStore(self),
+                self.REVISION_BODY_LAYOUT_PACKED: PackedRevisionBodyStore(self),
+            }
         
         progress_listener.opening_project(os.path.basename(path))
         
         self._loading = True
         try:
-            if os.path.exists(path):
+            if not in_memory and os.path.exists(path):
                 if not Project.is_valid(path):
                     raise ProjectFormatError('Project format is invalid.')
                 
                 # Load from existing project
-                self._db = sqlite3.connect(os.path.join(path, self._DB_FILENAME))
+                self._db = self._connect_db()
+                self._db_thread_id = threading.get_ident()
                 
                 c = self._db.cursor()
                 
+                self._migrate_revision_summary_columns(c, progress_listener)
+                self._migrate_revision_storage_columns(c)
+                self._migrate_resource_group_members(c)
+                self._migrate_resource_url_search_index(c, progress_listener)
+                self._migrate_resource_hosts(c, progress_listener)
+                self._migrate_download_delays(c)
+                
                 for (name, value) in c.execute('select name, value from project_property'):
                     self._set_property(name, value)
                 
-                [(resource_count,)] = c.execute('select count(1) from resource')
-                progress_listener.loading_resources(resource_count)
-                for (url, id) in c.execute('select url, id from resource'):
-                    Resource(self, url, _id=id)
+                for (url_host, download_delay) in c.execute('select url_host, download_delay from host where download_delay is not null'):
+                    self._download_delay_for_host[url_host] = download_delay
+                
+                if lazy is None:
+                    # NOTE: Cost is bounded by the threshold rather than
+                    #       proportional to the total number of resources
+                    lazy = c.execute(
+                        'select 1 from resource limit 1 offset ?',
+                        (self._LAZY_RESOURCE_COUNT_THRESHOLD,)
+                    ).fetchone() is not None
+                self._init_resource_cache(lazy)
+                
+                if lazy:
+                    # (Resources are loaded on demand)
+                    pass
+                else:
+                    [(resource_count,)] = c.execute('select count(1) from resource')
+                    progress_listener.loading_resources(resource_count)
+                    for (url, id) in c.execute('select url, id from resource'):
+                        Resource(self, url, _id=id)
                 
                 [(root_resource_count,)] = c.execute('select count(1) from root_resource')
                 progress_listener.loading_root_resources(root_resource_count)
@@ -93,10 +270,12 @@ class Project(object):
                 [(resource_group_count,)] = c.execute('select count(1) from resource_group')
                 progress_listener.loading_resource_groups(resource_group_count)
                 group_2_source = {}
-                for (index, (name, url_pattern, source_type, source_id, id)) in enumerate(c.execute(
-                        'select name, url_pattern, source_type, source_id, id from resource_group')):
+                for (index, (name, url_pattern, source_type, source_id, id, member_url_pattern, download_delay)) in enumerate(c.execute(
+                        'select name, url_pattern, source_type, source_id, id, member_url_pattern, download_delay from resource_group').fetchall()):
                     progress_listener.loading_resource_group(index)
-                    group = ResourceGroup(self, name, url_pattern, _id=id)
+                    group = ResourceGroup(self, name, url_pattern, _id=id,
+                        _members_persisted=(member_url_pattern == url_pattern),
+                        _download_delay=download_delay)
                     group_2_source[group] = (source_type, source_id)
                 for (group, (source_type, source_id)) in group_2_source.items():
                     if source_type is None:
@@ -109,34 +288,385 @@ class Project(object):
                         raise ProjectFormatError('Resource group %s has invalid source type "%s".' % (group._id, source_type))
                     group._init_source(source_obj)
                 
+                # NOTE: Uses the resource_revision__resource_id index
+                self._resources_with_revisions = bitset(
+                    resource_id for (resource_id,) in
+                    c.execute('select distinct resource_id from resource_revision'))
+                
                 # (ResourceRevisions are loaded on demand)
             else:
                 # Create new project
-                os.mkdir(path)
-                os.mkdir(os.path.join(path, self._RESOURCE_REVISION_DIRNAME))
-                self._db = sqlite3.connect(os.path.join(path, self._DB_FILENAME))
+                self._init_resource_cache(lazy or False)
+                if not in_memory:
+                    os.mkdir(path)
+                    os.mkdir(os.path.join(path, self._RESOURCE_REVISION_DIRNAME))
+                self._db = self._connect_db()
+                self._db_thread_id = threading.get_ident()
                 
                 c = self._db.cursor()
                 c.execute('create table project_property (name text unique not null, value text)')
                 progress_listener.loading_resources(resource_count=0)
-                c.execute('create table resource (id integer primary key, url text unique not null)')
+                c.execute('create table resource (id integer primary key, url text unique not null, host_id integer)')
+                self._create_host_table(c)
                 progress_listener.loading_root_resources(root_resource_count=0)
                 c.execute('create table root_resource (id integer primary key, name text not null, resource_id integer unique not null, foreign key (resource_id) references resource(id))')
                 progress_listener.loading_resource_groups(resource_group_count=0)
-                c.execute('create table resource_group (id integer primary key, name text not null, url_pattern text not null, source_type text, source_id integer)')
-                c.execute('create table resource_revision (id integer primary key, resource_id integer not null, error text not null, metadata text not null)')
+                c.execute('create table resource_group (id integer primary key, name text not null, url_pattern text not null, source_type text, source_id integer, member_url_pattern text, download_delay real)')
+                c.execute('create table resource_revision (id integer primary key, resource_id integer not null, error text not null, metadata text not null, %s)' % (
+                    ', '.join(' '.join(column) for column in self._REVISION_SUMMARY_COLUMNS + self._REVISION_STORAGE_COLUMNS)))
                 c.execute('create index resource_revision__resource_id on resource_revision (resource_id)')
+                self._create_revision_summary_indexes(c)
+                self._create_revision_body_table(c)
+                self._create_resource_group_member_table(c)
+                self._has_url_search_index = self._create_resource_url_search_index(c)
+            
+            if not in_memory:
+                # Allow the foreground thread to read while the writer thread is writing
+                self._db.execute('pragma journal_mode=wal')
         finally:
             self._loading = False
         
+        # Hold on to the database writer
+        self._db_writer = DatabaseWriter(self._connect_db)
+        
+        # Hold on to the read-only database connections of background threads
+        self._read_dbs = threading.local()
+        self._read_dbs_lock = threading.Lock()
+        self._read_db_for_thread = {}  # type: Dict[threading.Thread, sqlite3.Connection]
+        self._closed = False
+        
+        # Persist the membership of any group whose url_pattern changed since it was last persisted
+        for rg in self._resource_groups:
+            if not rg._members_persisted:
+                rg._persist_members_later()
+        
         # Hold on to the root task and scheduler
         import crystal.task
         self.root_task = crystal.task.RootTask()
-        crystal.task.start_schedule_forever(self.root_task)
+        self._scheduler = crystal.task.Scheduler(
+            self.root_task,
+            max_workers=max_download_workers,
+            max_workers_per_host=max_download_workers_per_host,
+            host_rates=self.host_rates)
+        self._scheduler.start()
         
         # Hold on to the server connection
         self.server_running = False
     
+    def _init_resource_cache(self, lazy: bool) -> None:
+        self._lazy = lazy
+        self._compact_urls = self._compact_urls and not lazy
+        if self._compact_urls:
+            self._resources = CompactUrlDict()  # type: ignore[assignment]
+        if lazy:
+            # Track only Resources that are alive, plus a bounded set of
+            # recently used Resources, so that lookups of the same URL
+            # continue to return the same Resource object
+            self._resources = weakref.WeakValueDictionary()  # type: ignore[assignment]
+            self._resources_by_id = weakref.WeakValueDictionary()  # type: ignore[assignment]
+            self._recent_resources = lrucache(self._LAZY_RESOURCE_CACHE_SIZE)
+    
+    @property
+    def _db_filepath(self) -> str:
+        return os.path.join(self.path, self._DB_FILENAME)
+    
+    def _connect_db(self, *, read_only: bool=False) -> sqlite3.Connection:
+        """
+        Opens a new connection to this project's database.
+        
+        Threadsafe.
+        """
+        if self._in_memory:
+            # NOTE: All connections to the same shared-cache in-memory database
+            #       share table locks. Allow reads to proceed while the writer
+            #       thread holds a write lock, at the cost of possibly reading
+            #       uncommitted changes.
+            db = sqlite3.connect(self._db_uri, uri=True, check_same_thread=not read_only)
+            db.execute('pragma read_uncommitted=true')
+            return db
+        if read_only:
+            # NOTE: Read-only connections are used only by the thread that
+            #       opened them but are closed by the thread that calls close()
+            return sqlite3.connect(
+                'file:%s?mode=ro' % pathname2url(os.path.abspath(self._db_filepath)),
+                uri=True,
+                check_same_thread=False)
+        return sqlite3.connect(self._db_filepath)
+    
+    @property
+    def _read_db(self) -> sqlite3.Connection:
+        """
+        A connection that the current thread may use to read from this project's database.
+        
+        Waits for any writes scheduled by the current thread to be committed,
+        so that they can be read. Sees writes scheduled by other threads only
+        after the database writer commits them, which is usually within a few
+        milliseconds of their being executed. In-memory state that is updated
+        along with each write, such as the Resources indexed by URL,
+        is always current.
+        
+        Threadsafe.
+        """
+        if not self._loading:
+            self._db_writer.wait_for_own_writes()
+        if threading.get_ident() == self._db_thread_id:
+            return self._db
+        db = getattr(self._read_dbs, 'db', None)
+        if db is None:
+            db = self._connect_db(read_only=True)
+            with self._read_dbs_lock:
+                if self._closed:
+                    db.close()
+                    raise ValueError('Project is closed.')
+                # Release the connections of threads that have exited
+                for (thread, old_db) in list(self._read_db_for_thread.items()):
+                    if not thread.is_alive():
+                        old_db.close()
+                        del self._read_db_for_thread[thread]
+                self._read_db_for_thread[threading.current_thread()] = db
+            self._read_dbs.db = db
+        return db
+    
+    @classmethod
+    def _create_revision_summary_indexes(cls, c: sqlite3.Cursor) -> None:
+        for column in cls._INDEXED_REVISION_SUMMARY_COLUMNS:
+            c.execute('create index resource_revision__%s on resource_revision (%s)' % (column, column))
+    
+    def _migrate_revision_summary_columns(self,
+            c: sqlite3.Cursor,
+            progress_listener: OpenProjectProgressListener) -> None:
+        """
+        Adds the revision summary columns to a project created by an older
+        version of Crystal and populates them from existing revisions.
+        """
+        existing_columns = [name for (_, name, *_) in c.execute('pragma table_info(resource_revision)')]
+        if 'has_body' in existing_columns:
+            return
+        
+        for (column, column_type) in self._REVISION_SUMMARY_COLUMNS:
+            c.execute('alter table resource_revision add column %s %s' % (column, column_type))
+        
+        [(revision_count,)] = c.execute('select count(*) from resource_revision')
+        progress_listener.upgrading_project('Summarizing revisions', revision_count)
+        revision_index = 0
+        
+        revision_dirpath = os.path.join(self.path, self._RESOURCE_REVISION_DIRNAME)
+        last_id = 0
+        while True:
+            rows = c.execute(
+                'select resource_revision.id, resource.url, resource_revision.metadata '
+                'from resource_revision join resource on resource.id = resource_revision.resource_id '
+                'where resource_revision.id > ? order by resource_revision.id limit 1000',
+                (last_id,)
+            ).fetchall()
+            if len(rows) == 0:
+                break
+            
+            summaries = []
+            for (id, url, metadata) in rows:
+                (status_code, content_type, charset) = ResourceRevision._summarize(
+                    url, ResourceRevision._decode_metadata(metadata))
+                try:
+                    body_stat = os.stat(os.path.join(revision_dirpath, str(id)))
+                except FileNotFoundError:
+                    (has_body, body_size, fetch_time) = (False, None, None)
+                else:
+                    # NOTE: The body file was written when the revision was fetched
+                    (has_body, body_size, fetch_time) = (True, body_stat.st_size, body_stat.st_mtime)
+                summaries.append((status_code, content_type, charset, has_body, body_size, fetch_time, id))
+            c.executemany(
+                'update resource_revision set status_code=?, content_type=?, charset=?, '
+                'has_body=?, body_size=?, fetch_time=? where id=?',
+                summaries)
+            last_id = rows[-1][0]
+            
+            revision_index += len(rows)
+            progress_listener.upgrading_project_item(revision_index)
+        
+        self._create_revision_summary_indexes(c)
+        self._db.commit()
+    
+    @staticmethod
+    def _create_revision_body_table(c: sqlite3.Cursor) -> None:
+        # Reference counts of content-addressed bodies
+        c.execute('create table revision_body (hash text primary key, refcount integer not null, size integer not null)')
+    
+    def _migrate_revision_storage_columns(self, c: sqlite3.Cursor) -> None:
+        """
+        Adds support for content-addressed and compressed bodies to a project
+        created by an older version of Crystal.
+        """
+        existing_columns = [name for (_, name, *_) in c.execute('pragma table_info(resource_revision)')]
+        missing_columns = [
+            column for column in self._REVISION_STORAGE_COLUMNS
+            if column[0] not in existing_columns
+        ]
+        if len(missing_columns) == 0:
+            return
+        
+        for (column, column_type) in missing_columns:
+            c.execute('alter table resource_revision add column %s %s' % (column, column_type))
+        if c.execute("select 1 from sqlite_master where type='table' and name='revision_body'").fetchone() is None:
+            self._create_revision_body_table(c)
+        self._db.commit()
+    
+    @staticmethod
+    def _create_resource_group_member_table(c: sqlite3.Cursor) -> None:
+        # Persisted membership of each resource group, valid for
+        # resource_group.member_url_pattern rather than resource_group.url_pattern
+        c.execute('create table resource_group_member (group_id integer not null, resource_id integer not null, primary key (group_id, resource_id), foreign key (group_id) references resource_group(id), foreign key (resource_id) references resource(id)) without rowid')
+        c.execute('create index resource_group_member__resource_id on resource_group_member (resource_id)')
+    
+    def _migrate_resource_group_members(self, c: sqlite3.Cursor) -> None:
+        """
+        Adds persisted resource group membership to a project
+        created by an older version of Crystal.
+        
+        The membership of each group is populated later, in the background.
+        """
+        if c.execute("select 1 from sqlite_master where type='table' and name='resource_group_member'").fetchone() is not None:
+            return
+        
+        c.execute('alter table resource_group add column member_url_pattern text')
+        self._create_resource_group_member_table(c)
+        self._db.commit()
+    
+    @staticmethod
+    def _create_host_table(c: sqlite3.Cursor) -> None:
+        # Distinct scheme and authority of resource URLs, such as 'https://example.com'
+        c.execute('create table host (id integer primary key, url_host text unique not null, download_delay real)')
+        c.execute('create index resource__host_id on resource (host_id)')
+    
+    def _migrate_resource_hosts(self,
+            c: sqlite3.Cursor,
+            progress_listener: OpenProjectProgressListener) -> None:
+        """
+        Adds the host of each resource to a project created by an older
+        version of Crystal.
+        """
+        if c.execute("select 1 from sqlite_master where type='table' and name='host'").fetchone() is not None:
+            return
+        
+        c.execute('alter table resource add column host_id integer')
+        self._create_host_table(c)
+        
+        [(resource_count,)] = c.execute('select count(*) from resource')
+        progress_listener.upgrading_project('Finding hosts of resources', resource_count)
+        resource_index = 0
+        
+        last_id = 0
+        while True:
+            rows = c.execute(
+                'select id, url from resource where id > ? order by id limit 1000',
+                (last_id,)
+            ).fetchall()
+            if len(rows) == 0:
+                break
+            c.executemany(
+                'update resource set host_id=? where id=?',
+                [(self._host_id_for_url(c, url), id) for (id, url) in rows])
+            last_id = rows[-1][0]
+            
+            resource_index += len(rows)
+            progress_listener.upgrading_project_item(resource_index)
+        self._db.commit()
+    
+    def _migrate_download_delays(self, c: sqlite3.Cursor) -> None:
+        """
+        Adds configurable download delays to a project created by an older
+        version of Crystal.
+        """
+        for table_name in ['host', 'resource_group']:
+            existing_columns = [name for (_, name, *_) in c.execute('pragma table_info(%s)' % table_name)]
+            if 'download_delay' not in existing_columns:
+                c.execute('alter table %s add column download_delay real' % table_name)
+        self._db.commit()
+    
+    @staticmethod
+    def _host_id_for_url(c: sqlite3.Cursor, url: str) -> int:
+        """
+        Returns the ID of the host of the specified URL, adding the host if necessary.
+        
+        Must be called on the database writer thread, or while the project is loading.
+        """
+        (url_host, _) = split_url_host(url)
+        row = c.execute('select id from host where url_host=?', (url_host,)).fetchone()
+        if row is not None:
+            return row[0]
+        c.execute('insert into host (url_host) values (?)', (url_host,))
+        return c.lastrowid
+    
+    # Triggers that keep resource_url_fts up to date as resources change
+    _RESOURCE_URL_SEARCH_TRIGGERS = {
+        'resource_url_fts__insert': "after insert on resource begin insert into resource_url_fts (rowid, url) values (new.id, new.url); end",
+        'resource_url_fts__delete': "after delete on resource begin insert into resource_url_fts (resource_url_fts, rowid, url) values ('delete', old.id, old.url); end",
+        'resource_url_fts__update': "after update of url on resource begin insert into resource_url_fts (resource_url_fts, rowid, url) values ('delete', old.id, old.url); insert into resource_url_fts (rowid, url) values (new.id, new.url); end",
+    }
+    
+    @classmethod
+    def _create_resource_url_search_index(cls, c: sqlite3.Cursor) -> bool:
+        """
+        Creates an index of the trigrams in every resource URL,
+        which is kept up to date automatically as resources change.
+        
+        Returns whether the index could be created.
+        """
+        try:
+            c.execute("create virtual table resource_url_fts using fts5(url, content='resource', content_rowid='id', tokenize='trigram')")
+        except sqlite3.OperationalError:
+            # SQLite lacks FTS5 or its trigram tokenizer (added in SQLite 3.34)
+            return False
+        cls._create_resource_url_search_triggers(c)
+        return True
+    
+    @classmethod
+    def _create_resource_url_search_triggers(cls, c: sqlite3.Cursor) -> None:
+        for (name, definition) in cls._RESOURCE_URL_SEARCH_TRIGGERS.items():
+            c.execute('create trigger %s %s' % (name, definition))
+    
+    def _migrate_resource_url_search_index(self,
+            c: sqlite3.Cursor,
+            progress_listener: OpenProjectProgressListener) -> None:
+        """
+        Adds an index for `search_urls` to a project created by an older
+        version of Crystal, or by a version of SQLite that could not create it.
+        
+        If the project has an index that this version of SQLite cannot load
+        then removes the triggers that keep the index up to date, which would
+        otherwise make every change to a resource fail. The index is rebuilt
+        when the project is next opened by a version of SQLite that can load it.
+        """
+        has_index = c.execute(
+            "select 1 from sqlite_master where type='table' and name='resource_url_fts'"
+        ).fetchone() is not None
+        if has_index:
+            try:
+                c.execute('select rowid from resource_url_fts limit 1').fetchall()
+            except sqlite3.OperationalError:
+                # SQLite lacks FTS5 or its trigram tokenizer
+                self._has_url_search_index = False
+                for name in self._RESOURCE_URL_SEARCH_TRIGGERS:
+                    c.execute('drop trigger if exists %s' % name)
+                self._db.commit()
+                return
+            
+            self._has_url_search_index = True
+            has_triggers = c.execute(
+                "select 1 from sqlite_master where type='trigger' and name='resource_url_fts__insert'"
+            ).fetchone() is not None
+            if has_triggers:
+                return
+            # Index is stale because the project was opened by a version of SQLite that could not load it
+            self._create_resource_url_search_triggers(c)
+        else:
+            self._has_url_search_index = self._create_resource_url_search_index(c)
+        if self._has_url_search_index:
+            [(resource_count,)] = c.execute('select count(*) from resource')
+            progress_listener.upgrading_project('Indexing resource URLs', resource_count)
+            c.execute("insert into resource_url_fts (resource_url_fts) values ('rebuild')")
+            progress_listener.upgrading_project_item(resource_count)
+        self._db.commit()
+    
     @staticmethod
     def is_valid(path):
         return (
@@ -154,9 +684,10 @@ class Project(object):
         return self._properties.get(name, default)
     def _set_property(self, name, value):
         if not self._loading:
-            c = self._db.cursor()
-            c.execute('insert or replace into project_property (name, value) values (?, ?)', (name, value))
-            self._db.commit()
+            self._db_writer.execute(
+                'insert or replace into project_property (name, value) values (?, ?)',
+                (name, value)
+            ).result()
         self._properties[name] = value
     
     def _get_default_url_prefix(self):
@@ -169,6 +700,237 @@ class Project(object):
         self._set_property('default_url_prefix', value)
     default_url_prefix = property(_get_default_url_prefix, _set_default_url_prefix)
     
+    def _get_revision_body_layout(self) -> str:
+        """
+        How revision bodies are stored on disk.
+        One of the REVISION_BODY_LAYOUT_* constants.
+        
+        Can only be changed while the project has no revisions.
+        See `pack_revision_bodies` to convert a project with revisions
+        to the packed layout.
+        """
+        return self._get_property('revision_body_layout', self.REVISION_BODY_LAYOUT_FLAT)
+    def _set_revision_body_layout(self, value: str) -> None:
+        if value not in self._REVISION_BODY_LAYOUTS:
+            raise ValueError('Unknown revision body layout: %r' % value)
+        if value == self.revision_body_layout:
+            return
+        if len(self._resources_with_revisions) > 0:
+            raise ValueError('Cannot change the revision body layout of a project that has revisions.')
+        self._set_property('revision_body_layout', value)
+    revision_body_layout = property(_get_revision_body_layout, _set_revision_body_layout)
+    
+    # === Revision Bodies ===
+    
+    @property
+    def _body_store(self) -> RevisionBodyStore:
+        """The store for the bodies of new revisions."""
+        return self._body_stores[self.revision_body_layout]
+    
+    def _body_store_for(self, revision: ResourceRevision) -> RevisionBodyStore:
+        """The store that holds the body of the specified existing revision."""
+        if revision._body_segment is not None:
+            return self._body_stores[self.REVISION_BODY_LAYOUT_PACKED]
+        elif revision._body_hash is not None:
+            return self._body_stores[self.REVISION_BODY_LAYOUT_CONTENT_ADDRESSED]
+        else:
+            return self._body_stores[self.REVISION_BODY_LAYOUT_FLAT]
+    
+    def pack_revision_bodies(self) -> List[int]:
+        """
+        Switches this project to the packed layout for revision bodies
+        and moves the bodies of all existing revisions into segment files.
+        
+        A body shared by several revisions in the content-addressed layout
+        is packed only once.
+        
+        Returns the IDs of any revisions whose body was missing and so could
+        not be packed. Such revisions are left as they were.
+        
+        This method blocks while moving bodies, which may take a long time
+        for large projects. It should not be run while downloads are in progress.
+        """
+        packed_body_store = self._body_stores[self.REVISION_BODY_LAYOUT_PACKED]
+        assert isinstance(packed_body_store, PackedRevisionBodyStore)
+        if self._in_memory:
+            # (All bodies are in the same store already)
+            self._set_property('revision_body_layout', self.REVISION_BODY_LAYOUT_PACKED)
+            return []
+        flat_body_store = self._body_stores[self.REVISION_BODY_LAYOUT_FLAT]
+        assert isinstance(flat_body_store, FlatRevisionBodyStore)
+        content_addressed_body_store = self._body_stores[self.REVISION_BODY_LAYOUT_CONTENT_ADDRESSED]
+        assert isinstance(content_addressed_body_store, ContentAddressedRevisionBodyStore)
+        
+        # Index revisions by body hash while packing, so that all revisions
+        # sharing a content-addressed body can be updated at once
+        self._db_writer.execute(
+            'create index if not exists resource_revision__body_hash on resource_revision (body_hash)'
+        ).result()
+        # Find revisions whose insert is not yet committed too
+        self._db_writer.flush()
+        try:
+            missing_revision_ids = []  # type: List[int]
+            c = self._read_db.cursor()
+            last_id = 0
+            while True:
+                rows = c.execute(
+                    'select resource_id, %s from resource_revision '
+                    'where has_body=1 and body_segment is null and id > ? order by id limit 1000' % (
+                        ResourceRevision._LOAD_COLUMNS),
+                    (last_id,)
+                ).fetchall()
+                if len(rows) == 0:
+                    break
+                
+                flat_revisions = []
+                packed_bodies = set()  # type: Set[Tuple[str, Optional[str]]]
+                for (resource_id, *row) in rows:
+                    resource = self._get_resource_with_id(resource_id)
+                    revision = ResourceRevision._load_from_row(resource, row)
+                    last_id = revision._id
+                    
+                    body_key = (revision._body_hash, revision._body_encoding)
+                    if body_key in packed_bodies:
+                        # (Already packed along with an earlier revision sharing the same body)
+                        continue
+                    if not self._body_store_for(revision).exists(revision):
+                        missing_revision_ids.append(revision._id)
+                        continue
+                    
+                    # NOTE: Keep any body encoding as-is
+                    with revision.open(decode=False) as body_file:
+                        (segment, offset, length) = packed_body_store.append(body_file)
+                    if revision._body_hash is None:
+                        self._db_writer.execute(
+                            'update resource_revision set body_segment=?, body_offset=?, body_length=? where id=?',
+                            (segment, offset, length, revision._id))
+                        flat_revisions.append(revision)
+                    else:
+                        self._db_writer.execute(
+                            'update resource_revision set body_segment=?, body_offset=?, body_length=?, body_hash=null '
+                            'where body_hash=? and body_encoding is ? and body_segment is null',
+                            (segment, offset, length, revision._body_hash, revision._body_encoding))
+                        packed_bodies.add(body_key)
+                
+                # Remove flat bodies only after they are recorded as packed
+                self._db_writer.flush()
+                for revision in flat_revisions:
+                    os.remove(flat_body_store._filepath(revision))
+            
+            # Remove content-addressed bodies, all of which are now packed or missing
+            self._db_writer.execute(
+                'delete from revision_body where hash not in '
+                '(select body_hash from resource_revision where body_hash is not null)'
+            ).result()
+            shutil.rmtree(content_addressed_body_store._dirpath, ignore_errors=True)
+        finally:
+            self._db_writer.execute('drop index if exists resource_revision__body_hash').result()
+        
+        # Switch layouts only after all bodies are packed,
+        # so that an error above leaves this project usable
+        self._set_property('revision_body_layout', self.REVISION_BODY_LAYOUT_PACKED)
+        
+        # Forget any revisions that were loaded with their old storage location
+        with self._index_lock.writing():
+            self._default_revisions.clear()
+            self._revision_generation += 1
+        
+        return missing_revision_ids
+    
+    def _get_revision_body_compression(self) -> str:
+        """
+        How newly downloaded revision bodies are compressed on disk.
+        One of the REVISION_BODY_COMPRESSION_* constants.
+        
+        Only bodies with a textual content type (like HTML, CSS, and JavaScript)
+        are compressed. Changing this setting does not affect existing bodies.
+        """
+        return self._get_property('revision_body_compression', self.REVISION_BODY_COMPRESSION_NONE)
+    def _set_revision_body_compression(self, value: str) -> None:
+        if value not in self._REVISION_BODY_COMPRESSIONS:
+            raise ValueError('Unknown revision body compression: %r' % value)
+        self._set_property('revision_body_compression', value)
+    revision_body_compression = property(_get_revision_body_compression, _set_revision_body_compression)
+    
+    # === Download Delays ===
+    
+    def _get_download_delay(self) -> float:
+        """
+        Number of seconds to wait after downloading a resource before
+        requesting another resource from the same host, unless a different
+        delay is configured for the host or for a group containing the resource.
+        """
+        return float(self._get_property('download_delay', self._DEFAULT_DOWNLOAD_DELAY))
+    def _set_download_delay(self, value: float) -> None:
+        if value < 0:
+            raise ValueError('Download delay cannot be negative.')
+        self._set_property('download_delay', str(value))
+        self.host_rates.reset()
+    download_delay = property(_get_download_delay, _set_download_delay)
+    
+    def get_download_delay_for_host(self, url_host: str) -> Optional[float]:
+        """
+        Returns the download delay configured for the specified host,
+        such as 'https://example.com', or None if none is configured.
+        
+        Threadsafe.
+        """
+        with self._index_lock.reading():
+            return self._download_delay_for_host.get(url_host)
+    
+    def set_download_delay_for_host(self, url_host: str, delay: Optional[float]) -> None:
+        """
+        Configures the download delay for the specified host,
+        such as 'https://example.com', or removes it if None.
+        """
+        if delay is not None and delay < 0:
+            raise ValueError('Download delay cannot be negative.')
+        def set_delay(c: sqlite3.Cursor) -> None:
+            c.execute('insert or ignore into host (url_host) values (?)', (url_host,))
+            c.execute('update host set download_delay=? where url_host=?', (delay, url_host))
+        self._db_writer.call(set_delay).result()
+        with self._index_lock.writing():
+            if delay is None:
+                self._download_delay_for_host.pop(url_host, None)
+            else:
+                self._download_delay_for_host[url_host] = delay
+        self.host_rates.reset(url_host)
+    
+    def _configured_delay_for_host(self, url_host: str) -> Tuple[float, float]:
+        """
+        Returns the (initial delay, minimum delay) of the specified host
+        for `host_rates`.
+        
+        A delay configured for the host is never undercut, whereas the project's
+        `download_delay` is only a starting point for hosts without one.
+        """
+        host_delay = self.get_download_delay_for_host(url_host)
+        if host_delay is not None:
+            return (host_delay, host_delay)
+        return (self.download_delay, 0.0)
+    
+    def download_delay_for(self, resource: Resource) -> float:
+        """
+        Returns the number of seconds to wait after downloading the specified
+        resource before requesting another resource from the same host.
+        
+        Uses the current delay of the resource's host in `host_rates`,
+        which starts at the delay configured for the host (or the project's
+        `download_delay`) and adapts to how the host responds. The delay of
+        the first group containing the resource that configures one is a
+        minimum for that resource.
+        
+        Threadsafe.
+        """
+        group_delay = 0.0
+        # NOTE: Doesn't use groups_containing() to avoid filling its cache
+        #       with every resource that is downloaded
+        for rg in self.match_groups(resource.url):
+            if rg.download_delay is not None:
+                group_delay = rg.download_delay
+                break
+        return max(group_delay, self.host_rates.delay_for(split_url_host(resource.url)[0]))
+    
     def get_display_url(self, url):
         """
         Returns a displayable version of the provided URL.
@@ -183,35 +945,228 @@ class Project(object):
             return url
     
     @property
-    def resources(self):
-        return self._resources.values()
+    def lazy(self) -> bool:
+        """
+        Whether this project loads its Resources from the database on demand
+        rather than holding all of them in memory.
+        """
+        return self._lazy
+    
+    @property
+    def resources(self) -> Iterable[Resource]:
+        if self._lazy:
+            return self._load_all_resources()
+        else:
+            return self._resources_by_id.values()
+    
+    def _load_all_resources(self) -> Iterator[Resource]:
+        c = self._read_db.cursor()
+        for (url, id) in c.execute('select url, id from resource order by id'):
+            # NOTE: Returns any existing Resource with the same URL
+            yield Resource(self, url, _id=id)
+    
+    def resources_with_url_prefix(self,
+            url_prefix: str,
+            *, after_url: Optional[str]=None,
+            limit: Optional[int]=None) -> List[Resource]:
+        """
+        Returns the `Resource`s whose URL starts with the specified prefix,
+        ordered by URL.
+        
+        Uses the index on resource.url, so takes time proportional to the
+        number of resources returned rather than to the size of the project.
+        
+        Threadsafe.
+        
+        Arguments:
+        url_prefix -- prefix of the URLs to return. May be empty.
+        after_url -- if specified, only URLs that sort after this URL are returned.
+                     Pass the URL of the last resource of the previous page
+                     to get the next page.
+        limit -- maximum number of resources to return.
+        """
+        conditions = []
+        parameters = []  # type: List[object]
+        if url_prefix != '':
+            conditions.append('url >= ?')
+            parameters.append(url_prefix)
+            upper_bound = _string_after_prefix(url_prefix)
+            if upper_bound is not None:
+                conditions.append('url < ?')
+                parameters.append(upper_bound)
+        if after_url is not None:
+            conditions.append('url > ?')
+            parameters.append(after_url)
+        query = 'select url, id from resource%s order by url' % (
+            (' where ' + ' and '.join(conditions)) if len(conditions) > 0 else '')
+        if limit is not None:
+            query += ' limit %d' % limit
+        
+        c = self._read_db.cursor()
+        return [
+            # NOTE: Returns any existing Resource with the same URL
+            Resource(self, url, _id=id)
+            for (url, id) in c.execute(query, parameters).fetchall()
+        ]
+    
+    @property
+    def url_hosts(self) -> List[str]:
+        """
+        The distinct scheme and authority of all resource URLs,
+        such as 'https://example.com', in sorted order.
+        
+        URIs without an authority, such as 'mailto:' URIs, have no host
+        and so contribute nothing.
+        
+        Threadsafe.
+        """
+        c = self._read_db.cursor()
+        return [
+            url_host for (url_host,) in c.execute(
+                "select url_host from host where url_host != '' and "
+                'exists (select 1 from resource where resource.host_id = host.id) '
+                'order by url_host')
+        ]
+    
+    def resources_on_host(self, url_host: str, *, limit: Optional[int]=None) -> List[Resource]:
+        """
+        Returns the `Resource`s whose URL has the specified scheme and authority,
+        such as 'https://example.com', ordered by when they were created.
+        
+        Uses the index on resource.host_id, so takes time proportional to the
+        number of resources returned rather than to the size of the project.
+        
+        Threadsafe.
+        """
+        query = (
+            'select resource.url, resource.id from resource '
+            'join host on host.id = resource.host_id '
+            'where host.url_host=? order by resource.id'
+        )
+        if limit is not None:
+            query += ' limit %d' % limit
+        
+        c = self._read_db.cursor()
+        return [
+            # NOTE: Returns any existing Resource with the same URL
+            Resource(self, url, _id=id)
+            for (url, id) in c.execute(query, (url_host,)).fetchall()
+        ]
     
-    def get_resource(self, url):
-        """Returns the `Resource` with the specified URL or None if no such resource exists."""
-        return self._resources.get(url, None)
+    # Shortest substring that can be found with the resource_url_fts index
+    _MIN_INDEXED_SEARCH_LENGTH = 3
+    
+    def search_urls(self,
+            substring: str,
+            *, after_id: Optional[int]=None,
+            limit: Optional[int]=None) -> List[Resource]:
+        """
+        Returns the `Resource`s whose URL contains the specified substring,
+        ignoring case, ordered by when they were created.
+        
+        Uses an index of the trigrams in every URL when the substring is at
+        least 3 characters long. The index yields matches already in order,
+        so a search with a `limit` stops after finding that many matches
+        rather than finding every match. A substring whose trigrams are rare
+        is found quickly. A substring whose trigrams are common, like "com",
+        may scan many index entries before finding enough matches.
+        
+        Threadsafe.
+        
+        Arguments:
+        substring -- text to find in URLs.
+        after_id -- if specified, only resources created after the resource
+                    with this ID are returned. Pass the ID of the last resource
+                    of the previous page to get the next page.
+        limit -- maximum number of resources to return.
+        """
+        parameters = []  # type: List[object]
+        if self._has_url_search_index and len(substring) >= self._MIN_INDEXED_SEARCH_LENGTH:
+            # NOTE: Orders by resource_url_fts.rowid rather than resource.id
+            #       so that SQLite doesn't sort all matches before applying the limit
+            query = (
+                'select resource.url, resource.id from resource_url_fts '
+                'join resource on resource.id = resource_url_fts.rowid '
+                'where resource_url_fts match ?'
+            )
+            parameters.append('"%s"' % substring.replace('"', '""'))  # phrase
+            if after_id is not None:
+                query += ' and resource_url_fts.rowid > ?'
+                parameters.append(after_id)
+            query += ' order by resource_url_fts.rowid'
+        else:
+            query = "select url, id from resource where url like ? escape '\\'"
+            parameters.append('%%%s%%' % re.sub(r'([%_\\])', r'\\\1', substring))
+            if after_id is not None:
+                query += ' and id > ?'
+                parameters.append(after_id)
+            query += ' order by id'
+        if limit is not None:
+            query += ' limit %d' % limit
+        
+        c = self._read_db.cursor()
+        return [
+            # NOTE: Returns any existing Resource with the same URL
+            Resource(self, url, _id=id)
+            for (url, id) in c.execute(query, parameters).fetchall()
+        ]
+    
+    def get_resource(self, url: str) -> Optional[Resource]:
+        """
+        Returns the `Resource` with the specified URL or None if no such resource exists.
+        
+        Threadsafe.
+        """
+        with self._index_lock.reading():
+            resource = self._resources.get(url, None)
+        if self._lazy:
+            if resource is None:
+                c = self._read_db.cursor()
+                row = c.execute('select id from resource where url=?', (url,)).fetchone()
+                if row is not None:
+                    (id,) = row
+                    resource = Resource(self, url, _id=id)
+            else:
+                with self._index_lock.writing():
+                    self._recent_resources[resource._id] = resource
+        return resource
     
     def _get_resource_with_id(self, resource_id):
-        """Returns the `Resource` with the specified ID or None if no such resource exists."""
-        # PERF: O(n) when it could be O(1)
-        return next((r for r in self._resources.values() if r._id == resource_id), None)
+        """
+        Returns the `Resource` with the specified ID or None if no such resource exists.
+        
+        Threadsafe.
+        """
+        with self._index_lock.reading():
+            resource = self._resources_by_id.get(resource_id, None)
+        if resource is None and self._lazy:
+            c = self._read_db.cursor()
+            row = c.execute('select url from resource where id=?', (resource_id,)).fetchone()
+            if row is not None:
+                (url,) = row
+                resource = self.get_resource(url)
+        return resource
     
     @property
     def root_resources(self):
         return self._root_resources.values()
     
     def get_root_resource(self, resource):
-        """Returns the `RootResource` with the specified `Resource` or None if none exists."""
-        return self._root_resources.get(resource, None)
+        """
+        Returns the `RootResource` with the specified `Resource` or None if none exists.
+        
+        Threadsafe.
+        """
+        with self._index_lock.reading():
+            return self._root_resources.get(resource, None)
     
     def _get_root_resource_with_id(self, root_resource_id):
         """Returns the `RootResource` with the specified ID or None if no such root resource exists."""
-        # PERF: O(n) when it could be O(1)
-        return next((rr for rr in self._root_resources.values() if rr._id == root_resource_id), None)
+        return self._root_resources_by_id.get(root_resource_id, None)
     
     def _get_root_resource_with_name(self, name):
         """Returns the `RootResource` with the specified name or None if no such root resource exists."""
-        # PERF: O(n) when it could be O(1)
-        return next((rr for rr in self._root_resources.values() if rr.name == name), None)
+        return self._root_resources_by_name.get(name, None)
     
     @property
     def resource_groups(self):
@@ -219,51 +1174,382 @@ class Project(object):
     
     def get_resource_group(self, name):
         """Returns the `ResourceGroup` with the specified name or None if no such resource exists."""
-        # PERF: O(n) when it could be O(1)
-        return next((rg for rg in self._resource_groups if rg.name == name), None)
+        return self._resource_groups_by_name.get(name, None)
     
     def _get_resource_group_with_id(self, resource_group_id):
         """Returns the `ResourceGroup` with the specified ID or None if no such resource exists."""
-        # PERF: O(n) when it could be O(1)
-        return next((rg for rg in self._resource_groups if rg._id == resource_group_id), None)
+        return self._resource_groups_by_id.get(resource_group_id, None)
+    
+    def match_groups(self, url: str) -> List[ResourceGroup]:
+        """
+        Returns the `ResourceGroup`s whose url_pattern matches the specified URL,
+        in the same order as `resource_groups`.
+        
+        Takes time roughly proportional to the length of the URL
+        rather than to the number of groups.
+        
+        Threadsafe.
+        """
+        with self._index_lock.reading():
+            return self._resource_group_matcher.match(url)
+    
+    def groups_containing(self, resource: Resource) -> List[ResourceGroup]:
+        """
+        Returns the `ResourceGroup`s that contain the specified `Resource`,
+        in the same order as `resource_groups`.
+        
+        Results for recently used resources are cached, so repeated calls
+        for the same `Resource` usually take a single lookup.
+        
+        Threadsafe.
+        """
+        resource_id = resource._id
+        with self._index_lock.writing():
+            groups = self._groups_for_resource.get(resource_id)
+            if groups is not None:
+                return groups
+            groups = self._resource_group_matcher.match(resource.url)
+            if resource_id is not None:
+                self._groups_for_resource[resource_id] = groups
+            return groups
+    
+    def _insert_resource_group_members(self, c: sqlite3.Cursor, resource_id: int, url: str) -> None:
+        """
+        Persists the membership of a new or renamed resource in every group
+        whose url_pattern matches its URL.
+        
+        Must be called on the database writer thread.
+        """
+        c.executemany(
+            # NOTE: Ignores any group that was deleted concurrently
+            'insert or ignore into resource_group_member (group_id, resource_id) '
+            'select id, ? from resource_group where id=?',
+            [(resource_id, rg._id) for rg in self.match_groups(url) if rg._id is not None])
+    
+    def bulk_get_or_create_resources(self, urls: Iterable[str]) -> List[Resource]:
+        """
+        Looks up an existing resource for each of the specified URLs or creates
+        a new one if no preexisting resource matches, returning the resources
+        in the same order as the URLs.
+        
+        All new resources are inserted in a single database transaction
+        and announced to resource groups and listeners in a single batch,
+        which is much faster than creating each resource individually.
+        """
+        resources = []  # type: List[Optional[Resource]]
+        indexes_for_new_url = OrderedDict()  # type: Dict[str, List[int]]
+        for url in urls:
+            (resource, normalized_url) = Resource._lookup(self, url)
+            if resource is None:
+                indexes_for_new_url.setdefault(normalized_url, []).append(len(resources))
+            resources.append(resource)
+        
+        if len(indexes_for_new_url) > 0:
+            def insert_resources(c: sqlite3.Cursor) -> List[int]:
+                ids = []
+                for new_url in indexes_for_new_url:
+                    c.execute(
+                        'insert into resource (url, host_id) values (?, ?)',
+                        (new_url, self._host_id_for_url(c, new_url)))
+                    ids.append(c.lastrowid)
+                    self._insert_resource_group_members(c, c.lastrowid, new_url)
+                return ids
+            new_ids = self._db_writer.call(insert_resources).result()
+            
+            new_resources = []
+            for ((new_url, indexes), id) in zip(indexes_for_new_url.items(), new_ids):
+                new_resource = Resource(self, new_url, _id=id)
+                for index in indexes:
+                    resources[index] = new_resource
+                new_resources.append(new_resource)
+            self._resources_did_instantiate(new_resources)
+        
+        return cast(List[Resource], resources)
     
     # === Tasks ===
     
-    def add_task(self, task):
+    def add_task(self, task: Task, priority: Optional[int]=None) -> None:
         """
         Schedules the specified top-level task for execution, if not already done.
+        
+        Arguments:
+        task -- the task.
+        priority -- one of the crystal.task.PRIORITY_* constants, or None for
+                    PRIORITY_NORMAL. If the task is already scheduled with
+                    a lower priority then its priority is raised.
         """
+        from crystal.task import PRIORITY_NORMAL
+        if priority is None:
+            priority = PRIORITY_NORMAL
+        
         if task not in self.root_task.children:
+            task.priority = priority
             self.root_task.append_child(task)
+        elif priority < task.priority:
+            task.priority = priority
     
     # === Events ===
     
     # Called when a new Resource is created after the project has loaded
     def _resource_did_instantiate(self, resource: Resource) -> None:
+        self._resources_did_instantiate([resource])
+    
+    # Called when several new Resources are created at once after the project has loaded
+    def _resources_did_instantiate(self, resources: List[Resource]) -> None:
         # Notify resource groups (which are like hardwired listeners)
-        for rg in self.resource_groups:
-            rg._resource_did_instantiate(resource)
+        new_members_for_group = OrderedDict()  # type: Dict[ResourceGroup, List[Resource]]
+        # NOTE: Doesn't use groups_containing() to avoid filling its cache
+        #       with every resource that is created
+        for resource in resources:
+            for rg in self.match_groups(resource.url):
+                new_members_for_group.setdefault(rg, []).append(resource)
+        for (rg, new_members) in new_members_for_group.items():
+            rg._members_did_instantiate(new_members)
         
         # Notify normal listeners
         for lis in self.listeners:
-            if hasattr(lis, 'resource_did_instantiate'):
-                lis.resource_did_instantiate(resource)  # type: ignore[attr-defined]
+            if hasattr(lis, 'resources_did_instantiate'):
+                lis.resources_did_instantiate(resources)  # type: ignore[attr-defined]
+            elif hasattr(lis, 'resource_did_instantiate'):
+                for resource in resources:
+                    lis.resource_did_instantiate(resource)  # type: ignore[attr-defined]
+    
+    def _resource_did_load(self, resource: Resource) -> Resource:
+        """
+        Registers a Resource that was just loaded or created.
+        
+        If another thread already registered a Resource with the same URL
+        then returns that Resource, which should be used instead.
+        """
+        with self._index_lock.writing():
+            existing_resource = self._resources.get(resource.url, None)
+            if existing_resource is not None:
+                resource = existing_resource
+            else:
+                self._index_resource_url(resource)
+                self._resources_by_id[resource._id] = resource
+            if self._lazy:
+                self._recent_resources[resource._id] = resource
+            return resource
+    
+    def _index_resource_url(self, resource: Resource) -> None:
+        if self._compact_urls:
+            # Share the resource's URL parts rather than storing another copy of its URL
+            cast(CompactUrlDict, self._resources).set_parts(
+                resource._url_host, resource._url_suffix, resource)
+        else:
+            self._resources[resource.url] = resource
+    
+    def _split_url(self, url: str) -> Tuple[str, str]:
+        """
+        Splits the specified URL into the parts stored by a Resource,
+        which concatenate to the URL.
+        
+        Threadsafe.
+        """
+        if self._compact_urls:
+            return cast(CompactUrlDict, self._resources).split(url)
+        else:
+            return ('', url)
     
     def _resource_did_alter_url(self, 
             resource: Resource, old_url: str, new_url: str) -> None:
-        del self._resources[old_url]
-        self._resources[new_url] = resource
+        with self._index_lock.writing():
+            del self._resources[old_url]
+            self._index_resource_url(resource)
+            self._groups_for_resource.pop(resource._id, None)
         
         # Notify resource groups (which are like hardwired listeners)
-        for rg in self.resource_groups:
-            rg._resource_did_alter_url(resource, old_url, new_url)
-    
-    def _resource_did_delete(self, resource: Resource) -> None:
-        del self._resources[resource.url]
+        old_groups = self.match_groups(old_url)
+        new_groups = self.groups_containing(resource)
+        for rg in old_groups:
+            if rg not in new_groups:
+                rg._member_did_leave(resource)
+        for rg in new_groups:
+            if rg not in old_groups:
+                rg._member_did_join(resource)
+    
+    def _resource_did_delete(self, resource: Resource, old_id: int) -> None:
+        with self._index_lock.writing():
+            del self._resources[resource.url]
+            del self._resources_by_id[old_id]
+            if self._lazy:
+                self._recent_resources.pop(old_id)
+            old_groups = self._groups_for_resource.pop(old_id, None)
         
         # Notify resource groups (which are like hardwired listeners)
-        for rg in self.resource_groups:
-            rg._resource_did_delete(resource)
+        if old_groups is None:
+            old_groups = self.match_groups(resource.url)
+        for rg in old_groups:
+            rg._member_did_leave(resource)
+    
+    def _root_resource_did_load(self, root_resource: RootResource) -> None:
+        with self._index_lock.writing():
+            self._root_resources[root_resource.resource] = root_resource
+            self._root_resources_by_id[root_resource._id] = root_resource
+            # NOTE: If multiple root resources have the same name, prefer the earliest one
+            self._root_resources_by_name.setdefault(root_resource.name, root_resource)
+    
+    def _root_resource_did_delete(self, root_resource: RootResource, old_id: int) -> None:
+        with self._index_lock.writing():
+            del self._root_resources[root_resource.resource]
+            del self._root_resources_by_id[old_id]
+            if self._root_resources_by_name.get(root_resource.name) is root_resource:
+                del self._root_resources_by_name[root_resource.name]
+                # Fall back to the earliest remaining root resource with the same name, if any
+                for rr in self._root_resources.values():
+                    if rr.name == root_resource.name:
+                        self._root_resources_by_name[rr.name] = rr
+                        break
+    
+    def _resource_revision_did_create(self, revision: ResourceRevision) -> None:
+        with self._index_lock.writing():
+            self._resources_with_revisions.add(revision.resource._id)
+            # NOTE: The newest revision is the default revision. Caching it
+            #       also means that it is found before its insert is committed.
+            self._default_revisions[revision.resource._id] = revision
+            self._revision_generation += 1
+    
+    def _resource_revision_did_delete(self, revision: ResourceRevision) -> None:
+        resource_id = revision.resource._id
+        with self._index_lock.writing():
+            self._default_revisions.pop(resource_id)
+            self._revision_generation += 1
+        # NOTE: Queries on the writer thread, which sees the delete before it is committed
+        has_other_revisions = self._db_writer.call(
+            lambda c: c.execute(
+                'select 1 from resource_revision where resource_id=? limit 1', (resource_id,)
+            ).fetchone() is not None
+        ).result()
+        if not has_other_revisions:
+            with self._index_lock.writing():
+                self._resources_with_revisions.discard(resource_id)
+    
+    @property
+    def default_revision_cache_stats(self) -> Tuple[int, int]:
+        """
+        Returns the number of (hits, misses) of the in-memory cache
+        used by `Resource.default_revision`.
+        """
+        with self._index_lock.reading():
+            return (self._default_revisions.hits, self._default_revisions.misses)
+    
+    _REVISION_ORDERINGS = ['id', 'body_size', 'fetch_time']
+    
+    def find_revisions(self,
+            *, status_code: Optional[int]=None,
+            content_type: Optional[str]=None,
+            has_body: Optional[bool]=None,
+            group: Optional[ResourceGroup]=None,
+            order_by: str='id',
+            descending: bool=False,
+            limit: Optional[int]=None) -> List[ResourceRevision]:
+        """
+        Loads and returns the `ResourceRevision`s that match all of the specified criteria.
+        
+        Filtering by status code or content type and ordering by body size or
+        fetch time use indexes, so do not require scanning every revision.
+        
+        Threadsafe.
+        
+        Arguments:
+        status_code -- HTTP status code, such as 404.
+        content_type -- MIME type, such as 'text/html'.
+        has_body -- whether the revision has a body.
+        group -- `ResourceGroup` that the revision's resource must be a member of.
+        order_by -- one of 'id', 'body_size', or 'fetch_time'.
+        descending -- whether to return revisions in descending order.
+        limit -- maximum number of revisions to return.
+        """
+        if order_by not in self._REVISION_ORDERINGS:
+            raise ValueError('Cannot order revisions by %r.' % order_by)
+        
+        conditions = []
+        parameters = []  # type: List[object]
+        for (column, value) in [
+                ('status_code', status_code),
+                ('content_type', content_type),
+                ('has_body', has_body)]:
+            if value is not None:
+                conditions.append('%s=?' % column)
+                parameters.append(value)
+        if group is not None and group._members_persisted:
+            conditions.append('resource_id in (select resource_id from resource_group_member where group_id=?)')
+            parameters.append(group._id)
+            group = None  # already filtered
+        query = 'select resource_id, %s from resource_revision%s order by %s%s' % (
+            ResourceRevision._LOAD_COLUMNS,
+            (' where ' + ' and '.join(conditions)) if len(conditions) > 0 else '',
+            order_by,
+            ' desc' if descending else '',
+        )
+        if limit is not None and group is None:
+            query += ' limit %d' % limit
+        
+        revs = []
+        c = self._read_db.cursor()
+        for (resource_id, *row) in c.execute(query, parameters):
+            resource = self._get_resource_with_id(resource_id)
+            if resource is None:
+                continue
+            if group is not None and not group.contains_url(resource.url):
+                continue
+            revs.append(ResourceRevision._load_from_row(resource, row))
+            if limit is not None and len(revs) >= limit:
+                break
+        return revs
+    
+    def _resource_group_did_load(self, group: ResourceGroup) -> None:
+        with self._index_lock.writing():
+            self._resource_groups.append(group)
+            self._resource_groups_by_id[group._id] = group
+            # NOTE: If multiple groups have the same name, prefer the earliest one
+            self._resource_groups_by_name.setdefault(group.name, group)
+            self._resource_group_matcher.add(group.url_pattern, group._url_pattern_re, group)
+            self._groups_for_resource.clear()
+    
+    def _resource_group_did_alter_url_pattern(self, group: ResourceGroup) -> None:
+        with self._index_lock.writing():
+            self._resource_group_matcher.update(group.url_pattern, group._url_pattern_re, group)
+            self._groups_for_resource.clear()
+    
+    def _resource_group_did_delete(self, group: ResourceGroup, old_id: int) -> None:
+        with self._index_lock.writing():
+            self._resource_groups.remove(group)
+            del self._resource_groups_by_id[old_id]
+            self._resource_group_matcher.remove(group)
+            self._groups_for_resource.clear()
+            if self._resource_groups_by_name.get(group.name) is group:
+                del self._resource_groups_by_name[group.name]
+                # Fall back to the earliest remaining group with the same name, if any
+                for rg in self._resource_groups:
+                    if rg.name == group.name:
+                        self._resource_groups_by_name[rg.name] = rg
+                        break
+    
+    # === Close ===
+    
+    def close(self) -> None:
+        """
+        Waits for all pending changes to be saved and releases
+        the project's database connections.
+        
+        Does nothing if the project is already closed.
+        """
+        with self._read_dbs_lock:
+            if self._closed:
+                return
+            self._closed = True
+        
+        self._scheduler.close()
+        self._db_writer.close()
+        self._db.close()
+        with self._read_dbs_lock:
+            for db in self._read_db_for_thread.values():
+                db.close()
+            self._read_db_for_thread.clear()
+        for body_store in set(self._body_stores.values()):
+            body_store.close()
     
     # === Server ===
     
@@ -286,6 +1572,8 @@ class _WeakTaskRef(object):
     """
     Holds a reference to a Task until that task completes.
     """
+    __slots__ = ('_task',)
+    
     def __init__(self, task=None):
         self._task = None
         self.task = task
@@ -309,11 +1597,27 @@ class Resource(object):
     Either created manually or discovered through a link from another resource.
     Persisted and auto-saved.
     """
+    # NOTE: Projects may hold millions of Resources, so avoid a per-instance __dict__
+    __slots__ = (
+        'project',
+        '_url_host',
+        '_url_suffix',
+        '_download_body_task_ref',
+        '_download_task_ref',
+        '_download_task_noresult_ref',
+        'already_downloaded_this_session',
+        '_id',
+        '__weakref__',  # for the resource caches of lazy projects
+    )
+    
     project: Project
-    _url: str
-    _download_body_task_ref: _WeakTaskRef
-    _download_task_ref: _WeakTaskRef
-    _download_task_noresult_ref: _WeakTaskRef
+    # Parts of the URL, which are split only in projects with compact URLs
+    _url_host: str
+    _url_suffix: str
+    # (Task references are created on first use because few Resources ever get a task)
+    _download_body_task_ref: Optional[_WeakTaskRef]
+    _download_task_ref: Optional[_WeakTaskRef]
+    _download_task_noresult_ref: Optional[_WeakTaskRef]
     already_downloaded_this_session: bool
     _id: int  # or None if deleted
     
@@ -322,22 +1626,18 @@ class Resource(object):
         Looks up an existing resource with the specified URL or creates a new
         one if no preexisting resource matches.
         
+        To look up or create many resources at once, prefer
+        `Project.bulk_get_or_create_resources()`.
+        
         Arguments:
         project -- associated `Project`.
         url -- absolute URL to this resource (ex: http), or a URI (ex: mailto).
         """
         
         if _id is None:
-            url_alternatives = cls.resource_url_alternatives(project, url)
-            
-            # Find first matching existing alternative URL, to provide
-            # backward compatibility with older projects that use less-normalized
-            # forms of the original URL
-            for urla in url_alternatives:
-                if urla in project._resources:
-                    return project._resources[urla]
-            
-            normalized_url = url_alternatives[-1]
+            (existing_resource, normalized_url) = cls._lookup(project, url)
+            if existing_resource is not None:
+                return existing_resource
         else:
             # Always use original URL if loading from saved resource
             normalized_url = url
@@ -345,26 +1645,55 @@ class Resource(object):
         
         self = object.__new__(cls)
         self.project = project
-        self._url = normalized_url
-        self._download_body_task_ref = _WeakTaskRef()
-        self._download_task_ref = _WeakTaskRef()
-        self._download_task_noresult_ref = _WeakTaskRef()
+        (self._url_host, self._url_suffix) = project._split_url(normalized_url)
+        self._download_body_task_ref = None
+        self._download_task_ref = None
+        self._download_task_noresult_ref = None
         self.already_downloaded_this_session = False
         
-        if project._loading:
+        if _id is not None:
             self._id = _id
         else:
-            c = project._db.cursor()
-            c.execute('insert into resource (url) values (?)', (normalized_url,))
-            project._db.commit()
-            self._id = c.lastrowid
-        project._resources[normalized_url] = self
+            def insert_resource(c: sqlite3.Cursor) -> int:
+                c.execute(
+                    'insert into resource (url, host_id) values (?, ?)',
+                    (normalized_url, project._host_id_for_url(c, normalized_url)))
+                project._insert_resource_group_members(c, c.lastrowid, normalized_url)
+                return c.lastrowid
+            self._id = project._db_writer.call(insert_resource).result()
+        self = project._resource_did_load(self)
         
-        if not project._loading:
+        if _id is None:
             project._resource_did_instantiate(self)
         
         return self
     
+    @classmethod
+    def _lookup(cls, project: Project, url: str) -> Tuple[Optional[Resource], str]:
+        """
+        Looks up an existing resource with the specified URL, returning
+        a tuple of (1) the resource or None if no preexisting resource matches,
+        and (2) the normalized form of the URL.
+        """
+        # Fast path: Most URLs are looked up many times in exactly the form
+        # they were stored in, such as when they are linked from many pages
+        existing_resource = project.get_resource(url)
+        if existing_resource is not None:
+            return (existing_resource, url)
+        
+        url_alternatives = cls.resource_url_alternatives(project, url)
+        
+        # Find first matching existing alternative URL, to provide
+        # backward compatibility with older projects that use less-normalized
+        # forms of the original URL
+        # NOTE: The original URL (the first alternative) was already checked above
+        for urla in url_alternatives[1:]:
+            existing_resource = project.get_resource(urla)
+            if existing_resource is not None:
+                return (existing_resource, urla)
+        
+        return (None, url_alternatives[-1])
+    
     @staticmethod
     def resource_url_alternatives(project: Project, url: str) -> List[str]:
         """
@@ -381,6 +1710,25 @@ class Resource(object):
         
         Newer projects will attempt to save new URLs in the most normalized
         form possible.
+        
+        Results for recently used URLs are cached.
+        
+        Threadsafe.
+        """
+        with project._index_lock.writing():
+            cached_alternatives = project._url_alternatives.get(url)
+        if cached_alternatives is not None:
+            return list(cached_alternatives)
+        
+        alternatives = Resource._compute_url_alternatives(url)
+        with project._index_lock.writing():
+            project._url_alternatives[url] = tuple(alternatives)
+        return alternatives
+    
+    @staticmethod
+    def _compute_url_alternatives(url: str) -> List[str]:
+        """
+        Computes the result of `resource_url_alternatives`, without caching.
         """
         alternatives = []
         
@@ -452,25 +1800,27 @@ class Resource(object):
     
     @property
     def url(self) -> str:
-        return self._url
+        # NOTE: Returns the URL suffix itself, without copying it, if the host is empty
+        return self._url_host + self._url_suffix
     
     # NOTE: Usually a resource's URL will be in normal form when it is created,
     #       unless it was loaded from disk in non-normal form.
     @property
     def normalized_url(self) -> str:
-        return self.resource_url_alternatives(self.project, self._url)[-1]
+        return self.resource_url_alternatives(self.project, self.url)[-1]
     
-    def download_body(self):
+    def download_body(self, *, priority: Optional[int]=None):
         """
         Returns a Future<ResourceRevision> that downloads (if necessary) and returns an
         up-to-date version of this resource's body.
         
         The returned Future may invoke its callbacks on any thread.
         
-        A top-level Task will be created internally to display the progress.
+        A top-level Task will be created internally to display the progress,
+        with the specified priority (see `Project.add_task`).
         """
         task = self.create_download_body_task()
-        self.project.add_task(task)
+        self.project.add_task(task, priority)
         return task.future
     
     def create_download_body_task(self):
@@ -483,9 +1833,12 @@ class Resource(object):
         def task_factory():
             from crystal.task import DownloadResourceBodyTask
             return DownloadResourceBodyTask(self)
-        return self._get_task_or_create(self._download_body_task_ref, task_factory)
+        return self._get_task_or_create('_download_body_task_ref', task_factory)
     
-    def download(self, wait_for_embedded: bool=False, needs_result: bool=True) -> Future:
+    def download(self,
+            wait_for_embedded: bool=False,
+            needs_result: bool=True,
+            *, priority: Optional[int]=None) -> Future:
         """
         Returns a Future[ResourceRevision] that downloads (if necessary) and returns an
         up-to-date version of this resource's body. If a download is performed, all
@@ -503,9 +1856,13 @@ class Resource(object):
         If needs_result=False then the caller is declaring that it does
         not need and will ignore the result of the returned future,
         which enables additional optimizations.
+        
+        The top-level Task has the specified priority (see `Project.add_task`).
+        Pass crystal.task.PRIORITY_INTERACTIVE if the user is waiting for
+        the download, so that it runs ahead of any bulk downloads.
         """
         task = self.create_download_task(needs_result=needs_result)
-        self.project.add_task(task)
+        self.project.add_task(task, priority)
         return task.get_future(wait_for_embedded)
     
     def create_download_task(self, needs_result: bool=True) -> DownloadResourceTask:
@@ -519,41 +1876,46 @@ class Resource(object):
             from crystal.task import DownloadResourceTask
             return DownloadResourceTask(self, needs_result=needs_result)
         return self._get_task_or_create(
-            self._download_task_ref if needs_result else self._download_task_noresult_ref,
+            '_download_task_ref' if needs_result else '_download_task_noresult_ref',
             task_factory
         )
     
-    def _get_task_or_create(self, task_ref, task_factory):
-        if task_ref.task is not None:
+    def _get_task_or_create(self, task_ref_attr: str, task_factory):
+        task_ref = getattr(self, task_ref_attr)  # type: Optional[_WeakTaskRef]
+        if task_ref is None:
+            task_ref = _WeakTaskRef()
+            setattr(self, task_ref_attr, task_ref)
+        elif task_ref.task is not None:
             return task_ref.task
         
         task = task_factory()
         task_ref.task = task
         return task
     
-    # TODO: This should ideally be a cheap operation, not requiring a database hit.
-    #       Convert to property once this "cheapening" has been done.
-    def up_to_date(self):
+    @property
+    def up_to_date(self) -> bool:
         """
         Returns whether this resource is "up-to-date".
         
         An "up-to-date" resource is one that whose most recent local revision is estimated
         to be the same (in content) as the remote version at the time of invocation.
+        
+        Threadsafe.
         """
         # NOTE: Presently there is a hard-coded assumption that remote resources never change.
         #       Therefore a downloaded revision is always considered "up-to-date".
         #       This will likely require reconfiguring by the user in the future.
-        return self.has_any_revisions()
+        return self.has_any_revisions
     
-    # TODO: This should ideally be a cheap operation, not requiring a database hit.
-    #       Convert to property once this "cheapening" has been done.
+    @property
     def has_any_revisions(self) -> bool:
         """
         Returns whether any revisions of this resource have been downloaded.
+        
+        Threadsafe.
         """
-        c = self.project._db.cursor()
-        c.execute('select 1 from resource_revision where resource_id=? limit 1', (self._id,))
-        return c.fetchone() is not None
+        # NOTE: Reading a single bit doesn't need the project's index lock
+        return self._id in self.project._resources_with_revisions
     
     def default_revision(self) -> Optional[ResourceRevision]:
         """
@@ -561,22 +1923,41 @@ class Resource(object):
         that will be displayed when this resource is served or exported.
         
         If no revisions of this resource have been downloaded, None is returned.
+        
+        Threadsafe.
         """
+        if not self.has_any_revisions:
+            return None
+        
+        project = self.project
+        with project._index_lock.writing():
+            revision = project._default_revisions.get(self._id)
+            generation = project._revision_generation
+        if revision is not None:
+            return revision
+        
         default_revision_singleton = self.revisions(_query_suffix=' order by id desc limit 1')
-        return default_revision_singleton[0] if len(default_revision_singleton) == 1 else None
+        revision = default_revision_singleton[0] if len(default_revision_singleton) == 1 else None
+        if revision is not None:
+            with project._index_lock.writing():
+                # Don't cache a revision that may have been superseded while it was loading
+                if project._revision_generation == generation:
+                    project._default_revisions[self._id] = revision
+        return revision
     
     def revisions(self, _query_suffix: str='') -> List[ResourceRevision]:
         """
         Loads and returns a list of `ResourceRevision`s downloaded for this resource.
         If no such revisions exist, an empty list is returned.
-        """
-        RR = ResourceRevision
         
+        Threadsafe.
+        """
         revs = []
-        c = self.project._db.cursor()
-        query = 'select error, metadata, id from resource_revision where resource_id=?%s' % _query_suffix
-        for (error, metadata, id) in c.execute(query, (self._id,)):
-            revs.append(ResourceRevision._load(self, RR._decode_error(error), RR._decode_metadata(metadata), _id=id))
+        c = self.project._read_db.cursor()
+        query = 'select %s from resource_revision where resource_id=?%s' % (
+            ResourceRevision._LOAD_COLUMNS, _query_suffix)
+        for row in c.execute(query, (self._id,)):
+            revs.append(ResourceRevision._load_from_row(self, row))
         return revs
     
     # NOTE: Only used from a Python REPL at the moment
@@ -586,7 +1967,7 @@ class Resource(object):
         unless there is already an existing resource with that URL.
         """
         new_url = self.normalized_url
-        if new_url == self._url:
+        if new_url == self.url:
             return True
         return self._try_alter_url(new_url)
     
@@ -597,15 +1978,19 @@ class Resource(object):
         """
         project = self.project
         
-        if new_url in project._resources:
+        if project.get_resource(new_url) is not None:
             return False
         
-        c = project._db.cursor()
-        c.execute('update resource set url=? where id=?', (new_url, self._id,))
-        project._db.commit()
+        def update_resource(c: sqlite3.Cursor) -> None:
+            c.execute(
+                'update resource set url=?, host_id=? where id=?',
+                (new_url, project._host_id_for_url(c, new_url), self._id,))
+            c.execute('delete from resource_group_member where resource_id=?', (self._id,))
+            project._insert_resource_group_members(c, self._id, new_url)
+        project._db_writer.call(update_resource).result()
         
-        old_url = self._url  # capture
-        self._url = new_url
+        old_url = self.url  # capture
+        (self._url_host, self._url_suffix) = project._split_url(new_url)
         
         project._resource_did_alter_url(self, old_url, new_url)
         
@@ -616,26 +2001,24 @@ class Resource(object):
         project = self.project
         
         # Ensure not referenced by a RootResource
-        c = project._db.cursor()
-        root_resource_ids = [
-            id
-            for (id,) in 
-            c.execute('select id from root_resource where resource_id=?', (self._id,))
-        ]
-        if len(root_resource_ids) > 0:
-            raise ValueError(f'Cannot delete {self!r} referenced by RootResource {root_resource_ids!r}')
+        root_resource = project.get_root_resource(self)
+        if root_resource is not None:
+            raise ValueError(f'Cannot delete {self!r} referenced by RootResource {[root_resource._id]!r}')
         
-        # Delete ResourceRevision children
+        # Delete ResourceRevision children, including any whose insert is not yet committed
+        project._db_writer.flush()
         for rev in self.revisions():
             rev.delete()
         
         # Delete Resource itself
-        c = project._db.cursor()
-        c.execute('delete from resource where id=?', (self._id,))
-        project._db.commit()
+        old_id = self._id  # capture
+        def delete_resource(c: sqlite3.Cursor) -> None:
+            c.execute('delete from resource_group_member where resource_id=?', (old_id,))
+            c.execute('delete from resource where id=?', (old_id,))
+        project._db_writer.call(delete_resource).result()
         self._id = None  # type: ignore[assignment]  # intentionally leave exploding None
         
-        project._resource_did_delete(self)
+        project._resource_did_delete(self, old_id)
     
     def __repr__(self):
         return "Resource(%s)" % (repr(self.url),)
@@ -645,6 +2028,8 @@ class RootResource(object):
     Represents a resource whose existence is manually defined by the user.
     Persisted and auto-saved.
     """
+    __slots__ = ('project', 'name', 'resource', '_id')
+    
     project: Project
     name: str
     resource: Resource
@@ -678,11 +2063,11 @@ class RootResource(object):
             if project._loading:
                 self._id = _id
             else:
-                c = project._db.cursor()
-                c.execute('insert into root_resource (name, resource_id) values (?, ?)', (name, resource._id))
-                project._db.commit()
-                self._id = c.lastrowid
-            project._root_resources[resource] = self
+                self._id = project._db_writer.execute(
+                    'insert into root_resource (name, resource_id) values (?, ?)',
+                    (name, resource._id)
+                ).result()
+            project._root_resource_did_load(self)
             return self
     
     def delete(self):
@@ -694,12 +2079,13 @@ class RootResource(object):
             if rg.source == self:
                 rg.source = None
         
-        c = self.project._db.cursor()
-        c.execute('delete from root_resource where id=?', (self._id,))
-        self.project._db.commit()
+        old_id = self._id  # capture
+        self.project._db_writer.execute(
+            'delete from root_resource where id=?', (self._id,)
+        ).result()
         self._id = None
         
-        del self.project._root_resources[self.resource]
+        self.project._root_resource_did_delete(self, old_id)
     
     @property
     def url(self):
@@ -707,8 +2093,8 @@ class RootResource(object):
     
     # TODO: Create the underlying task with the full RootResource
     #       so that the correct subtitle is displayed.
-    def download(self, needs_result: bool=True) -> Future:
-        return self.resource.download(needs_result=needs_result)
+    def download(self, needs_result: bool=True, *, priority: Optional[int]=None) -> Future:
+        return self.resource.download(needs_result=needs_result, priority=priority)
     
     # TODO: Create the underlying task with the full RootResource
     #       so that the correct subtitle is displayed.
@@ -730,8 +2116,42 @@ class ResourceRevision(object):
     A downloaded revision of a `Resource`. Immutable.
     Persisted. Loaded on demand.
     """
+    __slots__ = (
+        'resource',
+        'error',
+        'metadata',
+        'has_body',
+        'fetch_time',
+        '_id',
+        '_status_code',
+        '_content_type',
+        '_charset',
+        '_body_size',
+        '_body_hash',
+        '_body_encoding',
+        '_body_segment',
+        '_body_offset',
+        '_body_length',
+    )
+    
     metadata: Optional[ResourceRevisionMetadata]
     has_body: bool
+    fetch_time: Optional[float]  # secs since epoch, or None if unknown
+    
+    # Columns of resource_revision that are read by _load_from_row
+    _LOAD_COLUMNS = (
+        'error, metadata, id, status_code, content_type, charset, has_body, body_size, fetch_time, '
+        'body_hash, body_encoding, body_segment, body_offset, body_length'
+    )
+    
+    # Content types that are worth compressing, in addition to text/*
+    _COMPRESSIBLE_CONTENT_TYPES = frozenset([
+        'application/javascript',
+        'application/json',
+        'application/xhtml+xml',
+        'application/xml',
+        'image/svg+xml',
+    ])
     
     # === Init ===
     
@@ -770,45 +2190,122 @@ class ResourceRevision(object):
         self.metadata = metadata
         # (self._id computed below)
         self.has_body = body_stream is not None
+        (self._status_code, self._content_type, self._charset) = \
+            ResourceRevision._summarize(resource.url, metadata)
+        # Size of the body after it is decoded from its body encoding
+        self._body_size = None  # type: Optional[int]
+        self._body_hash = None  # type: Optional[str]
+        self._body_segment = None  # type: Optional[int]
+        self._body_offset = None  # type: Optional[int]
+        self._body_length = None  # type: Optional[int]
+        self.fetch_time = time.time()
         
         project = self.project
         
-        # Need to do this first to get the database ID
-        def fg_task():
-            RR = ResourceRevision
-            
-            c = project._db.cursor()
-            c.execute('insert into resource_revision (resource_id, error, metadata) values (?, ?, ?)', (resource._id, RR._encode_error(error), RR._encode_metadata(metadata)))
-            project._db.commit()
-            self._id = c.lastrowid
-        fg_call_and_wait(fg_task)
+        if (body_stream and
+                project.revision_body_compression == Project.REVISION_BODY_COMPRESSION_GZIP and
+                ResourceRevision._is_compressible(self._content_type)):
+            self._body_encoding = 'gzip'  # type: Optional[str]
+        else:
+            self._body_encoding = None
         
         if body_stream:
-            try:
-                body_filepath = os.path.join(project.path, Project._RESOURCE_REVISION_DIRNAME, str(self._id))
-                with open(body_filepath, 'wb') as body_file:
-                    shutil.copyfileobj(body_stream, body_file)
-            except:
-                # Rollback database commit
-                def fg_task():
-                    c = project._db.cursor()
-                    c.execute('delete from resource_revision where id=?', (self._id,))
-                    project._db.commit()
-                fg_call_and_wait(fg_task)
-                raise
+            project._body_store.create(self, body_stream)
+        else:
+            self._id = project._db_writer.call(self._insert).result()
+        
+        project._resource_revision_did_create(self)
         
         return self
     
+    def _insert(self, c: sqlite3.Cursor) -> int:
+        """
+        Inserts this revision into the database, returning its ID.
+        
+        The revision is recorded as having a body only if its size is known.
+        """
+        RR = ResourceRevision
+        c.execute(
+            'insert into resource_revision '
+            '(resource_id, error, metadata, status_code, content_type, charset, fetch_time, '
+            'has_body, body_size, body_hash, body_encoding, body_segment, body_offset, body_length) '
+            'values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (self.resource._id, RR._encode_error(self.error), RR._encode_metadata(self.metadata),
+                self._status_code, self._content_type, self._charset, self.fetch_time,
+                self._body_size is not None, self._body_size, self._body_hash, self._body_encoding,
+                self._body_segment, self._body_offset, self._body_length))
+        return c.lastrowid
+    
+    @staticmethod
+    def _is_compressible(content_type: Optional[str]) -> bool:
+        return content_type is not None and (
+            content_type.startswith('text/') or
+            content_type in ResourceRevision._COMPRESSIBLE_CONTENT_TYPES
+        )
+    
+    def _encoding_writer(self, raw_body_file: BinaryIO) -> ContextManager[BinaryIO]:
+        """
+        Wraps the specified file such that writes to the returned file
+        are encoded with this revision's body encoding.
+        
+        Exiting the returned context does not close the wrapped file.
+        """
+        if self._body_encoding == 'gzip':
+            # NOTE: Omit timestamp so that identical bodies compress identically
+            return cast(ContextManager[BinaryIO], gzip.GzipFile(
+                fileobj=raw_body_file, mode='wb', compresslevel=6, mtime=0))
+        else:
+            assert self._body_encoding is None
+            return nullcontext(raw_body_file)
+    
     @staticmethod
-    def _load(resource, error, metadata, _id):
+    def _load_from_row(resource, row) -> ResourceRevision:
+        """
+        Loads a revision from a row of resource_revision containing `_LOAD_COLUMNS`.
+        """
+        (error, metadata, id, status_code, content_type, charset, has_body, body_size, fetch_time,
+            body_hash, body_encoding, body_segment, body_offset, body_length) = row
+        RR = ResourceRevision
         self = ResourceRevision()
         self.resource = resource
-        self.error = error
-        self.metadata = metadata
-        self._id = _id
-        self.has_body = os.path.exists(self._body_filepath)
+        self.error = RR._decode_error(error)
+        self.metadata = RR._decode_metadata(metadata)
+        self._id = id
+        self.has_body = bool(has_body)
+        self._status_code = status_code
+        self._content_type = content_type
+        self._charset = charset
+        self._body_size = body_size
+        self._body_hash = body_hash
+        self._body_encoding = body_encoding
+        self._body_segment = body_segment
+        self._body_offset = body_offset
+        self._body_length = body_length
+        self.fetch_time = fetch_time
         return self
     
+    @staticmethod
+    def _summarize(url: str, metadata: Optional[ResourceRevisionMetadata]) -> Tuple[Optional[int], Optional[str], Optional[str]]:
+        """
+        Returns the (status code, content type, declared charset) of a revision
+        with the specified URL and metadata.
+        """
+        if metadata is None:
+            status_code = None
+            content_type_with_options = None
+        else:
+            status_code = metadata['status_code']
+            content_type_with_options = ResourceRevision._first_value_of_http_header(
+                metadata['headers'], 'content-type')
+        
+        if content_type_with_options is None:
+            (content_type, content_type_options) = (None, {})  # type: Tuple[Optional[str], Dict[str, str]]
+        else:
+            (content_type, content_type_options) = cgi.parse_header(content_type_with_options)
+        if content_type is None:
+            (content_type, encoding) = mimetypes.guess_type(url)
+        return (status_code, content_type, content_type_options.get('charset'))
+    
     @classmethod
     def _encode_error(cls, error):
         return json.dumps(cls._encode_error_dict(error))
@@ -845,6 +2342,20 @@ class ResourceRevision(object):
     def _decode_metadata(db_metadata):
         return json.loads(db_metadata)
     
+    @staticmethod
+    def _estimated_size(revision: ResourceRevision) -> int:
+        """
+        Returns the approximate number of bytes of memory used by the specified
+        revision, not counting its body (which is not held in memory).
+        """
+        size = 500  # object and container overhead
+        if revision.metadata is not None:
+            for (name, value) in revision.metadata['headers']:
+                size += len(name) + len(value)
+        if revision.error is not None:
+            size += len(str(revision.error))
+        return size
+    
     # === Properties ===
     
     @property
@@ -861,11 +2372,11 @@ class ResourceRevision(object):
     
     def _ensure_has_body(self):
         if not self.has_body:
-            raise ValueError('Resource "%s" has no body.' % self._url)
+            raise ValueError('Resource "%s" has no body.' % self.resource.url)
     
     @property
-    def _body_filepath(self):
-        return os.path.join(self.project.path, Project._RESOURCE_REVISION_DIRNAME, str(self._id))
+    def _body_store(self) -> RevisionBodyStore:
+        return self.project._body_store_for(self)
     
     # === Metadata ===
     
@@ -877,10 +2388,7 @@ class ResourceRevision(object):
     
     @property
     def status_code(self) -> Optional[int]:
-        if self.metadata is None:
-            return None
-        else:
-            return self.metadata['status_code']
+        return self._status_code
     
     @property
     def is_redirect(self):
@@ -888,8 +2396,12 @@ class ResourceRevision(object):
         return self.is_http and (self.metadata['status_code'] // 100) == 3
     
     def _get_first_value_of_http_header(self, name):
+        return self._first_value_of_http_header(self.metadata['headers'], name)
+    
+    @staticmethod
+    def _first_value_of_http_header(headers, name):
         name = name.lower()
-        for (cur_name, cur_value) in self.metadata['headers']:
+        for (cur_name, cur_value) in headers:
             if name == cur_name.lower():
                 return cur_value
         return None
@@ -932,21 +2444,12 @@ class ResourceRevision(object):
     @property
     def declared_charset(self) -> Optional[str]:  # ex: 'utf-8'
         """Returns the charset declared for this resource, or None if not declared."""
-        content_type_with_options = self.declared_content_type_with_options
-        if content_type_with_options is None:
-            return None
-        else:
-            (content_type, content_type_options) = cgi.parse_header(content_type_with_options)
-            return content_type_options.get('charset')
+        return self._charset
     
     @property
-    def content_type(self) -> Optional[str]:  # ex: 'utf-8'
+    def content_type(self) -> Optional[str]:  # ex: 'text/html'
         """Returns the MIME content type declared or guessed for this resource, or None if unknown."""
-        declared = self.declared_content_type
-        if declared is not None:
-            return declared
-        (content_type, encoding) = mimetypes.guess_type(self._url)
-        return content_type
+        return self._content_type
     
     @property
     def is_html(self) -> bool:
@@ -962,17 +2465,46 @@ class ResourceRevision(object):
     
     def size(self):
         """
-        Returns the size of this resource's body.
+        Returns the size of this resource's body,
+        after it is decoded from its `body_encoding`.
         """
         self._ensure_has_body()
-        return os.path.size(self._body_filepath)
+        if self._body_size is None:
+            self._body_size = self._body_store.size(self)
+        return self._body_size
     
-    def open(self):
+    @property
+    def body_encoding(self) -> Optional[str]:
+        """
+        The encoding that this revision's body is stored with on disk,
+        such as 'gzip', or None if it is stored unencoded.
+        """
+        return self._body_encoding
+    
+    def open(self, *, decode: bool=True) -> BinaryIO:
         """
         Opens the body of this resource for reading, returning a file-like object.
+        
+        Arguments:
+        decode -- whether to decode the body from its `body_encoding`.
+                  If False then the body is read exactly as it is stored on disk.
+        """
+        self._ensure_has_body()
+        body_file = self._body_store.open(self)
+        if decode:
+            return open_decoded(body_file, self._body_encoding)
+        return body_file
+    
+    def stored_body_view(self) -> Optional[memoryview]:
+        """
+        Returns a read-only view of the body of this resource exactly as it is
+        stored on disk (in its `body_encoding`), without copying it,
+        or None if the body is not stored in a way that permits such a view.
+        
+        Only bodies stored in the packed layout or in memory permit such a view.
         """
         self._ensure_has_body()
-        return open(self._body_filepath, 'rb')
+        return self._body_store.view(self)
     
     def links(self):
         """
@@ -1025,14 +2557,16 @@ class ResourceRevision(object):
     def delete(self):
         project = self.project
         
-        body_filepath = self._body_filepath  # cache
-        if os.path.exists(body_filepath):
-            os.remove(body_filepath)
-        
-        c = project._db.cursor()
-        c.execute('delete from resource_revision where id=?', (self._id,))
-        project._db.commit()
+        if self.has_body:
+            # Delete the body and the revision together
+            self._body_store.delete(self)
+        else:
+            project._db_writer.execute(
+                'delete from resource_revision where id=?', (self._id,)
+            ).result()
         self._id = None
+        
+        project._resource_revision_did_delete(self)
     
     def __repr__(self):
         return "<ResourceRevision %s for '%s'>" % (self._id, self.resource.url)
@@ -1061,11 +2595,16 @@ class ResourceGroup(object):
     Persisted and auto-saved.
     """
     
+    # Number of resources matched against a changed url_pattern in each database write
+    _PERSIST_MEMBERS_BATCH_SIZE = 1000
+    
     def __init__(self, 
             project: Project, 
             name: str, 
             url_pattern: str, 
-            _id: Optional[int]=None) -> None:
+            _id: Optional[int]=None,
+            _members_persisted: bool=False,
+            _download_delay: Optional[float]=None) -> None:
         """
         Arguments:
         project -- associated `Project`.
@@ -1074,25 +2613,42 @@ class ResourceGroup(object):
         """
         self.project = project
         self.name = name
-        self.url_pattern = url_pattern
+        self._url_pattern = url_pattern
         self._url_pattern_re = ResourceGroup.create_re_for_url_pattern(url_pattern)
         self._source = None  # type: ResourceGroupSource
         self.listeners = []  # type: List[object]
+        # Whether the resource_group_member table holds the members matching url_pattern
+        self._members_persisted = _members_persisted
+        self._download_delay = _download_delay
+        self._id = _id
         
-        members = []
-        for r in self.project.resources:
-            if self.contains_url(r.url):
-                members.append(r)
-        self._members = members
-        
-        if project._loading:
-            self._id = _id
+        if project.lazy:
+            # (Members are loaded on demand)
+            self._members = None  # type: Optional[simpleorderedset]
         else:
-            c = project._db.cursor()
-            c.execute('insert into resource_group (name, url_pattern) values (?, ?)', (name, url_pattern))
-            project._db.commit()
-            self._id = c.lastrowid
-        project._resource_groups.append(self)
+            self._members = self._find_members()
+        
+        if not project._loading:
+            members = self._members  # capture
+            def insert_group(c: sqlite3.Cursor) -> int:
+                c.execute(
+                    'insert into resource_group (name, url_pattern) values (?, ?)',
+                    (name, url_pattern))
+                group_id = c.lastrowid
+                if members is not None:
+                    c.executemany(
+                        'insert into resource_group_member (group_id, resource_id) values (?, ?)',
+                        [(group_id, r._id) for r in members])
+                    c.execute(
+                        'update resource_group set member_url_pattern=url_pattern where id=?',
+                        (group_id,))
+                return group_id
+            self._id = project._db_writer.call(insert_group).result()
+            self._members_persisted = (members is not None)
+        project._resource_group_did_load(self)
+        
+        if not project._loading and not self._members_persisted:
+            self._persist_members_later()
     
     def _init_source(self, source: ResourceGroupSource) -> None:
         self._source = source
@@ -1106,12 +2662,14 @@ class ResourceGroup(object):
             if rg.source == self:
                 rg.source = None
         
-        c = self.project._db.cursor()
-        c.execute('delete from resource_group where id=?', (self._id,))
-        self.project._db.commit()
+        old_id = self._id  # capture
+        def delete_group(c: sqlite3.Cursor) -> None:
+            c.execute('delete from resource_group_member where group_id=?', (old_id,))
+            c.execute('delete from resource_group where id=?', (old_id,))
+        self.project._db_writer.call(delete_group).result()
         self._id = None
         
-        self.project._resource_groups.remove(self)
+        self.project._resource_group_did_delete(self, old_id)
     
     def _get_source(self) -> ResourceGroupSource:
         """
@@ -1135,13 +2693,121 @@ class ResourceGroup(object):
         else:
             raise ValueError('Not a valid type of source.')
         
-        c = self.project._db.cursor()
-        c.execute('update resource_group set source_type=?, source_id=? where id=?', (source_type, source_id, self._id))
-        self.project._db.commit()
+        self.project._db_writer.execute(
+            'update resource_group set source_type=?, source_id=? where id=?',
+            (source_type, source_id, self._id)
+        ).result()
         
         self._source = value
     source = cast(ResourceGroupSource, property(_get_source, _set_source))
     
+    def _get_url_pattern(self) -> str:
+        """
+        The url pattern matched by this group.
+        
+        Changing the pattern updates the in-memory members of this group
+        immediately but updates its persisted members in the background.
+        """
+        return self._url_pattern
+    def _set_url_pattern(self, url_pattern: str) -> None:
+        if url_pattern == self._url_pattern:
+            return
+        
+        self.project._db_writer.execute(
+            'update resource_group set url_pattern=? where id=?',
+            (url_pattern, self._id)
+        ).result()
+        
+        self._url_pattern = url_pattern
+        self._url_pattern_re = ResourceGroup.create_re_for_url_pattern(url_pattern)
+        self._members_persisted = False
+        self.project._resource_group_did_alter_url_pattern(self)
+        if self._members is not None:
+            self._members = self._find_members()
+        
+        self._persist_members_later()
+    url_pattern = property(_get_url_pattern, _set_url_pattern)
+    
+    def _get_download_delay(self) -> Optional[float]:
+        """
+        Minimum number of seconds to wait after downloading a member of this
+        group before requesting another resource from the same host,
+        or None to use only the delay of the member's host.
+        
+        See `Project.download_delay_for`.
+        """
+        return self._download_delay
+    def _set_download_delay(self, value: Optional[float]) -> None:
+        if value is not None and value < 0:
+            raise ValueError('Download delay cannot be negative.')
+        self.project._db_writer.execute(
+            'update resource_group set download_delay=? where id=?',
+            (value, self._id)
+        ).result()
+        self._download_delay = value
+    download_delay = property(_get_download_delay, _set_download_delay)
+    
+    def _persist_members_later(self) -> None:
+        """
+        Replaces the persisted members of this group with the resources
+        matching its current url_pattern, in a series of batched database
+        writes on a background thread.
+        
+        If the url_pattern changes again, or the group is deleted,
+        before the last batch is written then the remaining batches are skipped.
+        """
+        project = self.project
+        group_id = self._id
+        url_pattern = self._url_pattern
+        url_pattern_re = self._url_pattern_re
+        url_prefix = literal_prefix_of(url_pattern)
+        batch_size = self._PERSIST_MEMBERS_BATCH_SIZE
+        
+        # Returns the ID of the last resource matched, or None if no resources remain
+        def persist_batch(c: sqlite3.Cursor, last_id: int) -> Optional[int]:
+            row = c.execute('select url_pattern from resource_group where id=?', (group_id,)).fetchone()
+            if row is None or row[0] != url_pattern:
+                # Group was deleted or its url_pattern changed again
+                return None
+            if last_id == 0:
+                c.execute('delete from resource_group_member where group_id=?', (group_id,))
+            
+            rows = c.execute(
+                'select id, url from resource where id > ? order by id limit ?',
+                (last_id, batch_size)
+            ).fetchall()
+            c.executemany(
+                'insert or ignore into resource_group_member (group_id, resource_id) values (?, ?)',
+                [
+                    (group_id, id) for (id, url) in rows
+                    if url.startswith(url_prefix) and url_pattern_re.match(url) is not None
+                ])
+            if len(rows) < batch_size:
+                c.execute(
+                    'update resource_group set member_url_pattern=? where id=?',
+                    (url_pattern, group_id))
+                return None
+            return rows[-1][0]
+        
+        def persist_members() -> None:
+            last_id = 0  # type: Optional[int]
+            while last_id is not None:
+                try:
+                    last_id = project._db_writer.call(
+                        lambda c, last_id=last_id: persist_batch(c, last_id)
+                    ).result()
+                except ValueError:
+                    # Project closed. Will finish persisting when the project is next opened.
+                    return
+            # Commit before members are read back from the database
+            try:
+                project._db_writer.flush()
+            except ValueError:
+                return
+            if self._url_pattern == url_pattern and self._id == group_id:
+                self._members_persisted = True
+        bg_call_later(persist_members, daemon=True)
+    
     @staticmethod
     def create_re_for_url_pattern(url_pattern):
         """Converts a url pattern to a regex which matches it."""
@@ -1164,45 +2830,81 @@ class ResourceGroup(object):
         return re.compile(r'^' + patstr + r'$')
     
     def __contains__(self, resource: Resource) -> bool:
+        if self._members is None:
+            # Membership is defined entirely by URL, so there is
+            # no need to load all members just to check one resource
+            return self.contains_url(resource.url)
         return resource in self._members
     
     def contains_url(self, resource_url: str) -> bool:
         return self._url_pattern_re.match(resource_url) is not None
     
     @property
-    def members(self) -> List[Resource]:
+    def members(self) -> simpleorderedset:
+        """The `Resource`s in this group, in the order they were created."""
+        if self._members is None:
+            self._members = self._find_members()
         return self._members
     
-    # Called when a new Resource is created after the project has loaded
-    def _resource_did_instantiate(self, resource: Resource) -> None:
-        if self.contains_url(resource.url):
-            self._members.append(resource)
+    def _find_members(self) -> simpleorderedset:
+        if not self.project._loading:
+            # Include any members whose insert is not yet committed
+            self.project._db_writer.flush()
+        
+        if self._members_persisted:
+            c = self.project._read_db.cursor()
+            return simpleorderedset(
+                # NOTE: Returns any existing Resource with the same URL
+                Resource(self.project, url, _id=id)
+                for (url, id) in c.execute(
+                    'select resource.url, resource.id from resource_group_member '
+                    'join resource on resource.id = resource_group_member.resource_id '
+                    'where resource_group_member.group_id=? order by resource.id',
+                    (self._id,)
+                ).fetchall()
+            )
+        
+        # NOTE: Only resources starting with the literal prefix of the
+        #       pattern can match, and they can be found with an index
+        #       rather than by running the full regex against every URL
+        candidates = self.project.resources_with_url_prefix(literal_prefix_of(self.url_pattern))
+        return simpleorderedset(sorted(
+            (r for r in candidates if self.contains_url(r.url)),
+            key=lambda r: r._id))
+    
+    # Called when new Resources that match this group are created after the project has loaded
+    def _members_did_instantiate(self, resources: List[Resource]) -> None:
+        for resource in resources:
+            if self._members is not None:
+                self._members.add(resource)
             
             for lis in self.listeners:
                 if hasattr(lis, 'group_did_add_member'):
                     lis.group_did_add_member(self, resource)  # type: ignore[attr-defined]
     
-    def _resource_did_alter_url(self, 
-            resource: Resource, old_url: str, new_url: str) -> None:
-        if self.contains_url(old_url):
-            self._members.remove(resource)
-        if self.contains_url(new_url):
-            self._members.append(resource)
+    # Called when a Resource is renamed to a URL that matches this group
+    def _member_did_join(self, resource: Resource) -> None:
+        if self._members is None:
+            return
+        self._members.add(resource)
     
-    def _resource_did_delete(self, resource: Resource) -> None:
-        if resource in self._members:
-            self._members.remove(resource)
+    # Called when a Resource that matched this group is renamed or deleted
+    def _member_did_leave(self, resource: Resource) -> None:
+        if self._members is None:
+            return
+        self._members.discard(resource)
     
-    def download(self, needs_result: bool=False) -> None:
+    def download(self, needs_result: bool=False, *, priority: Optional[int]=None) -> None:
         """
         Downloads this group asynchronously.
         
-        A top-level Task will be created internally to display the progress.
+        A top-level Task will be created internally to display the progress,
+        with the specified priority (see `Project.add_task`).
         """
         if needs_result:
             raise ValueError('Download task for a group never has a result')
         task = self.create_download_task(needs_result=needs_result)
-        self.project.add_task(task)
+        self.project.add_task(task, priority)
     
     def create_download_task(self, needs_result: bool=False) -> DownloadResourceGroupTask:
         """
@@ -1219,23 +2921,36 @@ class ResourceGroup(object):
         from crystal.task import DownloadResourceGroupTask
         return DownloadResourceGroupTask(self)
     
-    def update_membership(self):
+    def update_membership(self, *, priority: Optional[int]=None) -> None:
         """
         Updates the membership of this group asynchronously.
         
-        A top-level Task will be created internally to display the progress.
+        A top-level Task will be created internally to display the progress,
+        with the specified priority (see `Project.add_task`).
         """
         if self.source is None:
             raise ValueError('Cannot update members of a group that lacks a source.')
         
         from crystal.task import UpdateResourceGroupMembersTask
         task = UpdateResourceGroupMembersTask(self)
-        self.project.add_task(task)
-
+        self.project.add_task(task, priority)
+    
     def __repr__(self):
         return 'ResourceGroup(%s,%s)' % (repr(self.name), repr(self.url_pattern))
 
 
+def _string_after_prefix(prefix: str) -> Optional[str]:
+    """
+    Returns the smallest string that sorts after every string starting with
+    the specified prefix, or None if there is no such string.
+    """
+    # NOTE: SQLite compares text as UTF-8 bytes, which sort in code point order
+    prefix = prefix.rstrip(chr(0x10FFFF))
+    if prefix == '':
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
 def _is_ascii(s: str) -> bool:
     assert isinstance(s, str)
     try:
@@ -8,6 +8,12 @@ class OpenProjectProgressListener:
     def opening_project(self, project_name: str) -> None:
         pass
     
+    def upgrading_project(self, description: str, item_count: int) -> None:
+        pass
+    
+    def upgrading_project_item(self, index: int) -> None:
+        pass
+    
     def loading_resources(self, resource_count: int) -> None:
         pass
     
@@ -66,6 +72,18 @@ class OpenProjectProgressDialog(OpenProjectProgressListener):
             style=wx.PD_AUTO_HIDE|wx.PD_APP_MODAL|wx.PD_CAN_ABORT
         )
     
+    @overrides
+    def upgrading_project(self, description: str, item_count: int) -> None:
+        assert self._dialog is not None
+        self._dialog.SetRange(max(item_count, 1))
+        self._dialog.Update(0, f'Upgrading project: {description}...')
+    
+    @overrides
+    def upgrading_project_item(self, index: int) -> None:
+        assert self._dialog is not None
+        # NOTE: Ignores requests to cancel, which would leave the project partly upgraded
+        self._dialog.Update(index)
+    
     @overrides
     def loading_resources(self, resource_count: int) -> None:
         assert self._dialog is not None
@@ -4,7 +4,7 @@ Runs on its own daemon thread.
 """
 
 from crystal.model import Resource
-from crystal.task import schedule_forever
+from crystal.task import PRIORITY_INTERACTIVE, schedule_forever
 from datetime import datetime
 from html import escape as html_escape
 from http import HTTPStatus
@@ -14,7 +14,7 @@ import os
 import re
 import shutil
 from textwrap import dedent
-from typing import Dict, Generator, Optional
+from typing import Dict, Generator, Optional, Tuple
 from urllib.parse import parse_qs, ParseResult, urljoin, urlparse, urlunparse
 from .xthreading import bg_call_later, fg_call_and_wait
 
@@ -161,6 +161,16 @@ class _RequestHandler(BaseHTTPRequestHandler):
     def referer(self) -> Optional[str]:
         return self.headers.get('Referer')
     
+    @property
+    def accepts_gzip(self) -> bool:
+        """Whether the client accepts a gzip-encoded response body."""
+        for coding in self.headers.get('Accept-Encoding', '').split(','):
+            (name, _, params) = coding.partition(';')
+            if name.strip().lower() in ('gzip', 'x-gzip'):
+                # Reject "gzip;q=0", which explicitly disallows gzip
+                return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+        return False
+    
     # === Handle Incoming Request ===
     
     def parse_request(self):  # override
@@ -230,11 +240,8 @@ class _RequestHandler(BaseHTTPRequestHandler):
             
             resource = self.project.get_resource(archive_url)
             if resource is None:
-                matching_rg = None
-                for rg in self.project.resource_groups:
-                    if rg.contains_url(archive_url):
-                        matching_rg = rg
-                        break
+                matching_rgs = self.project.match_groups(archive_url)
+                matching_rg = matching_rgs[0] if len(matching_rgs) > 0 else None
                 
                 # If the previously undiscovered resource is a member of an
                 # existing resource group, presume that the user is interested 
@@ -254,11 +261,14 @@ class _RequestHandler(BaseHTTPRequestHandler):
                     #       finished downloading. To avoid serving a broken
                     #       page we must wait longer for the embedded resources
                     #       to finish downloading.
+                    download_future = fg_call_and_wait(lambda: resource.download(
+                        wait_for_embedded=True,
+                        needs_result=False,
+                        # Serve the page ahead of any bulk downloads in progress
+                        priority=PRIORITY_INTERACTIVE,
+                    ))
                     try:
-                        resource.download(
-                            wait_for_embedded=True,
-                            needs_result=False,
-                        ).result()
+                        download_future.result()
                     except:
                         # Don't care if there was an error downloading
                         pass
@@ -267,7 +277,7 @@ class _RequestHandler(BaseHTTPRequestHandler):
                     self.send_resource_not_in_archive(archive_url)
                     return
             
-            revision = fg_call_and_wait(resource.default_revision)
+            revision = resource.default_revision()
             if revision is None:
                 self.send_resource_not_in_archive(archive_url)
                 return
@@ -454,10 +464,11 @@ class _RequestHandler(BaseHTTPRequestHandler):
     def send_http_revision(self, revision) -> None:
         metadata = revision.metadata
         
-        # Determine Content-Type to send
+        # Determine Content-Type and Content-Encoding to send
         sender = self.send_revision_body(revision)
+        (content_type_with_options, content_encoding) = next(sender)
         content_type_with_options = (
-            next(sender) or 
+            content_type_with_options or 
             revision.declared_content_type_with_options
         )
         
@@ -490,6 +501,9 @@ class _RequestHandler(BaseHTTPRequestHandler):
                     print_warning(
                         '*** Ignoring unknown header in archive: %s: %s' % (name, value))
                 continue
+        if content_encoding is not None:
+            self.send_header('Content-Encoding', content_encoding)
+            self.send_header('Vary', 'Accept-Encoding')
         self.end_headers()
         
         # Send body
@@ -501,10 +515,11 @@ class _RequestHandler(BaseHTTPRequestHandler):
             raise AssertionError()
     
     def send_generic_revision(self, revision) -> None:
-        # Determine what Content-Type to send
+        # Determine what Content-Type and Content-Encoding to send
         sender = self.send_revision_body(revision)
+        (content_type_with_options, content_encoding) = next(sender)
         content_type_with_options = (
-            next(sender) or 
+            content_type_with_options or 
             revision.declared_content_type_with_options
         )
         
@@ -514,6 +529,9 @@ class _RequestHandler(BaseHTTPRequestHandler):
         # Send headers
         if content_type_with_options is not None:
             self.send_header('Content-Type', content_type_with_options)
+        if content_encoding is not None:
+            self.send_header('Content-Encoding', content_encoding)
+            self.send_header('Vary', 'Accept-Encoding')
         self.end_headers()
         
         # Send body
@@ -524,23 +542,50 @@ class _RequestHandler(BaseHTTPRequestHandler):
         else:
             raise AssertionError()
     
-    def send_revision_body(self, revision) -> Generator[str, None, None]:
+    def send_revision_body(self, revision) -> Generator[Tuple[Optional[str], Optional[str]], None, None]:
+        """
+        Generator that first yields the (Content-Type, Content-Encoding) to send
+        for the specified revision and then, when resumed, sends its body.
+        """
         assert revision.has_body
         
         (doc, links, content_type_with_options) = revision.document_and_links()
         
-        # Send headers with content type
-        yield content_type_with_options
+        # If the body doesn't need to be rewritten and is already stored
+        # in an encoding the client accepts, send it exactly as stored
+        passthrough_encoding = (
+            revision.body_encoding
+            if (doc is None and
+                revision.body_encoding == 'gzip' and
+                self.accepts_gzip and
+                # (Don't double-encode a body that was already encoded by its origin)
+                not (revision.is_http and revision._get_first_value_of_http_header('content-encoding')))
+            else None
+        )
+        
+        # Send headers with content type and encoding
+        yield (content_type_with_options, passthrough_encoding)
         
         # Send body
         if doc is None:
             # Not a document. Cannot rewrite content.
-            with revision.open() as body:
-                try:
-                    shutil.copyfileobj(body, self.wfile)
-                except BrokenPipeError:
-                    # Browser did disconnect early
-                    return
+            send_stored_body = (revision.body_encoding is None or passthrough_encoding is not None)
+            try:
+                stored_body_view = revision.stored_body_view() if send_stored_body else None
+                if stored_body_view is not None:
+                    # Send bytes directly from the memory-mapped body to the socket
+                    self.wfile.write(stored_body_view)
+                else:
+                    with revision.open(decode=not send_stored_body) as body:
+                        if send_stored_body:
+                            # Send bytes directly from the file to the socket
+                            self.wfile.flush()
+                            self.connection.sendfile(body)
+                        else:
+                            shutil.copyfileobj(body, self.wfile)
+            except (BrokenPipeError, ConnectionResetError):
+                # Browser did disconnect early
+                return
         else:
             # Rewrite links in document
             base_url = revision.resource.url
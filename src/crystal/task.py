@@ -1,14 +1,39 @@
 from __future__ import annotations
 
 import sys
-from time import sleep
-from typing import List, Optional
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from .hostrate import HostRateController
 from .xfutures import Future
 from .xthreading import bg_call_later, fg_call_and_wait, fg_call_later
 
 SCHEDULING_STYLE_NONE = 0
-SCHEDULING_STYLE_SEQUENTIAL = 1
-SCHEDULING_STYLE_ROUND_ROBIN = 2
+SCHEDULING_STYLE_SEQUENTIAL = 1  # runs one child at a time, in order
+SCHEDULING_STYLE_ROUND_ROBIN = 2  # rotates among all children
+SCHEDULING_STYLE_PARALLEL = 3  # runs several children at once, preferring earlier children
+
+# Priorities of top-level tasks. The root task runs units from tasks with
+# a higher priority (a lower number) before units from other tasks.
+PRIORITY_INTERACTIVE = 0  # for work that the user is waiting on, like viewing a page
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2  # for bulk work that may be interrupted by any other work
+_PRIORITIES = [PRIORITY_INTERACTIVE, PRIORITY_NORMAL, PRIORITY_BACKGROUND]
+
+# Guards the structure of every task tree.
+# 
+# Task trees are only altered on the foreground thread but are also read by
+# each Scheduler on its own thread. A Scheduler with nothing to run waits on
+# _task_tree_did_change, which is notified whenever a task appends a child or
+# completes, since only those events can make a new task unit available.
+_task_tree_lock = threading.RLock()
+_task_tree_did_change = threading.Condition(_task_tree_lock)
+
+# Maximum number of children of a PARALLEL container, starting from its
+# first incomplete child, that are searched for a task unit. Bounds the time
+# spent searching a container with many children that cannot start yet,
+# such as downloads waiting for a host that is already busy.
+_PARALLEL_LOOKAHEAD = 256
 
 class Task(object):
     """
@@ -55,6 +80,8 @@ class Task(object):
         self._title = title
         self._subtitle = 'Queued'
         self.scheduling_style = SCHEDULING_STYLE_NONE
+        # One of the PRIORITY_* constants. Only used for top-level tasks.
+        self.priority = PRIORITY_NORMAL
         self._parent = None
         self._children = []
         self._num_children_complete = 0
@@ -64,7 +91,7 @@ class Task(object):
         self._did_yield_self = False            # used by leaf tasks
         self._future = Future()                 # used by leaf tasks
         # TODO: Consider merging the following two fields
-        self._first_incomplete_child_index = 0  # used by SCHEDULING_STYLE_SEQUENTIAL
+        self._first_incomplete_child_index = 0  # used by SCHEDULING_STYLE_SEQUENTIAL and _PARALLEL
         self._next_child_index = 0              # used by SCHEDULING_STYLE_ROUND_ROBIN
     
     # === Properties ===
@@ -93,6 +120,27 @@ class Task(object):
         fg_call_later(fg_task)
     subtitle = property(_get_subtitle, _set_subtitle)
     
+    @property
+    def url_host(self) -> Optional[str]:
+        """
+        The scheme and authority of the URL that this leaf task requests,
+        or None if it does not request a URL.
+        
+        Used by Schedulers to limit how many units request the same host at once.
+        """
+        return None
+    
+    @property
+    def delay_before_next_request(self) -> float:
+        """
+        The number of seconds that Schedulers should wait after this leaf
+        task's unit finishes before starting another unit that requests
+        the same url_host. Zero if the unit did not actually request its URL.
+        
+        Threadsafe.
+        """
+        return 0.0
+    
     @property
     def parent(self) -> Optional[Task]:
         return self._parent
@@ -138,10 +186,13 @@ class Task(object):
     # === Protected Operations ===
     
     def append_child(self, child: Task) -> None:
-        child._parent = self
-        self._children.append(child)
-        
-        child.listeners.append(self)
+        with _task_tree_lock:
+            child._parent = self
+            self._children.append(child)
+            
+            child.listeners.append(self)
+            
+            _task_tree_did_change.notify_all()
         
         for lis in self.listeners:
             if hasattr(lis, 'task_did_append_child'):
@@ -153,7 +204,13 @@ class Task(object):
         Threadsafe.
         """
         def fg_task():
-            self._complete = True
+            # NOTE: Doesn't hold the lock while listeners react, which may take
+            #       a long time, so that Schedulers aren't blocked meanwhile.
+            #       Listeners that alter the task tree take the lock themselves.
+            with _task_tree_lock:
+                self._complete = True
+                _task_tree_did_change.notify_all()
+            
             self.subtitle = 'Complete'
             
             # NOTE: Making a copy of the listener list since it is likely to be modified by callees.
@@ -170,10 +227,11 @@ class Task(object):
             raise ValueError('Some children are not complete.')
         if not all(c.complete for c in final_children):
             raise ValueError('Some final children are not complete.')
-        self.clear_children()
-        
-        for c in final_children:
-            self.append_child(c)
+        with _task_tree_lock:
+            self.clear_children()
+            
+            for c in final_children:
+                self.append_child(c)
     
     def clear_children(self) -> None:
         """
@@ -183,12 +241,13 @@ class Task(object):
         if not all(c.complete for c in self.children):
             raise ValueError('Some children are not complete.')
         
-        for child in self._children:
-            child._parent = None
-        self._children = []
-        
-        self._first_incomplete_child_index = 0
-        self._next_child_index = 0
+        with _task_tree_lock:
+            for child in self._children:
+                child._parent = None
+            self._children = []
+            
+            self._first_incomplete_child_index = 0
+            self._next_child_index = 0
         
         for lis in self.listeners:
             if hasattr(lis, 'task_did_clear_children'):
@@ -196,7 +255,7 @@ class Task(object):
     
     # === Public Operations ===
     
-    def try_get_next_task_unit(self):
+    def try_get_next_task_unit(self, may_start: Optional[Callable[[Task], bool]]=None):
         """
         Returns a callable ("task unit") that completes a unit of work for
         this task, or None if no more units can be provided until at least
@@ -204,9 +263,18 @@ class Task(object):
         
         Task units may be run on any thread.
         
+        Callers on threads other than the foreground thread
+        must hold _task_tree_lock.
+        
         If this is a leaf task, its own __call__() method will be returned
         as the solitary task unit. As a task unit, it must be designed to
         run on any thread.
+        
+        Arguments:
+        may_start -- if not None, a function called with each leaf task whose
+                     unit is about to be returned. If it returns False then
+                     that leaf task is skipped until a later call.
+                     If it returns True then the leaf task's unit is returned.
         """
         
         if self.complete:
@@ -214,6 +282,8 @@ class Task(object):
         
         if callable(self):
             if not self._did_yield_self:
+                if may_start is not None and not may_start(self):
+                    return None
                 self._did_yield_self = True
                 return self._call_self_and_record_result
             else:
@@ -229,9 +299,22 @@ class Task(object):
                     if self.children[self._first_incomplete_child_index].complete:
                         self._first_incomplete_child_index += 1
                     else:
+                        # Don't start later children until this child completes
+                        return self.children[self._first_incomplete_child_index].try_get_next_task_unit(may_start)
+                return None
+            elif self.scheduling_style == SCHEDULING_STYLE_PARALLEL:
+                while self._first_incomplete_child_index < len(self.children):
+                    if self.children[self._first_incomplete_child_index].complete:
+                        self._first_incomplete_child_index += 1
+                    else:
+                        # Start later children while earlier ones are running
+                        # or are waiting for their host
                         cur_child_index = self._first_incomplete_child_index
-                        while cur_child_index < len(self.children):
-                            unit = self.children[cur_child_index].try_get_next_task_unit()
+                        end_child_index = min(
+                            len(self.children),
+                            cur_child_index + _PARALLEL_LOOKAHEAD)
+                        while cur_child_index < end_child_index:
+                            unit = self.children[cur_child_index].try_get_next_task_unit(may_start)
                             if unit is not None:
                                 return unit
                             cur_child_index += 1
@@ -240,7 +323,7 @@ class Task(object):
             elif self.scheduling_style == SCHEDULING_STYLE_ROUND_ROBIN:
                 cur_child_index = self._next_child_index
                 while True:
-                    unit = self.children[cur_child_index].try_get_next_task_unit()
+                    unit = self.children[cur_child_index].try_get_next_task_unit(may_start)
                     if unit is not None:
                         self._next_child_index = (cur_child_index + 1) % len(self.children)
                         return unit
@@ -264,6 +347,16 @@ class Task(object):
         finally:
             self.finish()
     
+    def waiting_for_host(self, rate_description: Optional[str]) -> None:
+        """
+        Called by Schedulers whenever they skip this leaf task's unit because
+        its url_host is busy or cooling down, with a short description of
+        that host's current rate, or None if it is not known yet.
+        
+        Called while _task_tree_lock is held.
+        """
+        pass
+    
     # === Internal Events ===
     
     def task_subtitle_did_change(self, task):
@@ -285,10 +378,9 @@ _TASK_DISPOSED_EXCEPTION = TaskDisposedException()
 
 # ----------------------------------------------------------------------------------------
 from crystal.model import Resource
+from crystal.urls import split_url_host
 from urllib.parse import urljoin
 
-_DELAY_BETWEEN_DOWNLOADS = 1.0 # secs
-
 def _get_abstract_resource_title(abstract_resource):
     """
     Arguments:
@@ -315,42 +407,57 @@ class DownloadResourceBodyTask(Task):
         """
         Task.__init__(self, title='Downloading body: ' + _get_abstract_resource_title(abstract_resource))
         self._resource = abstract_resource.resource
+        self._did_request_url = False
+        # Last subtitle set by waiting_for_host(), if any
+        self._waiting_subtitle = None  # type: Optional[str]
+    
+    @property
+    def url_host(self) -> Optional[str]:
+        return split_url_host(self._resource.url)[0]
+    
+    @property
+    def delay_before_next_request(self) -> float:
+        if not self._did_request_url:
+            # Served from the project rather than from the host
+            return 0.0
+        return self._resource.project.download_delay_for(self._resource)
+    
+    def waiting_for_host(self, rate_description: Optional[str]) -> None:
+        subtitle = (
+            'Waiting for host...'
+            if rate_description is None
+            else 'Waiting for host (%s)...' % rate_description
+        )
+        # NOTE: Schedulers call this on every pass over the task tree,
+        #       so avoid updating the UI when nothing changed
+        if subtitle != self._waiting_subtitle:
+            self._waiting_subtitle = subtitle
+            self.subtitle = subtitle
     
     def __call__(self):
         # If the resource is already up-to-date, return its default revision
-        def fg_task():
-            if self._resource.up_to_date():
-                return self._resource.default_revision()
-            else:
-                return None
-        body_revision = fg_call_and_wait(fg_task)
-        if body_revision is not None:
-            return body_revision
+        # NOTE: Safe to read from this background thread
+        if self._resource.up_to_date:
+            body_revision = self._resource.default_revision()
+            if body_revision is not None:
+                return body_revision
         
         # TODO: Report errors (embedded in the ResourceRevision) using the completion subtitle.
         #       Need to add support for this behavior to Task.
-        try:
-            from crystal.download import download_resource_revision
-            body_revision = download_resource_revision(self._resource, self)
-            
-            # Automatically parse the body's links and create associated resources
-            self.subtitle = 'Parsing links...'
-            r = self._resource
-            links = body_revision.links()
-            urls = [urljoin(r.url, link.relative_url) for link in links]
-            
-            self.subtitle = 'Recording links...'
-            def fg_task():
-                # PERF: This is taking 1-2 sec to execute on THEM's Review List page.
-                #       Need to look at optimizing this to avoid blocking the UI.
-                for url in urls:
-                    Resource(r.project, url)
-            fg_call_and_wait(fg_task)
-            
-            return body_revision
-        finally:
-            self.subtitle = 'Waiting before performing next request...'
-            sleep(_DELAY_BETWEEN_DOWNLOADS)
+        from crystal.download import download_resource_revision
+        self._did_request_url = True
+        body_revision = download_resource_revision(self._resource, self)
+        
+        # Automatically parse the body's links and create associated resources
+        self.subtitle = 'Parsing links...'
+        r = self._resource
+        links = body_revision.links()
+        urls = [urljoin(r.url, link.relative_url) for link in links]
+        
+        self.subtitle = 'Recording links...'
+        fg_call_and_wait(lambda: r.project.bulk_get_or_create_resources(urls))
+        
+        return body_revision
 
 class DownloadResourceTask(Task):
     """
@@ -381,6 +488,8 @@ class DownloadResourceTask(Task):
             else None
         )
         
+        # Download the body and find its links before anything else.
+        # Embedded resources are downloaded several at once afterwards.
         self.scheduling_style = SCHEDULING_STYLE_SEQUENTIAL
         if self._download_body_task is not None:
             self.append_child(self._download_body_task)
@@ -454,7 +563,7 @@ class DownloadResourceTask(Task):
             links = self._parse_links_task.future.result()
             self._parse_links_task.dispose()
             
-            embedded_resources = []
+            embedded_link_urls = []
             link_urls_seen = set()
             for link in links:
                 if link.embedded:
@@ -463,10 +572,13 @@ class DownloadResourceTask(Task):
                         continue
                     else:
                         link_urls_seen.add(link_url)
-                    
-                    link_resource = Resource(self._resource.project, link_url)
-                    embedded_resources.append(link_resource)
+                    embedded_link_urls.append(link_url)
+            embedded_resources = self._resource.project.bulk_get_or_create_resources(
+                embedded_link_urls)
             
+            # Download embedded resources several at once,
+            # subject to the Scheduler's per-host limits
+            self.scheduling_style = SCHEDULING_STYLE_PARALLEL
             ancestor_downloading_resources = self._ancestor_downloading_resources()
             for resource in embedded_resources:
                 if resource in ancestor_downloading_resources:
@@ -645,14 +757,25 @@ class DownloadResourceGroupMembersTask(Task):
         self.group = group
         self.group.listeners.append(self)
         self._done_updating_group = False
+        # Number of members not yet downloaded from each host
+        self._remaining_count_for_host = {}  # type: Dict[str, int]
         
-        self.scheduling_style = SCHEDULING_STYLE_SEQUENTIAL
+        # Download several members at once, subject to the Scheduler's per-host limits
+        self.scheduling_style = SCHEDULING_STYLE_PARALLEL
         for member in group.members:
-            self.append_child(member.create_download_task(needs_result=False))
+            self._append_member(member)
         self._update_subtitle()
     
+    def try_get_next_task_unit(self, may_start=None):
+        # Has no children until the group's first member is found,
+        # which may be while other workers are still downloading the group's source
+        if len(self.children) == 0:
+            return None
+        
+        return super().try_get_next_task_unit(may_start)
+    
     def group_did_add_member(self, group, member):
-        self.append_child(member.create_download_task(needs_result=False))
+        self._append_member(member)
         self._update_subtitle()
     
     def group_did_finish_updating(self):
@@ -663,12 +786,33 @@ class DownloadResourceGroupMembersTask(Task):
     def child_task_did_complete(self, task):
         task.dispose()
         
+        url_host = split_url_host(task._resource.url)[0]
+        remaining_count = self._remaining_count_for_host.get(url_host, 0) - 1
+        if remaining_count <= 0:
+            self._remaining_count_for_host.pop(url_host, None)
+        else:
+            self._remaining_count_for_host[url_host] = remaining_count
+        
         self._update_subtitle()
         self._update_completed_status()
     
+    def _append_member(self, member: Resource) -> None:
+        url_host = split_url_host(member.url)[0]
+        self._remaining_count_for_host[url_host] = (
+            self._remaining_count_for_host.get(url_host, 0) + 1)
+        self.append_child(member.create_download_task(needs_result=False))
+    
     def _update_subtitle(self):
         of_phrase = 'of at least' if not self._done_updating_group else 'of'
-        self.subtitle = '%s %s %s item(s)' % (self.num_children_complete, of_phrase, len(self.children))
+        subtitle = '%s %s %s item(s)' % (self.num_children_complete, of_phrase, len(self.children))
+        
+        # Show the rate of the slowest host that members remain to be downloaded from
+        rate_description = self.group.project.host_rates.describe_slowest(
+            self._remaining_count_for_host.keys())
+        if rate_description is not None:
+            subtitle += ' (%s)' % rate_description
+        
+        self.subtitle = subtitle
     
     def _update_completed_status(self):
         if self.num_children_complete == len(self.children) and self._done_updating_group:
@@ -720,12 +864,33 @@ class RootTask(Task):
         
         self.scheduling_style = SCHEDULING_STYLE_ROUND_ROBIN
     
-    def try_get_next_task_unit(self):
+    def try_get_next_task_unit(self, may_start=None):
         # Only the root task is allowed to have no children normally
         if len(self.children) == 0:
             return None
         
-        return super(RootTask, self).try_get_next_task_unit()
+        # Take units from children with the highest priority first,
+        # rotating among children with the same priority
+        for priority in _PRIORITIES:
+            unit = self._try_get_next_task_unit_with_priority(priority, may_start)
+            if unit is not None:
+                return unit
+        return None
+    
+    def _try_get_next_task_unit_with_priority(self, priority: int, may_start):
+        start_child_index = self._next_child_index % len(self.children)
+        cur_child_index = start_child_index
+        while True:
+            child = self.children[cur_child_index]
+            if child.priority == priority:
+                unit = child.try_get_next_task_unit(may_start)
+                if unit is not None:
+                    self._next_child_index = (cur_child_index + 1) % len(self.children)
+                    return unit
+            cur_child_index = (cur_child_index + 1) % len(self.children)
+            if cur_child_index == start_child_index:
+                # Wrapped around and back to where we started without finding anything to do
+                return None
     
     def child_task_did_complete(self, task):
         task.dispose()
@@ -735,43 +900,186 @@ class RootTask(Task):
 
 # ----------------------------------------------------------------------------------------
 
-# TODO: Eliminate polling by adding logic to sleep appropriately until the
-#       root task has more children to process.
-_ROOT_TASK_POLL_INTERVAL = .1 # secs
-
-def schedule_forever(task):
+class Scheduler(object):
     """
-    Runs the specified task synchronously until it completes.
+    Runs the units of a task on a pool of background threads until the task
+    completes or the scheduler is closed.
+    
+    Units are obtained directly on the scheduler's threads rather than on
+    the foreground thread. While no unit is available the scheduler's threads
+    sleep until some task appends a child or completes.
     
-    This function is intended for testing, until a full scheduler class is written.
+    At most `max_workers` units run at once, and of those at most
+    `max_workers_per_host` request the same host. After a unit requests a host,
+    no other unit requests that host until the unit's delay_before_next_request
+    has elapsed. Units for a host that is busy or cooling down are skipped in
+    favor of units for other hosts, from later children of PARALLEL and
+    ROUND_ROBIN containers. SEQUENTIAL containers still run one child at a time.
     """
-    while True:
-        unit = task.try_get_next_task_unit()
-        if unit is None:
-            if task.complete:
+    
+    def __init__(self,
+            task: Task,
+            *, max_workers: int=1,
+            max_workers_per_host: int=1,
+            host_rates: Optional[HostRateController]=None) -> None:
+        """
+        Arguments:
+        task -- the task to run.
+        max_workers -- the number of threads that `start` runs units on.
+        max_workers_per_host -- the maximum number of units that may request
+                                the same host at once.
+        host_rates -- if not None, further limits the number of units that
+                      may request each host at once to the host's current
+                      adaptive concurrency.
+        """
+        if max_workers < 1:
+            raise ValueError('Expected max_workers >= 1 but was %r' % max_workers)
+        if max_workers_per_host < 1:
+            raise ValueError('Expected max_workers_per_host >= 1 but was %r' % max_workers_per_host)
+        self._task = task
+        self._max_workers = max_workers
+        self._max_workers_per_host = max_workers_per_host
+        self._host_rates = host_rates
+        self._closed = False
+        # Number of running units that request each host
+        self._worker_count_for_host = {}  # type: Dict[str, int]
+        # Earliest time.monotonic() at which each host that is cooling down
+        # may be requested again
+        self._next_request_time_for_host = {}  # type: Dict[str, float]
+    
+    def start(self) -> None:
+        """
+        Starts running the task's units on `max_workers` new daemon threads.
+        """
+        for _ in range(self._max_workers):
+            bg_call_later(self.run, daemon=True)
+    
+    def run(self) -> None:
+        """
+        Runs the task's units on the current thread, one at a time,
+        until the task completes or this scheduler is closed.
+        
+        May be called on several threads at once.
+        """
+        while True:
+            next_unit = self._wait_for_next_unit()
+            if next_unit is None:
                 break
-            else:
-                sleep(_ROOT_TASK_POLL_INTERVAL)
-                continue
-        unit()
+            (unit, leaf_task, url_host) = next_unit
+            try:
+                unit()
+            finally:
+                self._unit_did_finish(leaf_task, url_host)
+    
+    def close(self) -> None:
+        """
+        Stops running the task's units once any units currently running finish.
+        Threadsafe.
+        """
+        with _task_tree_lock:
+            self._closed = True
+            _task_tree_did_change.notify_all()
+    
+    def _wait_for_next_unit(self) -> Optional[Tuple[Callable[[], None], Task, Optional[str]]]:
+        """
+        Waits until the task provides a unit that may start and returns it
+        along with the leaf task that provided it and the host it requests,
+        or returns None if the task completed or this scheduler was closed.
+        """
+        started_task = [None]  # type: List[Optional[Task]]
+        started_url_host = [None]  # type: List[Optional[str]]
+        earliest_next_request_time = [None]  # type: List[Optional[float]]
+        # Rate of each host skipped so far, described at most once per pass
+        rate_description_for_host = {}  # type: Dict[str, Optional[str]]
+        def wait_for_host(leaf_task: Task, url_host: str) -> None:
+            if url_host not in rate_description_for_host:
+                rate_description_for_host[url_host] = (
+                    self._host_rates.describe(url_host)
+                    if self._host_rates is not None
+                    else None
+                )
+            leaf_task.waiting_for_host(rate_description_for_host[url_host])
+        def may_start(leaf_task: Task) -> bool:
+            url_host = leaf_task.url_host
+            if url_host is not None:
+                next_request_time = self._next_request_time_for_host.get(url_host)
+                if next_request_time is not None:
+                    if time.monotonic() < next_request_time:
+                        if (earliest_next_request_time[0] is None or
+                                next_request_time < earliest_next_request_time[0]):
+                            earliest_next_request_time[0] = next_request_time
+                        wait_for_host(leaf_task, url_host)
+                        return False
+                    del self._next_request_time_for_host[url_host]
+                
+                max_workers_for_host = self._max_workers_per_host
+                if self._host_rates is not None:
+                    max_workers_for_host = min(
+                        max_workers_for_host,
+                        self._host_rates.concurrency_for(url_host))
+                worker_count = self._worker_count_for_host.get(url_host, 0)
+                if worker_count >= max_workers_for_host:
+                    wait_for_host(leaf_task, url_host)
+                    return False
+                self._worker_count_for_host[url_host] = worker_count + 1
+            started_task[0] = leaf_task
+            started_url_host[0] = url_host
+            return True
+        
+        with _task_tree_lock:
+            while not self._closed:
+                earliest_next_request_time[0] = None
+                rate_description_for_host.clear()
+                unit = self._task.try_get_next_task_unit(may_start)
+                if unit is not None:
+                    assert started_task[0] is not None
+                    return (unit, started_task[0], started_url_host[0])
+                if self._task.complete:
+                    break
+                
+                # Wait for the task tree to change or for the
+                # first skipped host to finish cooling down
+                if earliest_next_request_time[0] is None:
+                    _task_tree_did_change.wait()
+                else:
+                    _task_tree_did_change.wait(
+                        max(0.0, earliest_next_request_time[0] - time.monotonic()))
+            return None
+    
+    def _unit_did_finish(self, leaf_task: Task, url_host: Optional[str]) -> None:
+        if url_host is None:
+            return
+        delay = 0.0
+        try:
+            delay = leaf_task.delay_before_next_request
+        finally:
+            with _task_tree_lock:
+                if delay > 0:
+                    self._next_request_time_for_host[url_host] = max(
+                        self._next_request_time_for_host.get(url_host, 0.0),
+                        time.monotonic() + delay)
+                
+                worker_count = self._worker_count_for_host[url_host] - 1
+                if worker_count == 0:
+                    del self._worker_count_for_host[url_host]
+                else:
+                    self._worker_count_for_host[url_host] = worker_count
+                
+                # Units for this host may start now, or once it cools down
+                _task_tree_did_change.notify_all()
+
+def schedule_forever(task: Task) -> None:
+    """
+    Runs the specified task synchronously until it completes.
+    """
+    Scheduler(task).run()
 
-def start_schedule_forever(task):
+def start_schedule_forever(task: Task) -> Scheduler:
     """
     Asynchronously runs the specified task until it completes.
     
-    This function is intended for testing, until a full scheduler class is written.
+    Returns the Scheduler running the task, which may be closed to stop it early.
     """
-    def bg_task():
-        while True:
-            def fg_task():
-                return (task.try_get_next_task_unit(), task.complete)
-            (unit, task_complete) = fg_call_and_wait(fg_task)
-            
-            if unit is None:
-                if task_complete:
-                    break
-                else:
-                    sleep(_ROOT_TASK_POLL_INTERVAL)
-                    continue
-            unit()  # Run unit directly on this bg thread
-    bg_call_later(bg_task, daemon=True)
+    scheduler = Scheduler(task)
+    scheduler.start()
+    return scheduler
@@ -0,0 +1,153 @@
+"""
+Matches URLs against many URL patterns at once.
+
+A URL pattern is a URL that may contain the metacharacters understood by
+`ResourceGroup.create_re_for_url_pattern`. Most patterns begin with a long
+literal prefix (such as "https://example.com/posts/"), so patterns are
+indexed in a trie by that prefix. Matching a URL walks the trie once along
+the URL, collecting only the few patterns whose prefix the URL starts with,
+and then checks just those patterns' regexes.
+"""
+
+import re
+from typing import Dict, Generic, Hashable, List, Optional, Pattern, Tuple, TypeVar
+
+_V = TypeVar('_V', bound=Hashable)
+
+# Characters in a URL pattern that do not match themselves literally
+_METACHARACTERS_RE = re.compile(r'[*#@]')
+
+
+def literal_prefix_of(url_pattern: str) -> str:
+    """
+    Returns the longest prefix of the specified URL pattern that contains
+    no metacharacters. Every URL matched by the pattern starts with this prefix.
+    """
+    m = _METACHARACTERS_RE.search(url_pattern)
+    return url_pattern if m is None else url_pattern[:m.start()]
+
+
+class _TrieNode(object):
+    __slots__ = ('children', 'entries')
+    
+    def __init__(self) -> None:
+        self.children = {}  # type: Dict[str, _TrieNode]
+        # Patterns whose literal prefix ends at this node,
+        # as (sequence number, regex, value)
+        self.entries = []  # type: List[Tuple[int, Pattern, object]]
+
+
+class UrlPatternMatcher(Generic[_V]):
+    """
+    Maps URL patterns to values and finds the values whose pattern
+    matches a URL in time roughly proportional to the URL's length,
+    rather than to the number of patterns.
+    
+    Values are returned in the order they were added.
+    
+    Not threadsafe. Callers must synchronize access.
+    """
+    
+    def __init__(self) -> None:
+        self._root = _TrieNode()
+        self._prefix_for_value = {}  # type: Dict[_V, str]
+        self._next_sequence = 0
+    
+    def add(self, url_pattern: str, url_pattern_re: Pattern, value: _V) -> None:
+        """
+        Adds a pattern that maps to the specified value.
+        
+        Arguments:
+        url_pattern -- the pattern.
+        url_pattern_re -- the regex that the pattern compiles to.
+        value -- the value to return from `match` when the pattern matches.
+                 Must not already be in this matcher.
+        """
+        if value in self._prefix_for_value:
+            raise ValueError('Value is already in this matcher: %r' % (value,))
+        self._add(url_pattern, url_pattern_re, value, self._next_sequence)
+        self._next_sequence += 1
+    
+    def update(self, url_pattern: str, url_pattern_re: Pattern, value: _V) -> None:
+        """
+        Changes the pattern that maps to the specified value,
+        keeping the value's original position in the order of `match` results.
+        
+        Raises KeyError if the value is not in this matcher.
+        """
+        sequence = self._remove(value)
+        self._add(url_pattern, url_pattern_re, value, sequence)
+    
+    def remove(self, value: _V) -> None:
+        """
+        Removes the pattern that maps to the specified value.
+        
+        Raises KeyError if the value is not in this matcher.
+        """
+        self._remove(value)
+    
+    def _add(self, url_pattern: str, url_pattern_re: Pattern, value: _V, sequence: int) -> None:
+        prefix = literal_prefix_of(url_pattern)
+        
+        node = self._root
+        for ch in prefix:
+            child = node.children.get(ch)
+            if child is None:
+                child = node.children[ch] = _TrieNode()
+            node = child
+        node.entries.append((sequence, url_pattern_re, value))
+        node.entries.sort(key=lambda e: e[0])
+        self._prefix_for_value[value] = prefix
+    
+    def _remove(self, value: _V) -> int:
+        """
+        Removes the pattern that maps to the specified value,
+        returning the value's sequence number.
+        """
+        prefix = self._prefix_for_value.pop(value)
+        
+        path = [self._root]
+        for ch in prefix:
+            path.append(path[-1].children[ch])
+        node = path[-1]
+        [sequence] = [e[0] for e in node.entries if e[2] is value]
+        node.entries = [e for e in node.entries if e[2] is not value]
+        
+        # Prune nodes that no longer lead to any pattern
+        for i in range(len(prefix) - 1, -1, -1):
+            node = path[i + 1]
+            if len(node.entries) > 0 or len(node.children) > 0:
+                break
+            del path[i].children[prefix[i]]
+        
+        return sequence
+    
+    def match(self, url: str) -> List[_V]:
+        """
+        Returns the values of all patterns that match the specified URL,
+        in the order they were added.
+        """
+        candidates = list(self._root.entries)
+        node = self._root  # type: Optional[_TrieNode]
+        for ch in url:
+            node = node.children.get(ch)  # type: ignore[union-attr]
+            if node is None:
+                break
+            if len(node.entries) > 0:
+                candidates.extend(node.entries)
+        
+        if len(candidates) == 0:
+            return []
+        if len(candidates) >= 2:
+            candidates.sort(key=lambda e: e[0])
+        return [
+            value
+            for (_, url_pattern_re, value) in candidates
+            if url_pattern_re.match(url) is not None
+        ]  # type: ignore[misc]
+    
+    def __contains__(self, value: object) -> bool:
+        return value in self._prefix_for_value
+    
+    def __len__(self) -> int:
+        return len(self._prefix_for_value)
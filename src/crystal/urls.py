@@ -1,5 +1,8 @@
+from typing import Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
 from urllib.parse import quote
 
+_V = TypeVar('_V')
+
 
 # Adapted from requote_uri() @ requests/utils.py
 def requote_uri(uri):
@@ -62,3 +65,93 @@ def is_unrewritable_url(url: str) -> bool:
         if url.startswith(prefix):
             return True
     return False
+
+
+def split_url_host(url: str) -> Tuple[str, str]:
+    """
+    Splits the specified URL into (1) its scheme and authority and
+    (2) everything after them, such that concatenating the parts
+    gives back the original URL.
+    
+    For example 'https://example.com/a/b?c' is split into
+    ('https://example.com', '/a/b?c'). A URI without an authority,
+    such as 'mailto:someone@example.com', is split into ('', uri).
+    """
+    scheme_end = url.find('://')
+    if scheme_end == -1:
+        return ('', url)
+    authority_start = scheme_end + len('://')
+    authority_end = len(url)
+    for delimiter in '/?#':
+        delimiter_index = url.find(delimiter, authority_start, authority_end)
+        if delimiter_index != -1:
+            authority_end = delimiter_index
+    return (url[:authority_end], url[authority_end:])
+
+
+class CompactUrlDict(Generic[_V]):
+    """
+    Dictionary whose keys are URLs, which stores the scheme and authority
+    shared by many URLs (such as 'https://example.com') only once.
+    
+    Keys can be given either as whole URLs or as the (host, suffix) parts
+    returned by `split`. Storing the parts returned by `split` lets the caller
+    share the same string objects with the dictionary rather than
+    keeping its own copy of each URL.
+    
+    Values are iterated in the order they were added, grouped by host.
+    """
+    
+    def __init__(self) -> None:
+        # Canonical string object for each host, so that each host is stored only once
+        self._hosts = {}  # type: Dict[str, str]
+        self._values_for_host = {}  # type: Dict[str, Dict[str, _V]]
+        self._len = 0
+    
+    def split(self, url: str) -> Tuple[str, str]:
+        """
+        Splits the specified URL like `split_url_host`, returning the
+        canonical string object for the host.
+        """
+        (host, suffix) = split_url_host(url)
+        return (self._hosts.setdefault(host, host), suffix)
+    
+    def get(self, url: str, default: Optional[_V]=None) -> Optional[_V]:
+        (host, suffix) = split_url_host(url)
+        values_for_suffix = self._values_for_host.get(host)
+        if values_for_suffix is None:
+            return default
+        return values_for_suffix.get(suffix, default)
+    
+    def set_parts(self, host: str, suffix: str, value: _V) -> None:
+        values_for_suffix = self._values_for_host.get(host)
+        if values_for_suffix is None:
+            values_for_suffix = self._values_for_host[host] = {}
+        if suffix not in values_for_suffix:
+            self._len += 1
+        values_for_suffix[suffix] = value
+    
+    def __setitem__(self, url: str, value: _V) -> None:
+        self.set_parts(*self.split(url), value)
+    
+    def __delitem__(self, url: str) -> None:
+        (host, suffix) = split_url_host(url)
+        values_for_suffix = self._values_for_host[host]
+        del values_for_suffix[suffix]
+        self._len -= 1
+        if len(values_for_suffix) == 0:
+            del self._values_for_host[host]
+            self._hosts.pop(host, None)
+    
+    def __contains__(self, url: object) -> bool:
+        return isinstance(url, str) and self.get(url) is not None
+    
+    def __len__(self) -> int:
+        return self._len
+    
+    def hosts(self) -> List[str]:
+        return list(self._values_for_host)
+    
+    def values(self) -> Iterator[_V]:
+        for values_for_suffix in self._values_for_host.values():
+            yield from values_for_suffix.values()
@@ -4,29 +4,41 @@ extended collections in the standard `collections` module.
 """
 
 from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
 
 class simpleorderedset(object):
-    """Ordered set that supports a limited set of operations."""
+    """
+    Ordered set that supports a limited set of operations.
     
-    def __init__(self):
-        self.set = set()
-        self.items = []
-        
-    def add(self, value):
-        old_size = len(self.set)
-        self.set.append(value)
-        new_size = len(self.set)
-        if new_size > old_size:
-            self.items.append(value)
+    Adding, removing, and checking for membership of a value takes O(1) time.
+    """
     
-    def __contains__(self, value):
-        return value in self.set
+    def __init__(self, values: Iterable=()) -> None:
+        # NOTE: Relies on dicts preserving insertion order
+        self._items = dict.fromkeys(values)  # type: Dict[Any, None]
     
-    def __len__(self):
-        return len(self.items)
+    def add(self, value) -> None:
+        self._items[value] = None
     
-    def __iter__(self):
-        return self.items.__iter__()
+    def remove(self, value) -> None:
+        """Removes the specified value, raising KeyError if it is not present."""
+        del self._items[value]
+    
+    def discard(self, value) -> None:
+        """Removes the specified value if it is present."""
+        self._items.pop(value, None)
+    
+    def __contains__(self, value) -> bool:
+        return value in self._items
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __iter__(self) -> Iterator:
+        return iter(self._items)
+    
+    def __repr__(self) -> str:
+        return 'simpleorderedset(%r)' % (list(self._items),)
 
 class defaultordereddict(OrderedDict):
     def __init__(self, default_factory=None):
@@ -39,3 +51,141 @@ class defaultordereddict(OrderedDict):
         value = self.default_factory()
         self[key] = value
         return value
+
+class lrucache(object):
+    """
+    Dictionary that holds at most `maxsize` items, discarding the least
+    recently used item whenever a new item would exceed that size.
+    
+    If a `weigh` function is provided then items are also discarded
+    whenever the total weight of all items would exceed `maxweight`.
+    
+    Getting or setting an item marks it as the most recently used.
+    `get` additionally counts cache `hits` and `misses`.
+    """
+    
+    def __init__(self,
+            maxsize: int,
+            *, maxweight: Optional[int]=None,
+            weigh: Optional[Callable[[Any], int]]=None) -> None:
+        """
+        Arguments:
+        maxsize -- maximum number of items.
+        maxweight -- maximum total weight of all items. Requires `weigh`.
+        weigh -- function that returns the weight of a value.
+        """
+        if maxsize <= 0:
+            raise ValueError('maxsize must be positive')
+        if (maxweight is None) != (weigh is None):
+            raise ValueError('maxweight and weigh must be specified together')
+        self.maxsize = maxsize
+        self.maxweight = maxweight
+        self._weigh = weigh
+        self._items = OrderedDict()  # type: OrderedDict
+        self._weights = {}  # type: Dict[Any, int]
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        else:
+            self.hits += 1
+            return value
+    
+    def __getitem__(self, key):
+        value = self._items[key]
+        self._items.move_to_end(key)
+        return value
+    
+    def __setitem__(self, key, value) -> None:
+        if key in self._items:
+            self._forget(key)
+        self._items[key] = value
+        if self._weigh is not None:
+            weight = self._weigh(value)
+            self._weights[key] = weight
+            self.weight += weight
+        while len(self._items) > self.maxsize:
+            self._forget(next(iter(self._items)))
+        if self.maxweight is not None:
+            while self.weight > self.maxweight and len(self._items) > 0:
+                self._forget(next(iter(self._items)))
+    
+    def __delitem__(self, key) -> None:
+        if key not in self._items:
+            raise KeyError(key)
+        self._forget(key)
+    
+    def pop(self, key, default=None):
+        if key not in self._items:
+            return default
+        return self._forget(key)
+    
+    def _forget(self, key):
+        if self._weigh is not None:
+            self.weight -= self._weights.pop(key)
+        return self._items.pop(key)
+    
+    def clear(self) -> None:
+        self._items.clear()
+        self._weights.clear()
+        self.weight = 0
+    
+    def __contains__(self, key) -> bool:
+        return key in self._items
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __iter__(self):
+        return iter(self._items)
+
+class bitset(object):
+    """
+    Set of nonnegative integers, stored compactly as one bit per integer
+    up to the largest integer in the set.
+    
+    Well-suited to holding database IDs, which are small and dense.
+    """
+    
+    def __init__(self, values: Iterable[int]=()) -> None:
+        self._bits = bytearray()
+        self._len = 0
+        for value in values:
+            self.add(value)
+    
+    def add(self, value: int) -> None:
+        if value < 0:
+            raise ValueError('bitset can only hold nonnegative integers')
+        (index, mask) = (value >> 3, 1 << (value & 7))
+        if index >= len(self._bits):
+            # Grow geometrically to amortize the cost of growing
+            self._bits.extend(bytes(max(index + 1 - len(self._bits), len(self._bits))))
+        if not (self._bits[index] & mask):
+            self._bits[index] |= mask
+            self._len += 1
+    
+    def discard(self, value: int) -> None:
+        (index, mask) = (value >> 3, 1 << (value & 7))
+        if 0 <= index < len(self._bits) and (self._bits[index] & mask):
+            self._bits[index] &= ~mask
+            self._len -= 1
+    
+    def __contains__(self, value: int) -> bool:
+        (index, mask) = (value >> 3, 1 << (value & 7))
+        return 0 <= index < len(self._bits) and bool(self._bits[index] & mask)
+    
+    def __len__(self) -> int:
+        return self._len
+    
+    def __iter__(self) -> Iterator[int]:
+        for (index, byte) in enumerate(self._bits):
+            if byte != 0:
+                for bit in range(8):
+                    if byte & (1 << bit):
+                        yield (index << 3) | bit
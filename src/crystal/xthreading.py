@@ -5,10 +5,15 @@ Currently most activities are performed on the same "foreground thread".
 This thread is responsible for:
 (1) running the GUI and
 (2) mediating access to model elements (including the underlying database).
+
+Background threads may read (but not alter) certain model elements directly,
+as documented by those elements.
 """
 
+from contextlib import contextmanager
 import sys
 import threading
+from typing import Iterator, Optional
 import wx
 
 # If True, then the runtime of foreground tasks is tracked to ensure
@@ -124,3 +129,77 @@ def bg_call_later(callable, daemon=False, *args):
     if daemon:
         thread.daemon = True
     thread.start()
+
+class ReadWriteLock(object):
+    """
+    Lock that can be held by many readers at once or by a single writer.
+    
+    Waiting writers take priority over new readers, so that a steady stream
+    of readers cannot starve a writer.
+    
+    A thread holding the write lock may reacquire the write lock or acquire
+    the read lock. A thread holding the read lock may reacquire the read lock
+    but may not acquire the write lock.
+    """
+    
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._reader_count = 0
+        self._writer = None  # type: Optional[int]
+        self._writer_depth = 0
+        self._waiting_writer_count = 0
+        self._local = threading.local()
+    
+    @contextmanager
+    def reading(self) -> Iterator[None]:
+        """Context that holds the read lock."""
+        me = threading.get_ident()
+        local_depth = getattr(self._local, 'read_depth', 0)
+        if self._writer == me or local_depth > 0:
+            # Already have access. Avoid deadlocking with waiting writers.
+            self._local.read_depth = local_depth + 1
+            try:
+                yield
+            finally:
+                self._local.read_depth = local_depth
+            return
+        
+        with self._condition:
+            while self._writer is not None or self._waiting_writer_count > 0:
+                self._condition.wait()
+            self._reader_count += 1
+        self._local.read_depth = 1
+        try:
+            yield
+        finally:
+            self._local.read_depth = 0
+            with self._condition:
+                self._reader_count -= 1
+                if self._reader_count == 0:
+                    self._condition.notify_all()
+    
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        """Context that holds the write lock."""
+        me = threading.get_ident()
+        if getattr(self._local, 'read_depth', 0) > 0 and self._writer != me:
+            raise RuntimeError('Cannot upgrade a read lock to a write lock.')
+        
+        with self._condition:
+            if self._writer != me:
+                self._waiting_writer_count += 1
+                try:
+                    while self._writer is not None or self._reader_count > 0:
+                        self._condition.wait()
+                finally:
+                    self._waiting_writer_count -= 1
+                self._writer = me
+            self._writer_depth += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer_depth -= 1
+                if self._writer_depth == 0:
+                    self._writer = None
+                    self._condition.notify_all()
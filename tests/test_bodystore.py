@@ -0,0 +1,158 @@
+from crystal.model import Project, Resource, ResourceRevision
+from io import BytesIO
+import os
+import pytest
+
+_METADATA = {
+    'http_version': 11,
+    'status_code': 200,
+    'reason_phrase': 'OK',
+    'headers': [['Content-Type', 'text/html']],
+}
+
+_BODY = b'<html><body>' + b'Hello, world! ' * 100 + b'</body></html>'
+
+
+@pytest.fixture
+def project_dirpath(tmp_path):
+    return os.path.join(str(tmp_path), 'test' + Project.FILE_EXTENSION)
+
+
+def _create_revision(project, url, body=_BODY):
+    return ResourceRevision.create_from_response(
+        Resource(project, url), _METADATA, BytesIO(body))
+
+
+def _read_default_revision(project, url):
+    revision = project.get_resource(url).default_revision()
+    with revision.open() as body_file:
+        return body_file.read()
+
+
+def _body_filenames(project_dirpath, dirname):
+    dirpath = os.path.join(project_dirpath, Project._RESOURCE_REVISION_DIRNAME, dirname)
+    return sorted(
+        filename
+        for (_, _, filenames) in os.walk(dirpath)
+        for filename in filenames
+    )
+
+
+def test_content_addressed_store_shares_one_body_file_between_identical_bodies(project_dirpath):
+    project = Project(project_dirpath)
+    project.revision_body_layout = Project.REVISION_BODY_LAYOUT_CONTENT_ADDRESSED
+    _create_revision(project, 'https://example.com/a')
+    _create_revision(project, 'https://example.com/b')
+    _create_revision(project, 'https://example.com/c', b'Other body')
+    project.close()
+    assert len(_body_filenames(project_dirpath, 'sha256')) == 2
+    
+    project = Project(project_dirpath)
+    try:
+        assert _read_default_revision(project, 'https://example.com/a') == _BODY
+        assert _read_default_revision(project, 'https://example.com/b') == _BODY
+        
+        # Shared body is kept until no revision refers to it
+        project.get_resource('https://example.com/a').default_revision().delete()
+        assert _read_default_revision(project, 'https://example.com/b') == _BODY
+        assert len(_body_filenames(project_dirpath, 'sha256')) == 2
+        
+        project.get_resource('https://example.com/b').default_revision().delete()
+        assert len(_body_filenames(project_dirpath, 'sha256')) == 1
+    finally:
+        project.close()
+
+
+def test_pack_revision_bodies_moves_flat_bodies_into_segment_files(project_dirpath):
+    project = Project(project_dirpath)
+    _create_revision(project, 'https://example.com/a')
+    _create_revision(project, 'https://example.com/b', b'Other body')
+    missing_revision = _create_revision(project, 'https://example.com/missing')
+    os.remove(os.path.join(
+        project_dirpath, Project._RESOURCE_REVISION_DIRNAME, str(missing_revision._id)))
+    
+    assert project.pack_revision_bodies() == [missing_revision._id]
+    assert project.revision_body_layout == Project.REVISION_BODY_LAYOUT_PACKED
+    assert _read_default_revision(project, 'https://example.com/a') == _BODY
+    _create_revision(project, 'https://example.com/c', b'Packed body')
+    project.close()
+    assert all(filename.endswith('.pack') for filename in _body_filenames(project_dirpath, ''))
+    
+    project = Project(project_dirpath)
+    try:
+        assert _read_default_revision(project, 'https://example.com/a') == _BODY
+        assert _read_default_revision(project, 'https://example.com/b') == b'Other body'
+        assert _read_default_revision(project, 'https://example.com/c') == b'Packed body'
+    finally:
+        project.close()
+
+
+def test_pack_revision_bodies_packs_shared_content_addressed_body_once(project_dirpath):
+    project = Project(project_dirpath)
+    project.revision_body_layout = Project.REVISION_BODY_LAYOUT_CONTENT_ADDRESSED
+    _create_revision(project, 'https://example.com/a')
+    _create_revision(project, 'https://example.com/b')
+    
+    assert project.pack_revision_bodies() == []
+    project.close()
+    assert _body_filenames(project_dirpath, 'sha256') == []
+    packs_dirpath = os.path.join(project_dirpath, Project._RESOURCE_REVISION_DIRNAME, 'packs')
+    assert sum(
+        os.path.getsize(os.path.join(packs_dirpath, filename))
+        for filename in _body_filenames(project_dirpath, 'packs')
+    ) == len(_BODY)
+    
+    project = Project(project_dirpath)
+    try:
+        assert _read_default_revision(project, 'https://example.com/a') == _BODY
+        assert _read_default_revision(project, 'https://example.com/b') == _BODY
+    finally:
+        project.close()
+
+
+@pytest.mark.parametrize('layout', [
+    Project.REVISION_BODY_LAYOUT_FLAT,
+    Project.REVISION_BODY_LAYOUT_CONTENT_ADDRESSED,
+    Project.REVISION_BODY_LAYOUT_PACKED,
+])
+@pytest.mark.parametrize('compression', [
+    Project.REVISION_BODY_COMPRESSION_NONE,
+    Project.REVISION_BODY_COMPRESSION_GZIP,
+])
+def test_body_can_be_read_after_reopening_project(project_dirpath, layout, compression):
+    project = Project(project_dirpath)
+    project.revision_body_layout = layout
+    project.revision_body_compression = compression
+    revision = _create_revision(project, 'https://example.com/')
+    assert revision.size() == len(_BODY)
+    project.close()
+    
+    project = Project(project_dirpath)
+    try:
+        revision = project.get_resource('https://example.com/').default_revision()
+        assert revision.body_encoding == (
+            'gzip' if compression == Project.REVISION_BODY_COMPRESSION_GZIP else None)
+        with revision.open() as body_file:
+            assert body_file.read() == _BODY
+        assert revision.size() == len(_BODY)
+        assert project._body_store_for(revision).size(revision) == len(_BODY)
+    finally:
+        project.close()
+
+
+@pytest.mark.parametrize('compression', [
+    Project.REVISION_BODY_COMPRESSION_NONE,
+    Project.REVISION_BODY_COMPRESSION_GZIP,
+])
+def test_body_can_be_read_from_in_memory_project(compression):
+    project = Project('test', in_memory=True)
+    try:
+        project.revision_body_compression = compression
+        revision = _create_revision(project, 'https://example.com/')
+        assert _read_default_revision(project, 'https://example.com/') == _BODY
+        assert project._body_store_for(revision).size(revision) == len(_BODY)
+        
+        revision.delete()
+        assert project.get_resource('https://example.com/').default_revision() is None
+    finally:
+        project.close()
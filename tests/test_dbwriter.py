@@ -0,0 +1,143 @@
+from crystal import dbwriter
+from crystal.dbwriter import DatabaseWriter
+import pytest
+import sqlite3
+import threading
+import time
+
+
+@pytest.fixture
+def db_filepath(tmp_path):
+    db_filepath = str(tmp_path / 'test.sqlite')
+    with sqlite3.connect(db_filepath) as db:
+        db.execute('create table item (id integer primary key, name text unique not null)')
+    return db_filepath
+
+
+@pytest.fixture
+def writer_and_statements(db_filepath):
+    statements = []
+    def connect():
+        db = sqlite3.connect(db_filepath, check_same_thread=False)
+        db.set_trace_callback(statements.append)
+        return db
+    writer = DatabaseWriter(connect)
+    yield (writer, statements)
+    writer.close()
+
+
+def _names(db_filepath):
+    with sqlite3.connect(db_filepath) as db:
+        return [name for (name,) in db.execute('select name from item order by id')]
+
+
+def test_execute_returns_lastrowid_and_flush_commits(writer_and_statements, db_filepath):
+    (writer, _) = writer_and_statements
+    assert writer.execute('insert into item (name) values (?)', ('a',)).result() == 1
+    assert writer.execute('insert into item (name) values (?)', ('b',)).result() == 2
+    writer.flush()
+    assert _names(db_filepath) == ['a', 'b']
+
+
+def test_failing_write_does_not_roll_back_other_writes_in_same_transaction(writer_and_statements, db_filepath):
+    (writer, _) = writer_and_statements
+    futures = [
+        writer.execute('insert into item (name) values (?)', (name,))
+        for name in ['a', 'a', 'b']
+    ]
+    writer.flush()
+    assert futures[0].result() == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result()
+    assert futures[2].result() == 2
+    assert _names(db_filepath) == ['a', 'b']
+
+
+def test_writes_scheduled_together_are_committed_in_one_transaction(writer_and_statements, db_filepath):
+    (writer, statements) = writer_and_statements
+    threads = [
+        threading.Thread(target=lambda i=i: writer.execute('insert into item (name) values (?)', (str(i),)))
+        for i in range(100)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.flush()
+    
+    assert len(_names(db_filepath)) == 100
+    assert statements.count('commit') < 100
+
+
+def test_write_result_is_available_before_commit(writer_and_statements, db_filepath, monkeypatch):
+    (writer, statements) = writer_and_statements
+    monkeypatch.setattr(dbwriter, '_MAX_BATCH_DELAY', 1.0)
+    
+    # Waiting for a write waits only for it to be executed
+    start_time = time.monotonic()
+    assert writer.execute('insert into item (name) values (?)', ('a',)).result() == 1
+    assert writer.execute('insert into item (name) values (?)', ('b',)).result() == 2
+    assert time.monotonic() - start_time < 0.5
+    assert _names(db_filepath) == []
+    
+    # Flushing commits without waiting for other writes to join the transaction
+    writer.flush()
+    assert time.monotonic() - start_time < 0.5
+    assert _names(db_filepath) == ['a', 'b']
+    assert statements.count('commit') == 1
+
+
+def test_wait_for_own_writes_waits_only_for_writes_by_current_thread(writer_and_statements, db_filepath, monkeypatch):
+    (writer, statements) = writer_and_statements
+    monkeypatch.setattr(dbwriter, '_MAX_BATCH_DELAY', 1.0)
+    
+    # Nothing to wait for
+    start_time = time.monotonic()
+    writer.wait_for_own_writes()
+    assert statements.count('commit') == 0
+    
+    # Writes by another thread are not waited for
+    other_thread = threading.Thread(
+        target=lambda: writer.execute('insert into item (name) values (?)', ('a',)).result())
+    other_thread.start()
+    other_thread.join()
+    writer.wait_for_own_writes()
+    assert statements.count('commit') == 0
+    
+    # Writes by this thread are committed without waiting for the batch delay
+    writer.execute('insert into item (name) values (?)', ('b',))
+    writer.wait_for_own_writes()
+    assert _names(db_filepath) == ['a', 'b']
+    assert time.monotonic() - start_time < 0.5
+
+
+def test_flush_raises_error_from_failed_commit(db_filepath):
+    def connect():
+        db = sqlite3.connect(db_filepath, check_same_thread=False)
+        # Violations of deferred foreign keys are detected only on commit
+        db.execute('pragma foreign_keys=on')
+        db.execute('create table child (parent_id integer references item (id) deferrable initially deferred)')
+        return db
+    writer = DatabaseWriter(connect)
+    try:
+        writer.execute('insert into item (name) values (?)', ('a',)).result()
+        writer.execute('insert into child (parent_id) values (?)', (999,)).result()
+        with pytest.raises(sqlite3.IntegrityError):
+            writer.flush()
+        assert _names(db_filepath) == []
+        
+        # Error is raised only once
+        writer.execute('insert into item (name) values (?)', ('b',))
+        writer.flush()
+        assert _names(db_filepath) == ['b']
+    finally:
+        writer.close()
+
+
+def test_close_commits_scheduled_writes_and_rejects_new_writes(db_filepath):
+    writer = DatabaseWriter(lambda: sqlite3.connect(db_filepath, check_same_thread=False))
+    writer.execute('insert into item (name) values (?)', ('a',))
+    writer.close()
+    assert _names(db_filepath) == ['a']
+    with pytest.raises(ValueError):
+        writer.execute('insert into item (name) values (?)', ('b',))
@@ -0,0 +1,73 @@
+from crystal.hostrate import HostRateController, parse_retry_after
+from email.utils import formatdate
+import time
+
+
+def test_healthy_responses_shrink_delay_to_minimum_then_allow_more_requests_at_once():
+    rates = HostRateController(lambda url_host: (0.3, 0.1), max_concurrency=2)
+    assert rates.delay_for('https://example.com') == 0.3
+    assert rates.concurrency_for('https://example.com') == 1
+
+    for _ in range(5):
+        rates.record_response('https://example.com', latency=0.01, status_code=200)
+    assert rates.delay_for('https://example.com') == 0.1
+    assert rates.concurrency_for('https://example.com') == 2
+
+
+def test_overloaded_responses_grow_delay_and_allow_fewer_requests_at_once():
+    rates = HostRateController(lambda url_host: (0.0, 0.0), max_concurrency=4)
+    for _ in range(10):
+        rates.record_response('https://example.com', latency=0.01, status_code=200)
+    assert rates.concurrency_for('https://example.com') == 4
+
+    rates.record_response('https://example.com', latency=0.01, status_code=429)
+    assert rates.delay_for('https://example.com') == 0.5
+    assert rates.concurrency_for('https://example.com') == 2
+
+    rates.record_failure('https://example.com')
+    assert rates.delay_for('https://example.com') == 1.0
+    assert rates.concurrency_for('https://example.com') == 1
+
+    # Slow response, relative to the host's usual latency
+    rates.record_response('https://example.com', latency=2.0, status_code=200)
+    assert rates.delay_for('https://example.com') == 2.0
+
+    # Other hosts are unaffected
+    assert rates.delay_for('https://other.com') == 0.0
+
+
+def test_retry_after_pauses_host():
+    rates = HostRateController(lambda url_host: (0.0, 0.0))
+    rates.record_response('https://example.com', latency=0.01, status_code=503, retry_after=30)
+    assert rates.delay_for('https://example.com') > 29
+    assert rates.describe('https://example.com') == 'paused 30s'
+
+    rates.reset('https://example.com')
+    assert rates.delay_for('https://example.com') == 0.0
+    assert rates.describe('https://example.com') is None
+
+
+def test_describe_slowest_describes_slowest_host_that_has_responded():
+    rates = HostRateController(lambda url_host: (0.0, 0.0), max_concurrency=1)
+    rates.record_response('https://fast.example.com', latency=0.1, status_code=200)
+    rates.record_response('https://slow.example.com', latency=0.5, status_code=200)
+    assert rates.describe_slowest(['https://fast.example.com']) == '10.0 req/s'
+    assert rates.describe_slowest([
+        'https://fast.example.com',
+        'https://slow.example.com',
+        'https://new.example.com',
+    ]) == 'slowest of 3 hosts: 2.0 req/s'
+    assert rates.describe_slowest(['https://new.example.com']) is None
+
+    # Paused hosts are slowest
+    rates.record_response('https://fast.example.com', latency=0.1, status_code=503, retry_after=30)
+    assert rates.describe_slowest([
+        'https://fast.example.com',
+        'https://slow.example.com',
+    ]) == 'slowest of 2 hosts: paused 30s'
+
+
+def test_parse_retry_after_accepts_seconds_and_http_dates():
+    assert parse_retry_after('120') == 120
+    assert 59 <= parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after('soon') is None
@@ -0,0 +1,252 @@
+from crystal.model import Project, Resource, ResourceGroup, ResourceRevision, RootResource
+from crystal.progress import OpenProjectProgressListener
+from io import BytesIO
+import json
+import os
+import pytest
+import sqlite3
+import threading
+import time
+
+_METADATA = {
+    'http_version': 11,
+    'status_code': 200,
+    'reason_phrase': 'OK',
+    'headers': [['Content-Type', 'text/plain']],
+}
+
+
+@pytest.fixture
+def project_dirpath(tmp_path):
+    return os.path.join(str(tmp_path), 'test' + Project.FILE_EXTENSION)
+
+
+def test_writes_are_saved_when_project_is_closed(project_dirpath):
+    project = Project(project_dirpath)
+    project.default_url_prefix = 'https://example.com/'
+    (home, about) = project.bulk_get_or_create_resources([
+        'https://example.com/',
+        'https://example.com/about',
+    ])
+    RootResource(project, 'Home', home)
+    ResourceGroup(project, 'Pages', 'https://example.com/*')
+    # Record a revision on another thread, like a download worker does
+    thread = threading.Thread(target=lambda: ResourceRevision.create_from_response(
+        about, _METADATA, BytesIO(b'About us')))
+    thread.start()
+    thread.join()
+    project.close()
+    
+    project = Project(project_dirpath)
+    try:
+        assert project.default_url_prefix == 'https://example.com/'
+        assert [r.url for r in project.resources] == ['https://example.com/', 'https://example.com/about']
+        assert [(rr.name, rr.url) for rr in project.root_resources] == [('Home', 'https://example.com/')]
+        assert [rg.name for rg in project.resource_groups] == ['Pages']
+        with project.get_resource('https://example.com/about').default_revision().open() as body_file:
+            assert body_file.read() == b'About us'
+    finally:
+        project.close()
+
+
+def test_close_may_be_called_more_than_once(project_dirpath):
+    project = Project(project_dirpath)
+    project.close()
+    project.close()
+
+
+def test_lazy_project_loads_resources_on_demand_after_reopen(project_dirpath, monkeypatch):
+    urls = ['https://example.com/%d' % i for i in range(3)]
+    project = Project(project_dirpath)
+    project.bulk_get_or_create_resources(urls)
+    project.close()
+    
+    # Large projects are opened lazily unless the caller specifies otherwise
+    monkeypatch.setattr(Project, '_LAZY_RESOURCE_COUNT_THRESHOLD', 2)
+    project = Project(project_dirpath)
+    try:
+        assert project.lazy
+        
+        resource = project.get_resource(urls[1])
+        assert resource is not None
+        assert resource.url == urls[1]
+        assert project.get_resource(urls[1]) is resource
+        assert project.get_resource('https://example.com/missing') is None
+        assert [r.url for r in project.resources] == urls
+        
+        new_resource = Resource(project, 'https://example.com/new')
+        assert project.get_resource('https://example.com/new') is new_resource
+    finally:
+        project.close()
+    
+    project = Project(project_dirpath, lazy=False)
+    try:
+        assert not project.lazy
+        assert [r.url for r in project.resources] == urls + ['https://example.com/new']
+    finally:
+        project.close()
+
+
+def _wait_for_members_persisted(group):
+    deadline = time.monotonic() + 5.0
+    while not group._members_persisted:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_group_members_are_saved_when_project_is_closed(project_dirpath):
+    project = Project(project_dirpath)
+    project.bulk_get_or_create_resources([
+        'https://example.com/post/1',
+        'https://example.com/about',
+        'https://example.com/contact',
+    ])
+    posts = ResourceGroup(project, 'Posts', 'https://example.com/post/#')
+    pages = ResourceGroup(project, 'Pages', 'https://example.com/*')
+    # Members created after the group
+    project.bulk_get_or_create_resources(['https://example.com/post/2'])
+    # Members persisted in the background after the pattern changes
+    pages.url_pattern = 'https://example.com/a*'
+    _wait_for_members_persisted(pages)
+    project.close()
+    
+    # Load members from the database rather than by matching URLs
+    project = Project(project_dirpath, lazy=True)
+    try:
+        posts = project.get_resource_group('Posts')
+        pages = project.get_resource_group('Pages')
+        assert posts._members_persisted and pages._members_persisted
+        assert [r.url for r in posts.members] == [
+            'https://example.com/post/1',
+            'https://example.com/post/2',
+        ]
+        assert [r.url for r in pages.members] == ['https://example.com/about']
+    finally:
+        project.close()
+
+
+def test_resources_with_url_prefix_stops_at_prefix_boundary_and_pages_by_url(project_dirpath):
+    project = Project(project_dirpath)
+    try:
+        project.bulk_get_or_create_resources([
+            'https://example.com/a/2',
+            'https://example.com/a.',  # sorts just before the prefix
+            'https://example.com/a',
+            'https://example.com/a0',  # sorts just after the prefix
+            'https://example.com/a/1',
+            'https://example.com/a/',
+        ])
+        prefix = 'https://example.com/a/'
+        assert [r.url for r in project.resources_with_url_prefix(prefix)] == [
+            'https://example.com/a/',
+            'https://example.com/a/1',
+            'https://example.com/a/2',
+        ]
+        
+        pages = []
+        after_url = None
+        while True:
+            page = project.resources_with_url_prefix(prefix, after_url=after_url, limit=2)
+            if len(page) == 0:
+                break
+            pages.append([r.url for r in page])
+            after_url = page[-1].url
+        assert pages == [
+            ['https://example.com/a/', 'https://example.com/a/1'],
+            ['https://example.com/a/2'],
+        ]
+        
+        assert len(project.resources_with_url_prefix('')) == 6
+        assert project.resources_with_url_prefix('https://example.com/b') == []
+    finally:
+        project.close()
+
+
+def _create_older_project(project_dirpath, body):
+    """
+    Creates a project in the format written by versions of Crystal
+    before revision summaries, body storage options, persisted group
+    membership, and resource hosts were added.
+    """
+    revisions_dirpath = os.path.join(project_dirpath, Project._RESOURCE_REVISION_DIRNAME)
+    os.makedirs(revisions_dirpath)
+    db = sqlite3.connect(os.path.join(project_dirpath, Project._DB_FILENAME))
+    try:
+        c = db.cursor()
+        c.execute('create table project_property (name text unique not null, value text)')
+        c.execute('create table resource (id integer primary key, url text unique not null)')
+        c.execute('create table root_resource (id integer primary key, name text not null, resource_id integer unique not null, foreign key (resource_id) references resource(id))')
+        c.execute('create table resource_group (id integer primary key, name text not null, url_pattern text not null, source_type text, source_id integer)')
+        c.execute('create table resource_revision (id integer primary key, resource_id integer not null, error text not null, metadata text not null)')
+        c.execute('create index resource_revision__resource_id on resource_revision (resource_id)')
+        
+        c.executemany('insert into resource (id, url) values (?, ?)', [
+            (1, 'https://example.com/'),
+            (2, 'https://example.com/post/1'),
+            (3, 'https://cdn.example.net/logo.png'),
+            (4, 'mailto:me@example.com'),
+        ])
+        c.execute("insert into resource_group (name, url_pattern) values ('Posts', 'https://example.com/post/*')")
+        c.execute('insert into resource_revision (id, resource_id, error, metadata) values (?, ?, ?, ?)',
+            (1, 1, json.dumps(None), json.dumps(_METADATA)))
+        c.execute('insert into resource_revision (id, resource_id, error, metadata) values (?, ?, ?, ?)',
+            (2, 2, json.dumps({'type': 'TimeoutError', 'message': 'timed out'}), json.dumps(None)))
+        db.commit()
+    finally:
+        db.close()
+    with open(os.path.join(revisions_dirpath, '1'), 'wb') as body_file:
+        body_file.write(body)
+
+
+def test_older_project_is_upgraded_when_opened(project_dirpath):
+    _create_older_project(project_dirpath, b'Home page')
+    
+    upgrade_descriptions = []
+    class ProgressListener(OpenProjectProgressListener):
+        def upgrading_project(self, description, item_count):
+            upgrade_descriptions.append(description)
+    project = Project(project_dirpath, ProgressListener())
+    try:
+        assert 'Summarizing revisions' in upgrade_descriptions
+        assert 'Finding hosts of resources' in upgrade_descriptions
+        
+        # Revision summary columns
+        home_revision = project.get_resource('https://example.com/').default_revision()
+        assert home_revision.status_code == 200
+        assert home_revision.content_type == 'text/plain'
+        assert home_revision.size() == len(b'Home page')
+        error_revision = project.get_resource('https://example.com/post/1').default_revision()
+        assert not error_revision.has_body
+        assert error_revision.error is not None
+        
+        # Revision storage columns
+        assert home_revision.body_encoding is None
+        with home_revision.open() as body_file:
+            assert body_file.read() == b'Home page'
+        
+        # Group members, persisted in the background
+        posts = project.get_resource_group('Posts')
+        assert [r.url for r in posts.members] == ['https://example.com/post/1']
+        _wait_for_members_persisted(posts)
+        
+        # Resource hosts
+        assert project.url_hosts == ['https://cdn.example.net', 'https://example.com']
+        assert [r.url for r in project.resources_on_host('https://example.com')] == [
+            'https://example.com/',
+            'https://example.com/post/1',
+        ]
+    finally:
+        project.close()
+    
+    # Upgrade is not repeated
+    upgrade_descriptions.clear()
+    project = Project(project_dirpath, ProgressListener(), lazy=True)
+    try:
+        assert 'Summarizing revisions' not in upgrade_descriptions
+        assert 'Finding hosts of resources' not in upgrade_descriptions
+        posts = project.get_resource_group('Posts')
+        assert posts._members_persisted
+        assert [r.url for r in posts.members] == ['https://example.com/post/1']
+        assert project.url_hosts == ['https://cdn.example.net', 'https://example.com']
+    finally:
+        project.close()
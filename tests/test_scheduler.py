@@ -0,0 +1,267 @@
+import crystal.download
+from crystal.hostrate import HostRateController
+from crystal.model import Project, Resource, ResourceRevision
+from crystal.task import (
+    PRIORITY_INTERACTIVE, RootTask, Scheduler, SCHEDULING_STYLE_PARALLEL,
+    SCHEDULING_STYLE_SEQUENTIAL, Task,
+)
+from io import BytesIO
+import pytest
+import threading
+import time
+
+# Maximum time to wait for something that should happen almost immediately
+_TIMEOUT = 5.0  # secs
+
+
+class _FetchTask(Task):
+    """
+    Leaf task that records when it runs, optionally requesting a host.
+    """
+    def __init__(self, log, name, url_host=None, duration=0.0, delay=0.0):
+        super().__init__(title=name)
+        self._log = log
+        self._name = name
+        self._url_host = url_host
+        self._duration = duration
+        self._delay = delay
+        self.done = threading.Event()
+        self.rate_descriptions = []
+    
+    @property
+    def url_host(self):
+        return self._url_host
+    
+    @property
+    def delay_before_next_request(self):
+        return self._delay
+    
+    def waiting_for_host(self, rate_description):
+        self.rate_descriptions.append(rate_description)
+    
+    def __call__(self):
+        self._log.started(self._name)
+        time.sleep(self._duration)
+        self._log.finished(self._name)
+        self.done.set()
+
+
+class _ContainerTask(Task):
+    def __init__(self, children, scheduling_style=SCHEDULING_STYLE_SEQUENTIAL):
+        super().__init__(title='Container')
+        self.scheduling_style = scheduling_style
+        for child in children:
+            self.append_child(child)
+    
+    def child_task_did_complete(self, task):
+        if self.num_children_complete == len(self.children):
+            self.finish()
+
+
+class _Log:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.order = []
+        self.start_times = {}
+        self.running = 0
+        self.max_running = 0
+    
+    def started(self, name):
+        with self._lock:
+            self.order.append(name)
+            self.start_times[name] = time.monotonic()
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+    
+    def finished(self, name):
+        with self._lock:
+            self.running -= 1
+
+
+@pytest.fixture
+def root_task():
+    return RootTask()
+
+
+@pytest.fixture
+def log():
+    return _Log()
+
+
+def test_scheduler_wakes_when_child_appended(root_task, log):
+    scheduler = Scheduler(root_task)
+    scheduler.start()
+    try:
+        time.sleep(0.1)  # let the scheduler go idle
+        task = _FetchTask(log, 'a')
+        root_task.append_child(task)
+        assert task.done.wait(_TIMEOUT)
+    finally:
+        scheduler.close()
+
+
+def test_scheduler_run_returns_after_close(root_task):
+    scheduler = Scheduler(root_task)
+    thread = threading.Thread(target=scheduler.run, daemon=True)
+    thread.start()
+    time.sleep(0.1)  # let the scheduler go idle
+    
+    scheduler.close()
+    thread.join(_TIMEOUT)
+    assert not thread.is_alive()
+
+
+def test_scheduler_runs_other_units_while_task_completion_listeners_run(root_task, log):
+    slow_task = _FetchTask(log, 'slow')
+    other_task = _FetchTask(log, 'other')
+    class SlowListener:
+        def task_did_complete(self, task):
+            # Blocks until another unit runs, which requires that
+            # the scheduler not be blocked by this listener
+            other_task_did_run.append(other_task.done.wait(_TIMEOUT))
+            listener_did_return.set()
+    other_task_did_run = []
+    listener_did_return = threading.Event()
+    slow_task.listeners.append(SlowListener())
+    
+    scheduler = Scheduler(root_task, max_workers=2)
+    scheduler.start()
+    try:
+        root_task.append_child(slow_task)
+        time.sleep(0.05)  # let the slow task complete
+        root_task.append_child(other_task)
+        assert listener_did_return.wait(_TIMEOUT)
+    finally:
+        scheduler.close()
+    
+    assert other_task_did_run == [True]
+
+
+def test_scheduler_runs_at_most_max_workers_per_host_units_for_each_host(root_task, log):
+    tasks = (
+        [_FetchTask(log, 'a%d' % i, 'https://a.example.com', duration=0.05) for i in range(4)] +
+        [_FetchTask(log, 'b%d' % i, 'https://b.example.com', duration=0.05) for i in range(4)]
+    )
+    scheduler = Scheduler(root_task, max_workers=4, max_workers_per_host=1)
+    scheduler.start()
+    try:
+        root_task.append_child(_ContainerTask(tasks, SCHEDULING_STYLE_PARALLEL))
+        for task in tasks:
+            assert task.done.wait(_TIMEOUT)
+    finally:
+        scheduler.close()
+    
+    # Both hosts ran at once, but neither ran two units at once
+    assert log.max_running == 2
+
+
+def test_scheduler_waits_for_host_delay_before_requesting_host_again(root_task, log):
+    tasks = [_FetchTask(log, 'a%d' % i, 'https://a.example.com', delay=0.2) for i in range(2)]
+    scheduler = Scheduler(root_task, max_workers=2)
+    scheduler.start()
+    try:
+        root_task.append_child(_ContainerTask(tasks, SCHEDULING_STYLE_PARALLEL))
+        for task in tasks:
+            assert task.done.wait(_TIMEOUT)
+    finally:
+        scheduler.close()
+    
+    assert log.start_times['a1'] - log.start_times['a0'] >= 0.2
+
+
+def test_scheduler_tells_skipped_tasks_the_rate_of_the_host_they_wait_for(root_task, log):
+    host_rates = HostRateController(lambda url_host: (0.0, 0.0), max_concurrency=1)
+    host_rates.record_response('https://a.example.com', latency=0.5, status_code=200)
+    tasks = [_FetchTask(log, 'a%d' % i, 'https://a.example.com', duration=0.1) for i in range(2)]
+    scheduler = Scheduler(root_task, max_workers=2, host_rates=host_rates)
+    scheduler.start()
+    try:
+        root_task.append_child(_ContainerTask(tasks, SCHEDULING_STYLE_PARALLEL))
+        for task in tasks:
+            assert task.done.wait(_TIMEOUT)
+    finally:
+        scheduler.close()
+    
+    assert tasks[0].rate_descriptions == []
+    assert len(tasks[1].rate_descriptions) >= 1
+    assert set(tasks[1].rate_descriptions) == {'2.0 req/s'}
+
+
+def test_scheduler_runs_interactive_tasks_before_other_tasks(root_task, log):
+    blocker = _FetchTask(log, 'blocker', duration=0.2)
+    scheduler = Scheduler(root_task)
+    scheduler.start()
+    try:
+        root_task.append_child(blocker)
+        time.sleep(0.05)  # let the blocker start
+        
+        bulk_tasks = [_FetchTask(log, 'bulk%d' % i) for i in range(3)]
+        root_task.append_child(_ContainerTask(bulk_tasks))
+        interactive_task = _FetchTask(log, 'interactive')
+        interactive_task.priority = PRIORITY_INTERACTIVE
+        root_task.append_child(interactive_task)
+        
+        for task in bulk_tasks + [interactive_task]:
+            assert task.done.wait(_TIMEOUT)
+    finally:
+        scheduler.close()
+    
+    assert log.order == ['blocker', 'interactive', 'bulk0', 'bulk1', 'bulk2']
+
+
+@pytest.mark.parametrize('scheduling_style, expected_max_running', [
+    (SCHEDULING_STYLE_SEQUENTIAL, 1),
+    (SCHEDULING_STYLE_PARALLEL, 4),
+])
+def test_sequential_containers_run_one_child_at_a_time_but_parallel_containers_run_several(
+        root_task, log, scheduling_style, expected_max_running):
+    tasks = [_FetchTask(log, 'a%d' % i, duration=0.05) for i in range(4)]
+    scheduler = Scheduler(root_task, max_workers=4)
+    scheduler.start()
+    try:
+        root_task.append_child(_ContainerTask(tasks, scheduling_style))
+        for task in tasks:
+            assert task.done.wait(_TIMEOUT)
+    finally:
+        scheduler.close()
+    
+    assert log.max_running == expected_max_running
+    if scheduling_style == SCHEDULING_STYLE_SEQUENTIAL:
+        assert log.order == ['a0', 'a1', 'a2', 'a3']
+
+
+def test_download_resource_task_downloads_body_first_then_embedded_resources_in_parallel(log, monkeypatch):
+    page_url = 'https://example.com/'
+    image_urls = ['https://%s.example.com/image.png' % name for name in ['a', 'b', 'c', 'd']]
+    page_html = ('<html><body>%s</body></html>' % ''.join(
+        '<img src="%s">' % url for url in image_urls
+    )).encode('utf-8')
+    def download_resource_revision(resource, progress_listener):
+        log.started(resource.url)
+        time.sleep(0.05)
+        log.finished(resource.url)
+        (content_type, body) = (
+            ('text/html', page_html) if resource.url == page_url
+            else ('image/png', b'PNG')
+        )
+        metadata = {
+            'http_version': 11,
+            'status_code': 200,
+            'reason_phrase': 'OK',
+            'headers': [['Content-Type', content_type]],
+        }
+        return ResourceRevision.create_from_response(resource, metadata, BytesIO(body))
+    monkeypatch.setattr(crystal.download, 'download_resource_revision', download_resource_revision)
+    
+    project = Project('test', in_memory=True, max_download_workers=4)
+    try:
+        task = Resource(project, page_url).create_download_task()
+        future = task.get_future(wait_for_embedded=True)
+        project.add_task(task)
+        future.result(_TIMEOUT)
+    finally:
+        project.close()
+    
+    assert log.order[0] == page_url
+    assert sorted(log.order[1:]) == image_urls
+    assert log.max_running == 4
@@ -0,0 +1,52 @@
+from crystal.model import Project
+import pytest
+
+
+@pytest.fixture(params=['indexed', 'unindexed'])
+def project(request):
+    project = Project('test', in_memory=True)
+    if request.param == 'unindexed':
+        # Simulate SQLite without FTS5
+        project._has_url_search_index = False
+    project.bulk_get_or_create_resources([
+        'https://example.com/home',
+        'https://example.com/Images/logo.png',
+        'https://example.com/50%_off',
+        'https://example.com/a_b',
+        'https://example.com/axb',
+        'https://other.com/images/icon.png',
+    ])
+    yield project
+    project.close()
+
+
+def _search(project, substring, **kwargs):
+    return [r.url for r in project.search_urls(substring, **kwargs)]
+
+
+def test_search_urls_ignores_case_and_returns_resources_in_creation_order(project):
+    assert _search(project, 'images/') == [
+        'https://example.com/Images/logo.png',
+        'https://other.com/images/icon.png',
+    ]
+    assert _search(project, 'missing') == []
+
+
+def test_search_urls_finds_substrings_shorter_than_a_trigram(project):
+    assert _search(project, 'xb') == ['https://example.com/axb']
+    assert _search(project, 'a_') == ['https://example.com/a_b']
+
+
+def test_search_urls_treats_like_wildcards_and_quotes_literally(project):
+    assert _search(project, '%_') == ['https://example.com/50%_off']
+    assert _search(project, '0%_o') == ['https://example.com/50%_off']
+    assert _search(project, 'a_b') == ['https://example.com/a_b']
+    assert _search(project, '"home"') == []
+    assert _search(project, '"') == []
+
+
+def test_search_urls_pages_with_after_id_and_limit(project):
+    page1 = project.search_urls('.com/', limit=4)
+    page2 = project.search_urls('.com/', after_id=page1[-1]._id, limit=4)
+    assert [len(page1), len(page2)] == [4, 2]
+    assert [r.url for r in page1 + page2] == [r.url for r in project.search_urls('.com/')]
@@ -0,0 +1,47 @@
+from crystal.urlmatcher import literal_prefix_of, UrlPatternMatcher
+import re
+
+
+def test_literal_prefix_of_stops_at_first_metacharacter():
+    assert literal_prefix_of('https://example.com/post/#') == 'https://example.com/post/'
+    assert literal_prefix_of('https://example.com/*/@') == 'https://example.com/'
+    assert literal_prefix_of('https://example.com/') == 'https://example.com/'
+    assert literal_prefix_of('**') == ''
+
+
+def test_match_returns_matching_values_in_order_added():
+    matcher = UrlPatternMatcher()  # type: UrlPatternMatcher[str]
+    matcher.add('https://example.com/**', re.compile(r'^https://example\.com/.*$'), 'site')
+    matcher.add('https://example.com/post/#', re.compile(r'^https://example\.com/post/[0-9]+$'), 'post')
+    matcher.add('**.png', re.compile(r'^.*\.png$'), 'image')
+    matcher.add('https://other.com/**', re.compile(r'^https://other\.com/.*$'), 'other')
+    
+    assert matcher.match('https://example.com/post/12') == ['site', 'post']
+    assert matcher.match('https://example.com/post/a.png') == ['site', 'image']
+    assert matcher.match('https://other.com/') == ['other']
+    assert matcher.match('https://unknown.com/') == []
+
+
+def test_removed_value_no_longer_matches():
+    matcher = UrlPatternMatcher()  # type: UrlPatternMatcher[str]
+    matcher.add('https://example.com/post/#', re.compile(r'^https://example\.com/post/[0-9]+$'), 'post')
+    matcher.add('https://example.com/**', re.compile(r'^https://example\.com/.*$'), 'site')
+    
+    matcher.remove('post')
+    assert 'post' not in matcher
+    assert len(matcher) == 1
+    assert matcher.match('https://example.com/post/12') == ['site']
+    
+    matcher.remove('site')
+    assert matcher.match('https://example.com/post/12') == []
+    assert len(matcher._root.children) == 0
+
+
+def test_updated_value_keeps_its_position_in_match_results():
+    matcher = UrlPatternMatcher()  # type: UrlPatternMatcher[str]
+    matcher.add('https://example.com/post/#', re.compile(r'^https://example\.com/post/[0-9]+$'), 'post')
+    matcher.add('https://example.com/**', re.compile(r'^https://example\.com/.*$'), 'site')
+    
+    matcher.update('https://example.com/post/@', re.compile(r'^https://example\.com/post/[a-zA-Z]+$'), 'post')
+    assert matcher.match('https://example.com/post/12') == ['site']
+    assert matcher.match('https://example.com/post/ab') == ['post', 'site']
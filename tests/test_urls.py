@@ -0,0 +1,26 @@
+from crystal.urls import CompactUrlDict, split_url_host
+
+
+def test_split_url_host_splits_after_scheme_and_authority():
+    assert split_url_host('https://example.com/a/b?c') == ('https://example.com', '/a/b?c')
+    assert split_url_host('https://example.com?c') == ('https://example.com', '?c')
+    assert split_url_host('https://example.com') == ('https://example.com', '')
+    assert split_url_host('mailto:someone@example.com') == ('', 'mailto:someone@example.com')
+
+
+def test_compact_url_dict_stores_each_host_once():
+    d = CompactUrlDict()  # type: CompactUrlDict[int]
+    d['https://example.com/1'] = 1
+    d.set_parts(*d.split('https://example.com/2'), 2)
+    d['https://other.com/'] = 3
+    
+    assert d.get('https://example.com/2') == 2
+    assert d.get('https://example.com/3') is None
+    assert 'https://other.com/' in d
+    assert len(d) == 3
+    assert list(d.values()) == [1, 2, 3]
+    assert d.split('https://example.com/9')[0] is d.split('https://example.com/8')[0]
+    
+    del d['https://other.com/']
+    assert d.hosts() == ['https://example.com']
+    assert len(d) == 2
@@ -0,0 +1,94 @@
+from crystal.xcollections import bitset, lrucache, simpleorderedset
+import pytest
+
+
+def test_lrucache_discards_least_recently_used_item_when_full():
+    cache = lrucache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    assert cache['a'] == 1  # mark 'a' as recently used
+    cache['c'] = 3
+    
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+    assert len(cache) == 2
+
+
+def test_lrucache_get_returns_default_for_missing_key():
+    cache = lrucache(1)
+    assert cache.get('missing') is None
+    assert cache.get('missing', 5) == 5
+
+
+def test_lrucache_counts_hits_and_misses():
+    cache = lrucache(2)
+    cache['a'] = 1
+    cache.get('a')
+    cache.get('b')
+    cache.get('c')
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_lrucache_discards_least_recently_used_items_when_overweight():
+    cache = lrucache(10, maxweight=10, weigh=len)
+    cache['a'] = 'xxxx'
+    cache['b'] = 'xxxx'
+    cache['c'] = 'xxxx'
+    assert 'a' not in cache
+    assert cache.weight == 8
+    
+    cache['b'] = 'x'
+    assert cache.weight == 5
+    del cache['b']
+    assert cache.weight == 4
+    
+    cache['d'] = 'x' * 20  # heavier than the entire budget
+    assert len(cache) == 0
+    assert cache.weight == 0
+
+
+def test_lrucache_rejects_nonpositive_maxsize():
+    with pytest.raises(ValueError):
+        lrucache(0)
+
+
+def test_bitset_add_discard_and_contains():
+    bits = bitset([3, 70])
+    bits.add(3)
+    bits.add(1000)
+    assert 3 in bits
+    assert 70 in bits
+    assert 1000 in bits
+    assert 4 not in bits
+    assert 5000 not in bits
+    assert len(bits) == 3
+    
+    bits.discard(70)
+    bits.discard(71)
+    assert 70 not in bits
+    assert list(bits) == [3, 1000]
+
+
+def test_bitset_rejects_negative_values():
+    with pytest.raises(ValueError):
+        bitset([-1])
+
+
+def test_simpleorderedset_preserves_insertion_order_and_ignores_duplicates():
+    s = simpleorderedset(['b', 'a'])
+    s.add('c')
+    s.add('a')
+    assert list(s) == ['b', 'a', 'c']
+    assert len(s) == 3
+    assert 'a' in s
+    assert 'd' not in s
+
+
+def test_simpleorderedset_remove_and_discard():
+    s = simpleorderedset(['a', 'b', 'c'])
+    s.remove('b')
+    s.discard('b')  # no error
+    assert list(s) == ['a', 'c']
+    with pytest.raises(KeyError):
+        s.remove('b')
@@ -0,0 +1,104 @@
+from crystal.xthreading import ReadWriteLock
+import pytest
+import threading
+import time
+
+# Maximum time to wait for something that should happen almost immediately
+_TIMEOUT = 5.0  # secs
+
+
+def _start(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_readers_may_hold_lock_at_same_time():
+    lock = ReadWriteLock()
+    barrier = threading.Barrier(2, timeout=_TIMEOUT)
+    def read():
+        with lock.reading():
+            barrier.wait()
+    threads = [_start(read) for _ in range(2)]
+    for thread in threads:
+        thread.join(_TIMEOUT)
+        assert not thread.is_alive()
+
+
+def test_writer_excludes_readers():
+    lock = ReadWriteLock()
+    reader_did_read = threading.Event()
+    def read():
+        with lock.reading():
+            reader_did_read.set()
+    with lock.writing():
+        _start(read)
+        assert not reader_did_read.wait(0.1)
+    assert reader_did_read.wait(_TIMEOUT)
+
+
+def test_lock_is_reentrant():
+    lock = ReadWriteLock()
+    with lock.reading():
+        with lock.reading():
+            pass
+    with lock.writing():
+        with lock.writing():
+            pass
+        with lock.reading():
+            pass
+    
+    # Lock was fully released
+    writer_did_write = threading.Event()
+    def write():
+        with lock.writing():
+            writer_did_write.set()
+    _start(write)
+    assert writer_did_write.wait(_TIMEOUT)
+
+
+def test_reader_may_reacquire_read_lock_while_writer_waits():
+    lock = ReadWriteLock()
+    writer_did_write = threading.Event()
+    def write():
+        with lock.writing():
+            writer_did_write.set()
+    with lock.reading():
+        _start(write)
+        time.sleep(0.1)  # let the writer start waiting
+        with lock.reading():  # must not deadlock
+            pass
+        assert not writer_did_write.is_set()
+    assert writer_did_write.wait(_TIMEOUT)
+
+
+def test_waiting_writer_takes_priority_over_new_readers():
+    lock = ReadWriteLock()
+    order = []
+    def write():
+        with lock.writing():
+            order.append('writer')
+    def read():
+        with lock.reading():
+            order.append('reader')
+    with lock.reading():
+        writer = _start(write)
+        time.sleep(0.1)  # let the writer start waiting
+        reader = _start(read)
+        time.sleep(0.1)  # let the reader start waiting
+        assert order == []
+    writer.join(_TIMEOUT)
+    reader.join(_TIMEOUT)
+    assert order == ['writer', 'reader']
+
+
+def test_cannot_upgrade_read_lock_to_write_lock():
+    lock = ReadWriteLock()
+    with lock.reading():
+        with pytest.raises(RuntimeError):
+            with lock.writing():
+                pass
+    
+    # Failed upgrade did not leave the lock held
+    with lock.writing():
+        pass